@@ -0,0 +1,68 @@
+import argparse
+import asyncio
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_batch_process import BenchConfig, make_corpus
+from smartbin.aio import AsyncProcessor
+from smartbin.file_processor import FileProcessor
+from smartbin.file_recognizer import FileRecognizer
+
+
+async def measure(files, processor, recognizer, concurrency: int):
+    # 同时运行一个 5 ms 的定时器，记录事件循环最长被阻塞了多久
+    lag = 0.0
+    running = True
+    
+    async def ticker():
+        nonlocal lag
+        while running:
+            start = time.perf_counter()
+            await asyncio.sleep(0.005)
+            lag = max(lag, time.perf_counter() - start - 0.005)
+    
+    task = asyncio.ensure_future(ticker())
+    async with AsyncProcessor(processor, recognizer, concurrency=concurrency) as aio:
+        start = time.perf_counter()
+        count = 0
+        async for result in aio.process(files):
+            assert result['success'], result
+            count += 1
+        elapsed = time.perf_counter() - start
+    running = False
+    await task
+    return count / elapsed, lag
+
+
+def run(count: int, size: int, concurrency: int):
+    root = Path(tempfile.mkdtemp(prefix="smartbin-async-"))
+    try:
+        files = make_corpus(root / "in", count, size)
+        processor = FileProcessor(BenchConfig(root, {"enabled": False}))
+        rate, lag = asyncio.run(measure(files, processor, FileRecognizer(), concurrency))
+        processor.journal.close()
+        return rate, lag
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="asyncio 接口的吞吐量与事件循环延迟")
+    parser.add_argument("--files", type=int, default=5000)
+    parser.add_argument("--size", type=int, default=4096)
+    args = parser.parse_args()
+    
+    print(f"{'concurrency':>11} {'files/s':>9} {'max loop lag ms':>16}")
+    for concurrency in (4, 16, 64):
+        rate, lag = run(args.files, args.size, concurrency)
+        print(f"{concurrency:>11} {rate:>9.0f} {lag * 1000:>16.1f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
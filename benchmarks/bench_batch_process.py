@@ -0,0 +1,92 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smartbin.file_recognizer import FileRecognizer
+from smartbin.file_processor import FileProcessor
+from smartbin.rules import RuleSet
+
+
+class BenchConfig:
+    def __init__(self, root: Path, parallel: dict):
+        self.db_file = root / "smartbin.db"
+        self.config = {
+            "target_directory": str(root / "out"),
+            "conflict_strategy": "rename",
+            "parallel": parallel,
+        }
+    
+    def get_target_directory(self):
+        return Path(self.config["target_directory"])
+    
+    def get_rules(self):
+        return RuleSet(self.config.get("default_categories", {}), self.config.get("custom_rules", []))
+
+
+class SlowRecognizer(FileRecognizer):
+    # 模拟网络共享/慢速 U 盘上的读文件头延迟
+    def __init__(self, latency: float):
+        super().__init__()
+        self.latency = latency
+    
+    def detect_by_magic_number(self, file_path, inspection=None):
+        time.sleep(self.latency)
+        return super().detect_by_magic_number(file_path, inspection)
+
+
+def make_corpus(directory: Path, count: int, size: int):
+    directory.mkdir(parents=True)
+    payload = os.urandom(size)
+    files = []
+    for i in range(count):
+        path = directory / f"file{i % 50}_{i}.bin" if i % 10 else directory / f"dup{i}" / "IMG.jpg"
+        path.parent.mkdir(exist_ok=True)
+        path.write_bytes(b'\xFF\xD8\xFF' + payload)
+        files.append(str(path))
+    return files
+
+
+def run(count: int, size: int, latency: float, workers: int) -> float:
+    root = Path(tempfile.mkdtemp(prefix="smartbin-bench-"))
+    try:
+        files = make_corpus(root / "in", count, size)
+        parallel = {
+            "enabled": workers > 0,
+            "recognize_workers": workers,
+            "move_workers": workers,
+            "hash_workers": max(1, workers // 2),
+        }
+        processor = FileProcessor(BenchConfig(root, parallel))
+        recognizer = SlowRecognizer(latency)
+        start = time.perf_counter()
+        results = processor.batch_process(files, recognizer)
+        elapsed = time.perf_counter() - start
+        processor.journal.close()
+        assert all(r['success'] for r in results), [r for r in results if not r['success']][:3]
+        return elapsed
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="batch_process 串行/并行吞吐量对比")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--size", type=int, default=16 * 1024)
+    parser.add_argument("--latency-ms", type=float, default=2.0)
+    args = parser.parse_args()
+    
+    print(f"{'workers':>8} {'seconds':>8} {'files/s':>9}")
+    for workers in (0, 1, 2, 4, 8, 16):
+        elapsed = run(args.files, args.size, args.latency_ms / 1000, workers)
+        label = "serial" if workers == 0 else str(workers)
+        print(f"{label:>8} {elapsed:>8.2f} {args.files / elapsed:>9.0f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
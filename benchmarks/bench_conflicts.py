@@ -0,0 +1,81 @@
+import argparse
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_batch_process import BenchConfig
+from smartbin.file_processor import FileProcessor
+
+
+def probing_target_path(source_path: Path, target_dir: Path) -> Path:
+    # 旧实现：name(1)、name(2)… 每个候选名称一次 exists()
+    target_path = target_dir / source_path.name
+    if not target_path.exists():
+        return target_path
+    counter = 1
+    while True:
+        new_path = target_dir / f"{source_path.stem}({counter}){source_path.suffix}"
+        if not new_path.exists():
+            return new_path
+        counter += 1
+
+
+def prepare(root: Path, collisions: int, files: int):
+    # 目标目录中已有 collisions 个同名文件（IMG.jpg、IMG(1).jpg …），再放入 files 个新的 IMG.jpg
+    target_dir = root / "out" / "图片"
+    target_dir.mkdir(parents=True)
+    (target_dir / "IMG.jpg").write_bytes(b"")
+    for i in range(1, collisions):
+        (target_dir / f"IMG({i}).jpg").write_bytes(b"")
+    sources = []
+    for i in range(files):
+        source = root / "in" / str(i) / "IMG.jpg"
+        source.parent.mkdir(parents=True)
+        source.write_bytes(b"\xFF\xD8\xFF")
+        sources.append(source)
+    return target_dir, sources
+
+
+def run(collisions: int, files: int):
+    root = Path(tempfile.mkdtemp(prefix="smartbin-conflicts-"))
+    try:
+        target_dir, sources = prepare(root, collisions, files)
+        
+        start = time.perf_counter()
+        for source in sources:
+            probing_target_path(source, target_dir)
+        probing = (time.perf_counter() - start) / files
+        
+        processor = FileProcessor(BenchConfig(root, {"enabled": False}))
+        start = time.perf_counter()
+        for source in sources:
+            result = processor.process_file(str(source), "图片")
+            assert result['success'], result
+        indexed = (time.perf_counter() - start) / files
+        processor.journal.close()
+        
+        names = {path.name for path in target_dir.iterdir()}
+        assert len(names) == collisions + files
+        return probing, indexed
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="同名冲突数量增长时，每个文件的处理耗时")
+    parser.add_argument("--files", type=int, default=200)
+    args = parser.parse_args()
+    
+    # probing 只计算目标路径；process_file 包含名称分配、移动和写入历史记录的全部开销
+    print(f"{'collisions':>10} {'probing us/file':>16} {'process_file us/file':>21}")
+    for collisions in (1, 100, 1000, 3000, 10000):
+        probing, indexed = run(collisions, args.files)
+        print(f"{collisions:>10} {probing * 1e6:>16.0f} {indexed * 1e6:>21.0f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
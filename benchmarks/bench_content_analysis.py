@@ -0,0 +1,68 @@
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smartbin.keywords import DEFAULT_KEYWORDS, build_matcher
+
+FILLER = "这是一段普通的文字内容，没有特别的含义。The quick brown fox jumps over the lazy dog. "
+
+
+def synthetic_text(size: int, seed: int) -> str:
+    rng = random.Random(seed)
+    words = [word for words in DEFAULT_KEYWORDS.values() for word in words]
+    parts = []
+    length = 0
+    while length < size:
+        part = FILLER if rng.random() < 0.97 else rng.choice(words)
+        parts.append(part)
+        length += len(part.encode('utf-8'))
+    return ''.join(parts)
+
+
+def nested_loop(file_path: str):
+    # 旧实现：每次调用重建关键词表，只看前 4096 个字符，返回第一个命中的分类
+    with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
+        content = f.read(4096)
+    keywords = {category: list(words) for category, words in DEFAULT_KEYWORDS.items()}
+    for category, words in keywords.items():
+        for word in words:
+            if word in content:
+                return category
+    return None
+
+
+def measure(func, files, repeat: int = 3) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for file_path in files:
+            func(file_path)
+        best = min(best, time.perf_counter() - start)
+    return best / len(files) * 1e6
+
+
+def main():
+    root = Path(tempfile.mkdtemp(prefix="smartbin-content-"))
+    try:
+        matcher = build_matcher()
+        print(f"{'file size':>10} {'matcher us/file':>16} {'old 4K prefix us/file':>22}")
+        for size in (4 * 1024, 64 * 1024, 1024 * 1024, 8 * 1024 * 1024):
+            files = []
+            for i in range(max(4, 64 * 1024 * 1024 // size // 16)):
+                file_path = root / f"{size}-{i}.txt"
+                file_path.write_text(synthetic_text(size, i), encoding='utf-8')
+                files.append(str(file_path))
+            matched = measure(matcher.classify_file, files)
+            old = measure(nested_loop, files)
+            print(f"{size:>10} {matched:>16.0f} {old:>22.0f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
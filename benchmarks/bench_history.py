@@ -0,0 +1,64 @@
+import argparse
+import datetime
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smartbin.journal import OperationJournal, OperationRecord
+
+CATEGORIES = ['图片', '文档', '文档/财务', '视频', '音频', '压缩包', '代码', '其他']
+
+
+def fill(journal: OperationJournal, count: int):
+    # 每 30 秒一条记录；每 1000 条中有一条属于少见的分类
+    start = datetime.datetime(2024, 1, 1)
+    rows = []
+    for i in range(count):
+        category = '安装包' if i % 1000 == 0 else CATEGORIES[i % len(CATEGORIES)]
+        rows.append(OperationRecord('move', f'/home/user/Downloads/file_{i}.dat', f'/home/user/Desktop/{category}/file_{i}.dat',
+                                    category, i, '', start + datetime.timedelta(seconds=i * 30), i // 100))
+        if len(rows) == 100000:
+            journal._insert([(row, None) for row in rows])
+            rows = []
+    journal._insert([(row, None) for row in rows])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="操作历史对话框的分页查询耗时（打开、翻页、筛选）")
+    parser.add_argument("--rows", type=int, default=1000000)
+    args = parser.parse_args()
+    
+    root = Path(tempfile.mkdtemp(prefix="smartbin-history-"))
+    try:
+        journal = OperationJournal(root / "smartbin.db")
+        fill(journal, args.rows)
+        middle = journal.query(1, before=('2024-06-01', 0))[0]
+        
+        cases = [
+            ("分类列表", lambda: journal.categories()),
+            ("第一页", lambda: journal.query(200)),
+            ("深处的一页", lambda: journal.query(200, before=(middle['timestamp'], middle['id']))),
+            ("按分类", lambda: journal.query(200, category='视频')),
+            ("少见的分类", lambda: journal.query(200, category='安装包')),
+            ("日期范围", lambda: journal.query(200, since='2024-02-01', until='2024-02-08')),
+            ("分类 + 日期", lambda: journal.query(200, category='文档', since='2024-02-01', until='2024-02-08')),
+            ("文件名（常见）", lambda: journal.query(200, name='file_1')),
+            ("文件名（无匹配）", lambda: journal.query(200, name='not-there')),
+        ]
+        print(f"{args.rows} 条记录")
+        for label, func in cases:
+            start = time.perf_counter()
+            rows = func()
+            elapsed = time.perf_counter() - start
+            print(f"{label:<20} {elapsed * 1000:>9.1f} ms  {len(rows):>4} 行")
+        journal.close()
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
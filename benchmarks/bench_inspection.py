@@ -0,0 +1,141 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_batch_process import BenchConfig
+from corpus import generate_corpus
+from smartbin.file_processor import FileProcessor
+from smartbin.file_recognizer import FileRecognizer
+
+# 对比两种调用方式的每文件开销：
+#   separate - 识别、内容分析、移动、哈希各自打开文件（改动前的调用方式）
+#   shared   - batch_process 中一次打开，识别/分析/移动/哈希共用 stat 结果、描述符和缓冲区
+# 系统调用次数：打开次数来自审计钩子（open 事件），stat 次数通过包装 os.stat/lstat/fstat 统计，
+# 读调用次数和读取字节数来自 /proc/self/io（syscr / rchar，仅 Linux）
+
+_counters = {'open': 0, 'stat': 0}
+_counting = False
+
+
+def _audit(event, args):
+    if _counting and event == 'open':
+        _counters['open'] += 1
+
+
+def _wrap_stat(name):
+    original = getattr(os, name)
+    
+    def wrapper(*args, **kwargs):
+        if _counting:
+            _counters['stat'] += 1
+        return original(*args, **kwargs)
+    setattr(os, name, wrapper)
+
+
+def _proc_io():
+    try:
+        with open('/proc/self/io') as f:
+            values = dict(line.split(': ') for line in f.read().splitlines())
+        return int(values['syscr']), int(values['rchar'])
+    except OSError:
+        return 0, 0
+
+
+def separate(processor, recognizer, file_path, content_analysis):
+    rules = processor.config.get_rules()
+    category, mime_type, status = recognizer.detect_file_type(file_path)
+    if status == "伪装文件":
+        return
+    rule_category = rules.match(file_path, mime_type)
+    if rule_category:
+        category = rule_category
+    if content_analysis:
+        content_category = recognizer.analyze_content(file_path)
+        if content_category:
+            category = f"{category}/{content_category}"
+    processor.process_file(file_path, category)
+
+
+def measure(mode: str, settings: dict, target: str, seed: int, scale: float):
+    global _counting
+    root = Path(tempfile.mkdtemp(prefix="smartbin-inspection-"))
+    try:
+        manifest = generate_corpus(root / "in", seed, scale)
+        files = [entry['path'] for entry in manifest]
+        config = BenchConfig(root, {"enabled": False})
+        config.config.update(settings)
+        if target:
+            config.config["target_directory"] = tempfile.mkdtemp(prefix="smartbin-inspection-", dir=target)
+        processor = FileProcessor(config)
+        recognizer = FileRecognizer()
+        content_analysis = settings.get('enable_content_analysis', False)
+        
+        _counters.update(open=0, stat=0)
+        syscr, rchar = _proc_io()
+        tracemalloc.start()
+        _counting = True
+        start = time.perf_counter()
+        if mode == 'shared':
+            processor.batch_process(files, recognizer)
+        else:
+            with processor.journal.batch():
+                for file_path in files:
+                    separate(processor, recognizer, file_path, content_analysis)
+        elapsed = time.perf_counter() - start
+        _counting = False
+        peak = tracemalloc.get_traced_memory()[1]
+        tracemalloc.stop()
+        syscr_after, rchar_after = _proc_io()
+        processor.journal.close()
+        if target:
+            shutil.rmtree(config.config["target_directory"], ignore_errors=True)
+        
+        count = len(files)
+        return {
+            'opens': _counters['open'] / count,
+            'stats': _counters['stat'] / count,
+            'reads': (syscr_after - syscr) / count,
+            'read_kb': (rchar_after - rchar) / count / 1024,
+            'us': elapsed / count * 1e6,
+            'peak_kb': peak / 1024,
+        }
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="一次打开、共享缓冲区：每个文件的系统调用、读取量和内存分配")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=0.5)
+    parser.add_argument("--cross-device", help="另一个文件系统上的目录，额外测量跨设备移动")
+    args = parser.parse_args()
+    
+    sys.addaudithook(_audit)
+    for name in ('stat', 'lstat', 'fstat'):
+        _wrap_stat(name)
+    
+    scenarios = [
+        ('default', {}, None),
+        ('content', {'enable_content_analysis': True}, None),
+        ('hash always', {'hash_mode': 'always'}, None),
+    ]
+    if args.cross_device:
+        scenarios.append(('cross-device', {'hash_mode': 'always'}, args.cross_device))
+    
+    print(f"{'scenario':<13} {'mode':<9} {'opens':>6} {'stats':>6} {'reads':>6} {'read KB':>8} {'us/file':>8} {'peak KB':>8}")
+    for name, settings, target in scenarios:
+        for mode in ('separate', 'shared'):
+            r = measure(mode, settings, target, args.seed, args.scale)
+            print(f"{name:<13} {mode:<9} {r['opens']:>6.2f} {r['stats']:>6.2f} {r['reads']:>6.2f} "
+                  f"{r['read_kb']:>8.1f} {r['us']:>8.0f} {r['peak_kb']:>8.0f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
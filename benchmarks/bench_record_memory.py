@@ -0,0 +1,83 @@
+import argparse
+import gc
+import hashlib
+import sys
+import tracemalloc
+from datetime import datetime
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smartbin.journal import OperationRecord
+
+CATEGORIES = ['图片', '文档', '文档/财务', '视频', '音频', '压缩包', '代码', '其他']
+
+
+def inputs(count: int):
+    # 与 FileProcessor._move 产出的结果相同的字符串：每个文件的路径、哈希各不相同，目录重复
+    for i in range(count):
+        category = CATEGORIES[i % len(CATEGORIES)]
+        yield {
+            'success': True,
+            'source': str(Path(f'/home/user/Downloads/project_{i % 50}/IMG_{i:07d}.jpg')),
+            'destination': str(Path(f'/home/user/Desktop/{category}/IMG_{i:07d}.jpg')),
+            'category': category,
+        }, i * 1000, 'blake2b:' + hashlib.blake2b(i.to_bytes(8, 'little'), digest_size=32).hexdigest()
+
+
+def dict_operation(result, file_size, file_hash):
+    # 原来的表示：每条记录一个字典，时间为 ISO 字符串，哈希为十六进制字符串
+    return {
+        'timestamp': datetime.now().isoformat(),
+        'operation': 'move',
+        'source': result['source'],
+        'destination': result['destination'],
+        'category': result['category'],
+        'file_size': file_size,
+        'file_hash': file_hash,
+        'group_id': 1
+    }
+
+
+def compact_operation(result, file_size, file_hash):
+    return OperationRecord('move', result['source'], result['destination'], result['category'], file_size, file_hash,
+                           group_id=1)
+
+
+def measure(build, count: int, keep_results: bool) -> float:
+    # 每条记录占用的字节数；keep_results=False 时只保留记录本身（批次结束前缓存的记录、历史对话框的行）
+    # 输入也在统计范围内生成：只被记录引用的路径字符串计入记录的开销
+    gc.collect()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    kept = []
+    for result, file_size, file_hash in inputs(count):
+        operation = build(result, file_size, file_hash)
+        if keep_results:
+            result['operation'] = operation
+            kept.append(result)
+        else:
+            kept.append((operation, None))
+    del result, file_hash, operation
+    gc.collect()
+    used = tracemalloc.get_traced_memory()[0] - before
+    tracemalloc.stop()
+    del kept
+    return used / count
+
+
+def main():
+    parser = argparse.ArgumentParser(description="每条操作记录占用的内存：字典与紧凑表示")
+    parser.add_argument("--count", type=int, default=200000)
+    args = parser.parse_args()
+    
+    print(f"{args.count} 条记录，每条的字节数")
+    print(f"{'':<24} {'字典':>8} {'紧凑':>8}")
+    for label, keep_results in (("只保留记录", False), ("处理结果 + 记录", True)):
+        old = measure(dict_operation, args.count, keep_results)
+        new = measure(compact_operation, args.count, keep_results)
+        print(f"{label:<24} {old:>8.0f} {new:>8.0f}  ({new / old:.0%})")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
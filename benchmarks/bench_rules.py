@@ -0,0 +1,105 @@
+import argparse
+import fnmatch
+import os
+import random
+import re
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smartbin.config import Config
+from smartbin.rules import RuleSet
+
+EXTENSIONS = ['.pdf', '.docx', '.jpg', '.png', '.txt', '.zip', '.mp4', '.csv', '.xlsx', '.log']
+WORDS = ['发票', 'invoice', 'report', '合同', 'scan', 'IMG', 'backup', 'draft', 'final', '简历', 'photo', 'data']
+OTHER_WORDS = ['holiday', 'screenshot', '会议纪要', 'notes', 'export', 'untitled']
+MIMES = ['application/pdf', 'image/*', 'text/plain', 'video/mp4', 'application/zip']
+
+
+def synthetic_rules(count: int, seed: int = 1):
+    # 与实际配置类似：大多数规则按文件名关键词归类，部分限定扩展名、MIME 或大小
+    rng = random.Random(seed)
+    rules = []
+    for i in range(count):
+        rule = {'category': f"规则{i}"}
+        if rng.random() < 0.5:
+            rule['extensions'] = rng.sample(EXTENSIONS, rng.randint(1, 3))
+        kind = rng.random()
+        if kind < 0.5:
+            rule['glob'] = f"*{rng.choice(WORDS)}_{rng.randint(0, 999)}*"
+        elif kind < 0.95:
+            rule['regex'] = rf"{rng.choice(WORDS)}[-_]{rng.randint(0, 999)}\b"
+        else:
+            # 只按扩展名/大小归类的规则：大文件单独归档
+            rule['min_size'] = rng.randint(1, 100) * 1024 * 1024
+        if rng.random() < 0.2:
+            rule['mime'] = rng.choice(MIMES)
+        if 'min_size' not in rule and rng.random() < 0.1:
+            rule['min_size'] = rng.randint(0, 4096)
+        rules.append(rule)
+    return rules
+
+
+def synthetic_names(count: int, seed: int = 2):
+    rng = random.Random(seed)
+    names = []
+    for _ in range(count):
+        # 一半的文件名不含任何规则关键词，只能逐条排除
+        word = rng.choice(WORDS) if rng.random() < 0.5 else rng.choice(OTHER_WORDS)
+        number = rng.randint(0, 999)
+        names.append(f"{word}_{number}{rng.choice(EXTENSIONS)}")
+    return names
+
+
+def linear_match(rules, name, mime_type, size):
+    # 对照实现：逐条规则、逐个条件判断
+    extension = os.path.splitext(name)[1].lower()
+    for rule in rules:
+        if 'extensions' in rule and extension not in rule['extensions']:
+            continue
+        if 'glob' in rule and not fnmatch.fnmatch(name.lower(), rule['glob'].lower()):
+            continue
+        if 'regex' in rule and not re.search(rule['regex'], name):
+            continue
+        if 'mime' in rule:
+            pattern = rule['mime']
+            if not (mime_type == pattern or (pattern.endswith('*') and mime_type.startswith(pattern[:-1]))):
+                continue
+        if 'min_size' in rule and size < rule['min_size']:
+            continue
+        return rule['category']
+    return None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="自定义规则匹配耗时")
+    parser.add_argument("--files", type=int, default=20000)
+    args = parser.parse_args()
+    
+    stat = os.stat(__file__)
+    names = synthetic_names(args.files)
+    mimes = [random.Random(i).choice(['application/pdf', 'image/png', 'text/plain']) for i in range(len(names))]
+    
+    print(f"{'rules':>6} {'compile ms':>11} {'compiled us/file':>17} {'linear us/file':>15}")
+    for count in (10, 100, 500, 1000):
+        rules = synthetic_rules(count)
+        start = time.perf_counter()
+        rule_set = RuleSet(Config().default_config['default_categories'], rules)
+        compile_ms = (time.perf_counter() - start) * 1000
+        
+        start = time.perf_counter()
+        compiled = [rule_set.match(name, mime, stat) for name, mime in zip(names, mimes)]
+        compiled_us = (time.perf_counter() - start) / len(names) * 1e6
+        
+        start = time.perf_counter()
+        expected = [linear_match(rules, name, mime, stat.st_size) for name, mime in zip(names, mimes)]
+        linear_us = (time.perf_counter() - start) / len(names) * 1e6
+        
+        assert compiled == expected, next((n, c, e) for n, c, e in zip(names, compiled, expected) if c != e)
+        print(f"{count:>6} {compile_ms:>11.1f} {compiled_us:>17.1f} {linear_us:>15.1f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
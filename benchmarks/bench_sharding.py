@@ -0,0 +1,63 @@
+import argparse
+import os
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_batch_process import BenchConfig
+from smartbin.file_processor import classify_file
+from smartbin.file_recognizer import FileRecognizer
+from smartbin.sharding import ShardedScanner
+from smartbin.walker import iter_paths
+
+TEXT = "本季度的财务报表与发票已经整理完毕，合同条款请法务复核。The meeting notes are attached.\n"
+
+
+def make_tree(root: Path, directories: int, files: int):
+    # 多层目录 + 文本文件，开启内容分析后识别以 CPU 为主
+    for i in range(directories):
+        directory = root / f"d{i % 10}" / f"sub{i}"
+        directory.mkdir(parents=True)
+        for j in range(files // directories):
+            (directory / f"note_{j}.txt").write_text(TEXT * (20 + j % 50), encoding='utf-8')
+
+
+def main():
+    parser = argparse.ArgumentParser(description="多进程扫描：识别吞吐量随进程数的变化（只识别，不移动）")
+    parser.add_argument("--files", type=int, default=20000)
+    parser.add_argument("--directories", type=int, default=200)
+    args = parser.parse_args()
+    
+    root = Path(tempfile.mkdtemp(prefix="smartbin-sharding-"))
+    try:
+        make_tree(root / "in", args.directories, args.files)
+        config = BenchConfig(root, {"enabled": False})
+        config.config["enable_content_analysis"] = True
+        
+        # 预热页缓存，并测量单进程基准
+        recognizer = FileRecognizer()
+        rules = config.get_rules()
+        for _ in range(2):
+            start = time.perf_counter()
+            count = sum(1 for path in iter_paths([str(root / "in")])
+                        if classify_file(recognizer, rules, path, True))
+            serial = count / (time.perf_counter() - start)
+        print(f"{'processes':>9} {'files/s':>9} {'speedup':>8}")
+        print(f"{'serial':>9} {serial:>9.0f} {1.0:>8.2f}")
+        
+        for workers in sorted({1, 2, 4, os.cpu_count() or 1}):
+            scanner = ShardedScanner(config, workers)
+            start = time.perf_counter()
+            count = sum(1 for _ in scanner.scan([str(root / "in")]))
+            rate = count / (time.perf_counter() - start)
+            print(f"{workers:>9} {rate:>9.0f} {rate / serial:>8.2f}")
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
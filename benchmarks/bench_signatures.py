@@ -0,0 +1,64 @@
+import random
+import sys
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smartbin.signatures import Signature, SignatureIndex, load_signatures
+
+
+def synthetic_signatures(count: int, seed: int = 42):
+    rng = random.Random(seed)
+    signatures = list(load_signatures())
+    while len(signatures) < count:
+        offset = rng.choice([0, 0, 0, 4, 8])
+        pattern = bytes(rng.randrange(256) for _ in range(rng.randint(3, 8)))
+        signatures.append(Signature(f"application/x-synthetic-{len(signatures)}", [(offset, pattern, None)]))
+    return signatures
+
+
+def synthetic_headers(signatures, count: int, seed: int = 7):
+    rng = random.Random(seed)
+    size = max(s.length for s in signatures) + 16
+    headers = []
+    for i in range(count):
+        header = bytearray(rng.randrange(256) for _ in range(size))
+        if i % 2 == 0:
+            signature = rng.choice(signatures)
+            for offset, pattern, _ in signature.clauses:
+                header[offset:offset + len(pattern)] = pattern
+        headers.append(bytes(header))
+    return headers
+
+
+def linear_lookup(signatures, header):
+    for signature in signatures:
+        if signature.matches(header):
+            return signature.mime
+    return None
+
+
+def measure(func, headers, repeat: int = 5) -> float:
+    best = float('inf')
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for header in headers:
+            func(header)
+        best = min(best, time.perf_counter() - start)
+    return best / len(headers) * 1e9
+
+
+def main():
+    print(f"{'signatures':>10} {'indexed ns/lookup':>18} {'linear ns/lookup':>17}")
+    for count in (32, 100, 300, 1000):
+        signatures = synthetic_signatures(count)
+        index = SignatureIndex(signatures)
+        headers = synthetic_headers(signatures, 20000)
+        indexed = measure(index.lookup, headers)
+        linear = measure(lambda h: linear_lookup(signatures, h), headers, repeat=1)
+        print(f"{count:>10} {indexed:>18.0f} {linear:>17.0f}")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,151 @@
+import argparse
+import hashlib
+import random
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+import zlib
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from bench_batch_process import BenchConfig
+from smartbin.file_processor import FileProcessor
+from smartbin.similarity import ChunkFingerprint, similarity
+
+BLOCK = 1024 * 1024
+
+
+def read_chars() -> int:
+    # 本进程通过 read 系列调用读取的字节数（仅 Linux）
+    try:
+        with open('/proc/self/io') as f:
+            return next(int(line.split()[1]) for line in f if line.startswith('rchar:'))
+    except (OSError, StopIteration):
+        return -1
+
+
+def variants(base: bytes, rng: random.Random):
+    # (文件名, 内容)：同一文件的各种修改版本和一个无关的文件
+    size = len(base)
+    middle = size // 2
+    yield 'insert_head.bin', rng.randbytes(100) + base
+    yield 'edit_middle.bin', base[:middle] + rng.randbytes(BLOCK) + base[middle + BLOCK:]
+    yield 'append.bin', base + rng.randbytes(size // 4)
+    yield 'first_half.bin', base[:middle]
+    yield 'shuffled.bin', base[middle:] + base[:middle]
+    yield 'unrelated.bin', rng.randbytes(size)
+
+
+def fingerprint(data: bytes, sketch_size: int) -> ChunkFingerprint:
+    view = memoryview(data)
+    fp = ChunkFingerprint(sketch_size=sketch_size)
+    for offset in range(0, len(view), BLOCK):
+        fp.update(view[offset:offset + BLOCK])
+    fp.sketch()
+    return fp
+
+
+def throughput(data: bytes):
+    view = memoryview(data)
+    size = len(data) / BLOCK
+    
+    def measure(func):
+        start = time.perf_counter()
+        func()
+        return size / (time.perf_counter() - start)
+    
+    def blake2b():
+        hasher = hashlib.blake2b()
+        for offset in range(0, len(view), BLOCK):
+            hasher.update(view[offset:offset + BLOCK])
+    
+    def crc32():
+        value = 0
+        for offset in range(0, len(view), BLOCK):
+            value = zlib.crc32(view[offset:offset + BLOCK], value)
+    
+    print(f"{'blake2b':<20} {measure(blake2b):>8.0f} MB/s")
+    print(f"{'crc32':<20} {measure(crc32):>8.0f} MB/s")
+    print(f"{'内容指纹':<20} {measure(lambda: fingerprint(data, 64)):>8.0f} MB/s")
+    
+    tracemalloc.start()
+    fingerprint(data, 64)
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    print(f"{'指纹峰值内存':<20} {peak / 1024:>8.0f} KiB（不含 {len(data) >> 20} MiB 的输入数据）")
+
+
+def accuracy(base: bytes, rng: random.Random, sketch_size: int):
+    # 估计值（sketch_size 个块哈希）与全部块哈希计算的准确 Jaccard 相似度对比
+    print(f"\n{'版本':<18} {'估计':>6} {'准确':>6}")
+    base_sketch = fingerprint(base, sketch_size).sketch()
+    base_chunks = set(fingerprint(base, 1 << 30).sketch())
+    for name, data in variants(base, rng):
+        chunks = set(fingerprint(data, 1 << 30).sketch())
+        exact = len(base_chunks & chunks) / len(base_chunks | chunks)
+        estimate = similarity(base_sketch, fingerprint(data, sketch_size).sketch(), sketch_size)
+        print(f"{name:<18} {estimate:>6.0%} {exact:>6.0%}")
+
+
+def organize(base: bytes, rng: random.Random, target: Path, hash_mode: str, enabled: bool):
+    # 先整理原始文件，再逐个整理修改过的版本；similar_to 为找到的已有文件
+    root = Path(tempfile.mkdtemp(prefix="smartbin-similarity-"))
+    out = Path(tempfile.mkdtemp(prefix="smartbin-similarity-out-", dir=str(target or root)))
+    try:
+        config = BenchConfig(root, {"enabled": False})
+        config.config.update(target_directory=str(out), hash_mode=hash_mode,
+                             similarity={"enabled": enabled, "min_size": BLOCK})
+        processor = FileProcessor(config)
+        files = [('original.bin', base)] + list(variants(base, rng))
+        for name, data in files:
+            (root / name).write_bytes(data)
+        
+        elapsed = 0.0
+        read = 0
+        for name, data in files:
+            before = read_chars()
+            start = time.perf_counter()
+            result = processor.process_file(str(root / name), "视频")
+            elapsed += time.perf_counter() - start
+            read += read_chars() - before
+            assert result['success'], result
+            if enabled:
+                similar = Path(result['similar_to']).name if 'similar_to' in result else '-'
+                print(f"  {name:<18} {similar:<16} {result.get('similarity', 0):>5.0%}")
+        total = sum(len(data) for _, data in files)
+        processor.journal.close()
+        processor.dedup.close()
+        if processor.similarity is not None:
+            processor.similarity.close()
+        return total / BLOCK / elapsed, read / total
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+        shutil.rmtree(out, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="内容定义分块指纹：吞吐量、相似度估计的准确性和整理时的额外开销")
+    parser.add_argument("--size", type=int, default=64, help="测试文件大小（MiB）")
+    parser.add_argument("--sketch-size", type=int, default=64)
+    parser.add_argument("--target", metavar="DIR", help="目标目录放在另一个文件系统上（如 /dev/shm），测试跨设备复制")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    base = rng.randbytes(args.size * BLOCK)
+    throughput(base)
+    accuracy(base, random.Random(args.seed + 1), args.sketch_size)
+    
+    # 读取量为每字节文件内容读取的次数：跨设备复制时指纹随复制计算，不再单独读取
+    for hash_mode in ('copy', 'always'):
+        print(f"\nhash_mode={hash_mode}{'，跨设备' if args.target else ''}")
+        speed_off, read_off = organize(base, random.Random(args.seed + 1), args.target, hash_mode, False)
+        speed_on, read_on = organize(base, random.Random(args.seed + 1), args.target, hash_mode, True)
+        print(f"  关闭: {speed_off:>7.0f} MB/s，读取 {read_off:.2f} 次；开启: {speed_on:>7.0f} MB/s，读取 {read_on:.2f} 次")
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
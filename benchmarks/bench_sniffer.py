@@ -0,0 +1,84 @@
+import argparse
+import codecs
+import random
+import shutil
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smartbin.file_recognizer import FileRecognizer
+from smartbin.inspection import SNIFF_SIZE
+from smartbin.sniffer import sniff_text
+
+LOG_LINE = "2024-05-01 12:00:{:02d} INFO worker-{} request handled in {} ms\n"
+
+
+def samples(rng: random.Random):
+    # (文件名, 内容, 期望的 MIME)；文件名都没有可识别的扩展名
+    log = ''.join(LOG_LINE.format(i % 60, i % 8, rng.randint(1, 999)) for i in range(200)).encode()
+    csv = ''.join(f'{i},"Name, {i}",{rng.random():.4f}\n' for i in range(200)).encode()
+    chinese = ("这是一份没有扩展名的中文说明文档，用于测试编码识别。\n" * 80)
+    yield 'server.log.1', log, 'text/plain'
+    yield 'export', b'id,name,score\n' + csv, 'text/csv'
+    yield 'report.dat', b'a\tb\tc\n' + b'1\t2\t3\n' * 100, 'text/tab-separated-values'
+    yield 'response', b'{"items": [' + b'{"id": 1, "ok": true},' * 100 + b'{}]}', 'application/json'
+    yield 'feed', b'<?xml version="1.0" encoding="utf-8"?>\n<rss>' + b'<item/>' * 200 + b'</rss>', 'application/xml'
+    yield 'index.htm', b'<!DOCTYPE html>\n<html><body>' + b'<p>x</p>' * 200 + b'</body></html>', 'text/html'
+    yield 'deploy', b'#!/usr/bin/env bash\nset -e\n' + b'echo step\n' * 200, 'text/x-shellscript'
+    yield 'tool', b'#!/usr/bin/python3\nimport sys\n' + b'print(sys.argv)\n' * 100, 'text/x-python'
+    yield 'readme_utf8', chinese.encode('utf-8'), 'text/plain'
+    yield 'readme_gbk', chinese.encode('gbk'), 'text/plain'
+    yield 'readme_utf16', chinese.encode('utf-16'), 'text/plain'
+    yield 'readme_bom', codecs.BOM_UTF8 + chinese.encode('utf-8'), 'text/plain'
+    yield 'random.bin', rng.randbytes(64 * 1024), None
+    yield 'sparse.img', b'\x00' * 4096 + rng.randbytes(4096), None
+    yield 'packed.cache', bytes(rng.choice(b'\x01\x02\x03abcdef') for _ in range(8192)), None
+
+
+def main():
+    parser = argparse.ArgumentParser(description="没有签名和扩展名的文件：文本类型识别的准确性和耗时")
+    parser.add_argument("--rounds", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+    
+    root = Path(tempfile.mkdtemp(prefix="smartbin-sniffer-"))
+    try:
+        cases = list(samples(random.Random(args.seed)))
+        for name, data, _ in cases:
+            (root / name).write_bytes(data)
+        
+        recognizer = FileRecognizer()
+        print(f"{'文件':<16} {'期望':<28} {'识别结果':<36} {'µs':>6}")
+        failures = 0
+        for name, data, expected in cases:
+            header = data[:SNIFF_SIZE]
+            start = time.perf_counter()
+            for _ in range(args.rounds):
+                sniff_text(header)
+            elapsed = (time.perf_counter() - start) / args.rounds
+            with recognizer.inspect(str(root / name)) as inspection:
+                category, mime_type, status = recognizer.detect_file_type(str(root / name), inspection)
+            ok = mime_type == (expected or 'application/octet-stream')
+            failures += not ok
+            print(f"{name:<16} {str(expected):<28} {category + ' ' + mime_type:<36} {elapsed * 1e6:>6.1f} {'' if ok else '✗'}")
+        
+        # 整个识别流程（一次打开、读取、签名、扩展名、文本识别）每个文件的耗时，开启与关闭文本识别对比
+        for sniff in (False, True):
+            recognizer = FileRecognizer(sniff_unknown=sniff)
+            start = time.perf_counter()
+            for _ in range(args.rounds // 10):
+                for name, _, _ in cases:
+                    with recognizer.inspect(str(root / name)) as inspection:
+                        recognizer.detect_file_type(str(root / name), inspection)
+            elapsed = (time.perf_counter() - start) / (args.rounds // 10 * len(cases))
+            print(f"detect_file_type（文本识别{'开启' if sniff else '关闭'}）: {elapsed * 1e6:.1f} µs/文件")
+        sys.exit(1 if failures else 0)
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
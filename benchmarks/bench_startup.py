@@ -0,0 +1,82 @@
+import argparse
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+# 在子进程中运行命令行入口，结束后确认没有加载任何 PyQt5 模块
+CHECK_NO_QT = (
+    "import sys\n"
+    "from smartbin.cli import main\n"
+    "code = main(sys.argv[1:])\n"
+    "qt = [m for m in sys.modules if m.startswith('PyQt5')]\n"
+    "assert not qt, f'命令行模式加载了 PyQt5: {qt}'\n"
+    "sys.exit(code)\n"
+)
+
+
+def interpreter_startup(env) -> float:
+    start = time.perf_counter()
+    subprocess.run([sys.executable, "-c", "pass"], env=env, check=True)
+    return time.perf_counter() - start
+
+
+def time_to_first_result(args, env) -> float:
+    # 从启动进程到输出第一条 JSON 结果的耗时
+    start = time.perf_counter()
+    process = subprocess.Popen(
+        [sys.executable, "-c", CHECK_NO_QT] + args,
+        cwd=str(ROOT), env=env, stdout=subprocess.PIPE, stderr=subprocess.PIPE
+    )
+    first_line = process.stdout.readline()
+    elapsed = time.perf_counter() - start
+    _, stderr = process.communicate()
+    if process.returncode != 0 or not first_line:
+        raise SystemExit(f"命令执行失败 (exit {process.returncode}): {stderr.decode(errors='replace')}")
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description="命令行模式启动耗时（到第一个文件处理完成）")
+    # 预算针对解释器自身启动之外的开销，避免不同机器上 Python 启动速度差异影响结果
+    parser.add_argument("--budget-ms", type=float, default=100.0)
+    parser.add_argument("--runs", type=int, default=7)
+    args = parser.parse_args()
+    
+    root = Path(tempfile.mkdtemp(prefix="smartbin-startup-"))
+    try:
+        env = dict(os.environ, HOME=str(root), PYTHONDONTWRITEBYTECODE="1")
+        inbox = root / "inbox"
+        inbox.mkdir()
+        # 预热：生成配置文件与数据库，测量的是常规启动而不是首次安装
+        (inbox / "warmup.txt").write_text("warmup")
+        time_to_first_result(["organize", "--target", str(root / "out"), str(inbox)], env)
+        
+        baseline = statistics.median(interpreter_startup(env) for _ in range(args.runs)) * 1000
+        samples = []
+        for i in range(args.runs):
+            sample = inbox / f"report{i}.txt"
+            sample.write_text("hello")
+            samples.append(time_to_first_result(["organize", "--target", str(root / "out"), str(sample)], env) * 1000)
+        
+        median = statistics.median(samples)
+        overhead = median - baseline
+        print(f"interpreter startup: {baseline:.1f} ms")
+        print(f"time to first result: median {median:.1f} ms, min {min(samples):.1f} ms")
+        print(f"smartbin overhead: {overhead:.1f} ms (budget {args.budget_ms:.0f} ms)")
+        if overhead > args.budget_ms:
+            print("超出启动预算", file=sys.stderr)
+            return 1
+        return 0
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
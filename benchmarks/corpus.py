@@ -0,0 +1,154 @@
+import io
+import random
+import sys
+import zipfile
+from pathlib import Path
+from typing import Dict, List
+
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent))
+
+from smartbin.file_recognizer import FileRecognizer
+from smartbin.keywords import DEFAULT_KEYWORDS
+from smartbin.signatures import load_signatures
+
+# 用来反查"与签名一致的扩展名"的候选扩展名
+CANDIDATE_EXTENSIONS = [
+    '.jpg', '.png', '.gif', '.bmp', '.webp', '.tif', '.tiff', '.psd', '.pdf', '.ps', '.zip', '.rar', '.7z',
+    '.gz', '.exe', '.mp3', '.wav', '.ogg', '.flac', '.mp4', '.mov', '.webm', '.avi', '.mkv',
+]
+
+# 伪装文件：(真实类型的签名 MIME, 伪装用的扩展名)
+DISGUISES = [
+    ('image/jpeg', '.pdf'),
+    ('image/png', '.mp3'),
+    ('application/pdf', '.jpg'),
+    ('application/x-msdownload', '.pdf'),
+    ('application/zip', '.jpg'),
+    ('application/x-rar-compressed', '.txt'),
+]
+
+OFFICE_DOCUMENTS = {
+    '.docx': 'word/document.xml',
+    '.xlsx': 'xl/workbook.xml',
+    '.pptx': 'ppt/presentation.xml',
+}
+
+FILLER = "这是一段普通的文字内容，用来填充测试文件。The quick brown fox jumps over the lazy dog.\n"
+
+
+class CorpusBuilder:
+    def __init__(self, root: Path, seed: int = 0, scale: float = 1.0):
+        self.root = Path(root)
+        self.rng = random.Random(seed)
+        self.scale = scale
+        self.manifest: List[Dict] = []
+        self.recognizer = FileRecognizer()
+        self.signatures = load_signatures()
+        self.by_mime = {}
+        for signature in self.signatures:
+            self.by_mime.setdefault(signature.mime, signature)
+        self.extension_for_mime = {}
+        for extension in CANDIDATE_EXTENSIONS:
+            mime = self.recognizer.detect_by_extension('x' + extension)
+            if mime:
+                self.extension_for_mime.setdefault(mime, extension)
+    
+    def _count(self, base: int) -> int:
+        return max(1, int(base * self.scale))
+    
+    def _size(self) -> int:
+        # 大多数是小文件，少量大文件
+        roll = self.rng.random()
+        if roll < 0.80:
+            return self.rng.randint(512, 64 * 1024)
+        if roll < 0.97:
+            return self.rng.randint(64 * 1024, 1024 * 1024)
+        return self.rng.randint(1024 * 1024, 8 * 1024 * 1024)
+    
+    def _header(self, signature) -> bytearray:
+        header = bytearray(self.rng.randbytes(signature.length + 16))
+        for offset, pattern, mask in signature.clauses:
+            header[offset:offset + len(pattern)] = pattern
+        return header
+    
+    def _write(self, relative: str, data: bytes, **expected) -> Path:
+        path = self.root / relative
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(data)
+        self.manifest.append(dict(path=str(path), size=len(data), **expected))
+        return path
+    
+    def _binary(self, signature, size: int) -> bytes:
+        header = self._header(signature)
+        return bytes(header) + self.rng.randbytes(max(0, size - len(header)))
+    
+    def add_signatures(self, copies: int):
+        # 每个签名都生成文件：扩展名与签名一致的，以及没有可识别扩展名的
+        for number, signature in enumerate(self.signatures):
+            extension = self.extension_for_mime.get(signature.mime, '.bin')
+            for copy in range(copies):
+                self._write(
+                    f"signatures/{number:02d}_{copy}{extension}", self._binary(signature, self._size()),
+                    kind='signature', mime=signature.mime, status='正常'
+                )
+    
+    def add_disguised(self, copies: int):
+        for mime, extension in DISGUISES:
+            signature = self.by_mime.get(mime)
+            if signature is None:
+                continue
+            for copy in range(copies):
+                self._write(
+                    f"disguised/{mime.split('/')[1]}_{copy}{extension}", self._binary(signature, self._size()),
+                    kind='disguised', mime=mime, status='伪装文件'
+                )
+    
+    def add_office(self, copies: int):
+        for extension, part in OFFICE_DOCUMENTS.items():
+            mime = self.recognizer.detect_by_extension('x' + extension)
+            for copy in range(copies):
+                buffer = io.BytesIO()
+                with zipfile.ZipFile(buffer, 'w', zipfile.ZIP_DEFLATED) as archive:
+                    archive.writestr('[Content_Types].xml', '<?xml version="1.0"?><Types/>')
+                    archive.writestr(part, FILLER * self.rng.randint(10, 400))
+                    archive.writestr('media/blob.bin', self.rng.randbytes(self.rng.randint(1024, 256 * 1024)))
+                self._write(f"office/report_{copy}{extension}", buffer.getvalue(),
+                            kind='office', mime=mime, status='正常')
+    
+    def add_text(self, copies: int):
+        # 每个文件以一个内容分类的关键词为主，混入少量其他分类的关键词
+        categories = list(DEFAULT_KEYWORDS)
+        for category in categories:
+            words = list(DEFAULT_KEYWORDS[category])
+            others = [word for other in categories if other != category for word in DEFAULT_KEYWORDS[other]]
+            for copy in range(copies):
+                parts = []
+                for _ in range(self.rng.randint(20, 400)):
+                    parts.append(FILLER)
+                    if self.rng.random() < 0.3:
+                        parts.append(self.rng.choice(words))
+                    if self.rng.random() < 0.03:
+                        parts.append(self.rng.choice(others))
+                parts.append(self.rng.choice(words) * 3)
+                self._write(f"text/{category}_{copy}.txt", ''.join(parts).encode('utf-8'),
+                            kind='text', mime='text/plain', status='正常', content=category)
+    
+    def add_collisions(self, count: int):
+        # 大量同名文件，分散在不同子目录中
+        signature = self.by_mime['image/jpeg']
+        for number in range(count):
+            self._write(f"collisions/{number:05d}/IMG_0001.jpg", self._binary(signature, self.rng.randint(512, 8192)),
+                        kind='collision', mime='image/jpeg', status='正常')
+    
+    def build(self) -> List[Dict]:
+        self.add_signatures(self._count(4))
+        self.add_disguised(self._count(3))
+        self.add_office(self._count(4))
+        self.add_text(self._count(8))
+        self.add_collisions(self._count(500))
+        return self.manifest
+
+
+def generate_corpus(root: Path, seed: int = 0, scale: float = 1.0) -> List[Dict]:
+    # 相同的 seed 和 scale 总是生成完全相同的文件
+    return CorpusBuilder(root, seed, scale).build()
\ No newline at end of file
@@ -0,0 +1,177 @@
+import argparse
+import hashlib
+import os
+import random
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+REPO = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(REPO))
+
+from smartbin.config import Config
+from smartbin.file_processor import FileProcessor
+from smartbin.fileops import PARTIAL_SUFFIX
+
+EXTENSIONS = ['.jpg', '.png', '.txt', '.pdf', '.mp3', '.zip', '.py', '.bin']
+
+
+def digest(path: Path) -> str:
+    return hashlib.blake2b(path.read_bytes(), digest_size=16).hexdigest()
+
+
+def make_corpus(inbox: Path, files: int, max_size: int, rng: random.Random) -> dict:
+    # 内容各不相同的文件，部分文件名重复（触发改名），另有一个作为整体移动的 .app 文件夹
+    originals = {}
+    for i in range(files):
+        path = inbox / f"dir{i % 7}" / f"file{i % (files // 3 or 1)}{EXTENSIONS[i % len(EXTENSIONS)]}"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(i.to_bytes(4, 'little') + rng.randbytes(rng.randint(0, max_size)))
+        originals[path] = digest(path)
+    for i in range(5):
+        path = inbox / "Tool.app" / "Contents" / f"part{i}.bin"
+        path.parent.mkdir(parents=True, exist_ok=True)
+        path.write_bytes(b'app' + rng.randbytes(rng.randint(0, max_size)))
+        originals[path] = digest(path)
+    return originals
+
+
+def setup(root: Path, target_base: Path, args, seed: int):
+    home = root / "home"
+    inbox = root / "inbox"
+    target = Path(tempfile.mkdtemp(prefix="smartbin-fault-target-", dir=str(target_base)))
+    originals = make_corpus(inbox, args.files, args.max_size, random.Random(seed))
+    
+    os.environ['HOME'] = os.environ['USERPROFILE'] = str(home)
+    config = Config()
+    config.config['target_directory'] = str(target)
+    config.config['durability'] = {'sync_every': args.sync_every, 'sync_interval': 0.2, 'fsync_copies': True}
+    config.save_config()
+    config.close()
+    return home, inbox, target, originals
+
+
+def organize(home: Path, inbox: Path, jobs: int) -> subprocess.Popen:
+    env = dict(os.environ, HOME=str(home), USERPROFILE=str(home), PYTHONPATH=str(REPO))
+    return subprocess.Popen([sys.executable, '-m', 'smartbin', 'organize', str(inbox), '-j', str(jobs)],
+                            env=env, stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+
+
+def all_files(*roots: Path):
+    for root in roots:
+        for path in root.rglob('*'):
+            if path.is_file():
+                yield path
+
+
+def verify(processor: FileProcessor, inbox: Path, target: Path, originals: dict) -> list:
+    problems = []
+    intents = processor.journal.conn.execute("SELECT COUNT(*) FROM intents").fetchone()[0]
+    if intents:
+        problems.append(f"恢复后仍有 {intents} 条意图")
+    
+    partials = [path for path in all_files(inbox, target) if path.name.endswith(PARTIAL_SUFFIX)]
+    if partials:
+        problems.append(f"残留临时文件: {partials[:3]}")
+    
+    # 每份原始内容恰好出现一次，没有多出的文件
+    found = {}
+    for path in all_files(inbox, target):
+        if not path.name.endswith(PARTIAL_SUFFIX):
+            found.setdefault(digest(path), []).append(path)
+    for path, content in originals.items():
+        copies = found.pop(content, [])
+        if len(copies) != 1:
+            problems.append(f"{path.name}: 找到 {len(copies)} 份")
+    if found:
+        problems.append(f"多出 {len(found)} 个文件")
+    
+    # 目标目录中的每个文件（或其所在的文件夹）都有历史记录
+    destinations = {row['destination'] for row in processor.journal.conn.execute("SELECT destination FROM operations")}
+    for path in all_files(target):
+        if not any(str(parent) in destinations for parent in (path, *path.parents)):
+            problems.append(f"没有历史记录: {path}")
+            break
+    return problems
+
+
+def verify_undo(processor: FileProcessor, target: Path, originals: dict) -> list:
+    summary = processor.undo_last_groups(1000000)
+    problems = []
+    if summary is not None and summary['failed']:
+        problems.append(f"撤销失败 {len(summary['failed'])} 个: {summary['failed'][0]['error']}")
+    for path, content in originals.items():
+        if not path.is_file() or digest(path) != content:
+            problems.append(f"撤销后未恢复: {path}")
+            break
+    left = list(all_files(target))
+    if left:
+        problems.append(f"撤销后目标目录仍有 {len(left)} 个文件")
+    return problems
+
+
+def trial(args, seed: int, delay) -> tuple:
+    root = Path(tempfile.mkdtemp(prefix="smartbin-fault-"))
+    target = None
+    try:
+        home, inbox, target, originals = setup(root, Path(args.cross_device or root), args, seed)
+        start = time.perf_counter()
+        process = organize(home, inbox, args.jobs)
+        if delay is None:
+            process.wait()
+        else:
+            try:
+                process.wait(delay)
+            except subprocess.TimeoutExpired:
+                process.kill()
+                process.wait()
+        elapsed = time.perf_counter() - start
+        
+        config = Config()
+        processor = FileProcessor(config)
+        moved = processor.journal.count()
+        problems = verify(processor, inbox, target, originals)
+        if not problems:
+            problems = verify_undo(processor, target, originals)
+        processor.journal.close()
+        processor.dedup.close()
+        config.close()
+        return elapsed, moved, len(originals), problems
+    finally:
+        shutil.rmtree(root, ignore_errors=True)
+        if target is not None:
+            shutil.rmtree(target, ignore_errors=True)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="在随机时刻强制结束整理进程，检查启动时的恢复是否完整")
+    parser.add_argument("--trials", type=int, default=20)
+    parser.add_argument("--files", type=int, default=300)
+    parser.add_argument("--max-size", type=int, default=256 * 1024, help="单个文件的最大字节数")
+    parser.add_argument("--jobs", "-j", type=int, default=1, help="整理进程的并行线程数")
+    parser.add_argument("--sync-every", type=int, default=64)
+    parser.add_argument("--cross-device", metavar="DIR", help="目标目录放在另一个文件系统上（如 /dev/shm），测试跨设备复制")
+    parser.add_argument("--seed", type=int, default=1)
+    args = parser.parse_args()
+    
+    rng = random.Random(args.seed)
+    # 先完整运行一次，确定强制结束的时间范围
+    elapsed, moved, total, problems = trial(args, args.seed, None)
+    print(f"完整运行: {elapsed:.2f}s，{moved} 条记录 / {total} 个文件 {'失败: ' + '; '.join(problems) if problems else '通过'}")
+    failures = bool(problems)
+    
+    for i in range(args.trials):
+        delay = rng.uniform(0, elapsed)
+        _, moved, total, problems = trial(args, args.seed + i + 1, delay)
+        status = '失败: ' + '; '.join(problems) if problems else '通过'
+        print(f"#{i + 1:<3} {delay * 1000:>7.0f} ms 后结束  已记录 {moved:>4} / {total}  {status}")
+        failures |= bool(problems)
+    
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
\ No newline at end of file
@@ -0,0 +1,287 @@
+import argparse
+import json
+import os
+import platform
+import shutil
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+sys.path.insert(0, str(ROOT))
+
+from corpus import generate_corpus
+
+# 用于与基线比较的指标及方向：higher 越大越好，lower 越小越好
+METRICS = [
+    ('detect_file_type.files_per_sec', 'higher'),
+    ('detect_file_type.cached_files_per_sec', 'higher'),
+    ('analyze_content.files_per_sec', 'higher'),
+    ('hash.blake2b.mb_per_sec', 'higher'),
+    ('hash.sha256.mb_per_sec', 'higher'),
+    ('hash.crc32.mb_per_sec', 'higher'),
+    ('batch_process.serial.files_per_sec', 'higher'),
+    ('batch_process.parallel.files_per_sec', 'higher'),
+    ('batch_process.cross_device.mb_per_sec', 'higher'),
+    ('conflicts.10000.us_per_file', 'lower'),
+    ('memory.batch_peak_mb', 'lower'),
+]
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=str(ROOT), capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def make_config(home: Path, target: Path, **overrides):
+    # 使用真实的 Config，配置文件写在临时 HOME 中
+    os.environ['HOME'] = str(home)
+    from smartbin.config import Config
+    config = Config()
+    config.config['target_directory'] = str(target)
+    config.config.update(overrides)
+    return config
+
+
+def timed(func):
+    start = time.perf_counter()
+    value = func()
+    return time.perf_counter() - start, value
+
+
+def bench_detect(manifest):
+    from smartbin.file_recognizer import FileRecognizer
+    from smartbin.recognition_cache import RecognitionCache
+    
+    recognizer = FileRecognizer()
+    seconds, results = timed(lambda: [recognizer.detect_file_type(entry['path']) for entry in manifest])
+    correct = sum(
+        1 for entry, (category, mime, status) in zip(manifest, results)
+        if mime == entry['mime'] and status == entry['status']
+    )
+    
+    cached = FileRecognizer(cache=RecognitionCache())
+    for entry in manifest:
+        cached.detect_file_type(entry['path'])
+    cached_seconds, _ = timed(lambda: [cached.detect_file_type(entry['path']) for entry in manifest])
+    
+    mismatches = [
+        {'path': entry['path'], 'expected': [entry['mime'], entry['status']], 'actual': [mime, status]}
+        for entry, (category, mime, status) in zip(manifest, results)
+        if mime != entry['mime'] or status != entry['status']
+    ]
+    return {
+        'files': len(manifest),
+        'seconds': seconds,
+        'files_per_sec': len(manifest) / seconds,
+        'cached_files_per_sec': len(manifest) / cached_seconds,
+        'accuracy': correct / len(manifest),
+        'mismatches': mismatches[:20],
+    }
+
+
+def bench_content(manifest):
+    from smartbin.file_recognizer import FileRecognizer
+    
+    texts = [entry for entry in manifest if entry['kind'] == 'text']
+    recognizer = FileRecognizer()
+    seconds, results = timed(lambda: [recognizer._analyze_content(entry['path']) for entry in texts])
+    correct = sum(1 for entry, category in zip(texts, results) if category == entry['content'])
+    return {
+        'files': len(texts),
+        'files_per_sec': len(texts) / seconds,
+        'mb_per_sec': sum(entry['size'] for entry in texts) / seconds / 1e6,
+        'accuracy': correct / len(texts),
+    }
+
+
+def bench_hash(manifest, home: Path, work: Path):
+    from smartbin.fileops import available_hash_algorithms
+    from smartbin.file_processor import FileProcessor
+    
+    total = sum(entry['size'] for entry in manifest)
+    results = {}
+    for algorithm in available_hash_algorithms():
+        processor = FileProcessor(make_config(home, work / "hash-out", hash_algorithm=algorithm))
+        seconds, _ = timed(lambda: [processor._calculate_file_hash(Path(entry['path'])) for entry in manifest])
+        processor.journal.close()
+        results[algorithm] = {'mb_per_sec': total / seconds / 1e6, 'seconds': seconds}
+    return results
+
+
+def run_batch(manifest_paths, config, parallel: bool, trace: bool = False):
+    from smartbin.file_processor import FileProcessor
+    from smartbin.file_recognizer import FileRecognizer
+    
+    processor = FileProcessor(config)
+    recognizer = FileRecognizer()
+    if trace:
+        tracemalloc.start()
+    seconds, results = timed(lambda: processor.batch_process(manifest_paths, recognizer, parallel=parallel))
+    peak = None
+    if trace:
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+    processor.journal.close()
+    processor.dedup.close()
+    return seconds, results, peak
+
+
+def bench_batch(args, home: Path, work: Path):
+    results = {}
+    modes = [('serial', False, None), ('parallel', True, None)]
+    if args.cross_device:
+        modes.append(('cross_device', False, Path(args.cross_device)))
+    
+    for name, parallel, target_root in modes:
+        corpus_dir = work / f"batch-{name}"
+        manifest = generate_corpus(corpus_dir, args.seed, args.scale)
+        target = (target_root or work) / f"smartbin-out-{name}-{os.getpid()}"
+        config = make_config(home, target, hash_mode='copy')
+        try:
+            seconds, outcomes, _ = run_batch([entry['path'] for entry in manifest], config, parallel)
+        finally:
+            shutil.rmtree(target, ignore_errors=True)
+            shutil.rmtree(corpus_dir, ignore_errors=True)
+        total = sum(entry['size'] for entry in manifest)
+        # 伪装文件按设计会被拒绝，单独计数
+        disguised = {entry['path'] for entry in manifest if entry['status'] == '伪装文件'}
+        rejected = [outcome for outcome in outcomes if not outcome['success']]
+        results[name] = {
+            'files': len(manifest),
+            'seconds': seconds,
+            'files_per_sec': len(manifest) / seconds,
+            'mb_per_sec': total / seconds / 1e6,
+            'disguised_rejected': sum(1 for outcome in rejected if outcome.get('source') in disguised),
+            'failed': sum(1 for outcome in rejected if outcome.get('source') not in disguised),
+        }
+    return results
+
+
+def bench_conflicts(home: Path, work: Path, files: int = 200):
+    from smartbin.file_processor import FileProcessor
+    
+    results = {}
+    for collisions in (10, 1000, 10000):
+        target_dir = work / f"conflicts-{collisions}" / "图片"
+        target_dir.mkdir(parents=True)
+        (target_dir / "IMG_0001.jpg").touch()
+        for i in range(1, collisions):
+            (target_dir / f"IMG_0001({i}).jpg").touch()
+        processor = FileProcessor(make_config(home, target_dir.parent))
+        source = Path("IMG_0001.jpg")
+        # 第一次调用扫描目录建立名称索引，之后每个文件只查索引
+        build_seconds, _ = timed(lambda: processor._get_unique_target_path(source, target_dir))
+        seconds, _ = timed(lambda: [processor._get_unique_target_path(source, target_dir) for _ in range(files)])
+        processor.journal.close()
+        results[str(collisions)] = {'index_build_ms': build_seconds * 1000, 'us_per_file': seconds / files * 1e6}
+        shutil.rmtree(target_dir.parent, ignore_errors=True)
+    return results
+
+
+def bench_memory(args, home: Path, work: Path):
+    corpus_dir = work / "memory"
+    manifest = generate_corpus(corpus_dir, args.seed, args.scale)
+    config = make_config(home, work / "memory-out")
+    _, _, peak = run_batch([entry['path'] for entry in manifest], config, parallel=False, trace=True)
+    shutil.rmtree(corpus_dir, ignore_errors=True)
+    result = {'batch_peak_mb': peak / 1e6}
+    try:
+        import resource
+        # Linux 上 ru_maxrss 的单位是 KB，macOS 上是字节
+        scale = 1 if sys.platform == 'darwin' else 1024
+        result['max_rss_mb'] = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * scale / 1e6
+    except ImportError:
+        pass
+    return result
+
+
+def lookup(results, dotted: str):
+    value = results
+    for part in dotted.split('.'):
+        if not isinstance(value, dict) or part not in value:
+            return None
+        value = value[part]
+    return value
+
+
+def compare(baseline, current, tolerance: float) -> int:
+    regressions = 0
+    print(f"{'metric':<42} {'baseline':>12} {'current':>12} {'change':>8}", file=sys.stderr)
+    for metric, direction in METRICS:
+        before = lookup(baseline['results'], metric)
+        after = lookup(current['results'], metric)
+        if before is None or after is None or before == 0:
+            continue
+        change = (after - before) / before
+        worse = change < -tolerance if direction == 'higher' else change > tolerance
+        regressions += worse
+        flag = '  REGRESSION' if worse else ''
+        print(f"{metric:<42} {before:>12.2f} {after:>12.2f} {change:>+7.1%}{flag}", file=sys.stderr)
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="SmartBin 基准测试套件（结果以 JSON 输出）")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--scale", type=float, default=1.0, help="语料规模倍数")
+    parser.add_argument("--output", "-o", help="结果写入文件（默认输出到标准输出）")
+    parser.add_argument("--cross-device", help="另一个文件系统上的目录，用于测量跨设备移动的吞吐量")
+    parser.add_argument("--compare", help="与之前保存的结果比较，有指标退化时返回 1")
+    parser.add_argument("--tolerance", type=float, default=0.10, help="允许的退化比例（默认 10%%）")
+    args = parser.parse_args()
+    
+    work = Path(tempfile.mkdtemp(prefix="smartbin-suite-"))
+    home = work / "home"
+    home.mkdir()
+    try:
+        manifest = generate_corpus(work / "corpus", args.seed, args.scale)
+        results = {
+            'detect_file_type': bench_detect(manifest),
+            'analyze_content': bench_content(manifest),
+            'hash': bench_hash(manifest, home, work),
+            'batch_process': bench_batch(args, home, work),
+            'conflicts': bench_conflicts(home, work),
+            'memory': bench_memory(args, home, work),
+        }
+        report = {
+            'meta': {
+                'commit': git_commit(),
+                'timestamp': time.strftime('%Y-%m-%dT%H:%M:%S'),
+                'python': platform.python_version(),
+                'platform': platform.platform(),
+                'cpu_count': os.cpu_count(),
+                'seed': args.seed,
+                'scale': args.scale,
+                'corpus_files': len(manifest),
+                'corpus_bytes': sum(entry['size'] for entry in manifest),
+            },
+            'results': results,
+        }
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+    
+    text = json.dumps(report, indent=2, ensure_ascii=False)
+    if args.output:
+        Path(args.output).write_text(text + "\n", encoding='utf-8')
+    else:
+        print(text)
+    
+    if args.compare:
+        with open(args.compare, 'r', encoding='utf-8') as f:
+            baseline = json.load(f)
+        for key in ('seed', 'scale'):
+            if baseline['meta'].get(key) != report['meta'][key]:
+                print(f"警告: 基线的 {key} 为 {baseline['meta'].get(key)}，与本次运行不同，结果不可直接比较", file=sys.stderr)
+        return 1 if compare(baseline, report, args.tolerance) else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
\ No newline at end of file
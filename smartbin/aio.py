@@ -0,0 +1,206 @@
+import asyncio
+from contextlib import asynccontextmanager
+from concurrent.futures import ThreadPoolExecutor
+from itertools import islice
+from typing import AsyncIterable, AsyncIterator, Dict, Iterable, List, Optional, Tuple, Union
+
+
+# asyncio 接口：所有阻塞的文件读写都在一个固定大小的线程池中执行（不会为每个文件创建线程），
+# 同时进行的文件数由信号量限制；process() 按完成顺序逐个产出结果，调用方处理得慢时自动停止读取新的输入。
+# 同步接口（FileRecognizer / FileProcessor）保持不变，两者可以共用同一组对象。
+class AsyncProcessor:
+    def __init__(self, processor, recognizer, concurrency: int = 16, timeout: Optional[float] = None):
+        self.processor = processor
+        self.recognizer = recognizer
+        self.concurrency = max(1, concurrency)
+        # 单个文件的默认超时（秒）；None 表示不限时
+        self.timeout = timeout
+        self.executor = ThreadPoolExecutor(max_workers=self.concurrency, thread_name_prefix="smartbin-aio")
+        self._semaphore = None
+    
+    async def __aenter__(self):
+        return self
+    
+    async def __aexit__(self, *exc_info):
+        # 等待线程池退出时不阻塞事件循环
+        await asyncio.get_running_loop().run_in_executor(None, self.close)
+    
+    def close(self):
+        self.executor.shutdown(wait=True)
+    
+    @property
+    def semaphore(self) -> asyncio.Semaphore:
+        # 在事件循环中首次使用时创建
+        if self._semaphore is None:
+            self._semaphore = asyncio.Semaphore(self.concurrency)
+        return self._semaphore
+    
+    async def _run(self, func, *args):
+        async with self.semaphore:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+    
+    async def detect_file_type(self, file_path: str) -> Tuple[str, str, str]:
+        return await self._run(self.recognizer.detect_file_type, file_path)
+    
+    async def classify(self, file_path: str) -> Tuple[str, str, str]:
+        return await self._run(self.processor.classify, self.recognizer, file_path)
+    
+    async def process_file(self, file_path: str, timeout: Optional[float] = None) -> Dict:
+        # 识别并归档一个文件；超时只作用于识别阶段，文件一旦开始移动就会完成并写入历史记录，
+        # 返回的结果始终与磁盘上的实际状态一致
+        async with self._journal_batch():
+            return await self._process_one(file_path, timeout, set())
+    
+    @asynccontextmanager
+    async def _journal_batch(self):
+        # 批次开始和结束时的数据库写入也在线程池中执行
+        loop = asyncio.get_running_loop()
+        batch = self.processor.journal.batch()
+        await loop.run_in_executor(self.executor, batch.__enter__)
+        try:
+            yield
+        finally:
+            await loop.run_in_executor(self.executor, batch.__exit__, None, None, None)
+    
+    async def _process_one(self, file_path: str, timeout: Optional[float], moving: set) -> Dict:
+        timeout = self.timeout if timeout is None else timeout
+        if timeout is None:
+            # 不限时的文件在一次线程池调用中完成识别和移动，减少线程切换
+            return await self._shielded(moving, self._classify_and_place, file_path)
+        try:
+            category, mime_type, status = await asyncio.wait_for(self.classify(file_path), timeout)
+        except asyncio.TimeoutError:
+            self.processor.metrics.inc('timeouts')
+            return {
+                'success': False,
+                'error': '处理超时',
+                'source': file_path
+            }
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'source': file_path
+            }
+        
+        if status == "伪装文件":
+            self.processor.metrics.inc('disguised_files')
+            return {
+                'success': False,
+                'error': f'检测到伪装文件: {mime_type}',
+                'source': file_path
+            }
+        
+        return await self._shielded(moving, self._place, file_path, category)
+    
+    async def _shielded(self, moving: set, func, *args) -> Dict:
+        async with self.semaphore:
+            future = asyncio.get_running_loop().run_in_executor(self.executor, func, *args)
+            moving.add(future)
+            future.add_done_callback(moving.discard)
+            # 取消只会停止等待，正在进行的移动不会被打断
+            return await asyncio.shield(future)
+    
+    def _classify_and_place(self, file_path: str) -> Dict:
+        # 识别和移动共用一次打开
+        with self.processor.inspect(self.recognizer, file_path) as inspection:
+            try:
+                category, mime_type, status = self.processor.classify(self.recognizer, file_path, inspection)
+            except Exception as e:
+                return {
+                    'success': False,
+                    'error': str(e),
+                    'source': file_path
+                }
+            if status == "伪装文件":
+                self.processor.metrics.inc('disguised_files')
+                return {
+                    'success': False,
+                    'error': f'检测到伪装文件: {mime_type}',
+                    'source': file_path
+                }
+            return self._place(file_path, category, inspection)
+    
+    def _place(self, file_path: str, category: str, inspection=None) -> Dict:
+        try:
+            return self.processor.process_file(file_path, category, inspection)
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'source': file_path
+            }
+    
+    async def _iterate(self, file_paths: Union[Iterable[str], AsyncIterable[str]]) -> AsyncIterator[str]:
+        if hasattr(file_paths, '__aiter__'):
+            async for file_path in file_paths:
+                yield file_path
+            return
+        # 同步的输入（如 walker.iter_paths）可能要遍历目录，按块在线程池中读取，避免阻塞事件循环
+        iterator = iter(file_paths)
+        loop = asyncio.get_running_loop()
+        while True:
+            chunk = await loop.run_in_executor(self.executor, list, islice(iterator, self.concurrency))
+            if not chunk:
+                return
+            for file_path in chunk:
+                yield file_path
+    
+    async def process(self, file_paths: Union[Iterable[str], AsyncIterable[str]],
+                      timeout: Optional[float] = None) -> AsyncIterator[Dict]:
+        # 按完成顺序产出每个文件的结果；一次调用的所有操作为一个批次，可整批撤销
+        stream = self._stream(file_paths, timeout)
+        try:
+            async for index, result in stream:
+                yield result
+        finally:
+            await stream.aclose()
+    
+    async def batch_process(self, file_paths: Union[Iterable[str], AsyncIterable[str]],
+                            timeout: Optional[float] = None) -> List[Dict]:
+        # 与 FileProcessor.batch_process 相同，结果按输入顺序返回
+        results = {}
+        async for index, result in self._stream(file_paths, timeout):
+            results[index] = result
+        return [results[index] for index in range(len(results))]
+    
+    async def _stream(self, file_paths: Union[Iterable[str], AsyncIterable[str]],
+                      timeout: Optional[float]) -> AsyncIterator[Tuple[int, Dict]]:
+        # 提前退出循环或任务被取消时，尚未开始移动的文件不再处理，已开始的移动会等待完成后再结束批次
+        inputs = self._iterate(file_paths)
+        pending = {}
+        moving = set()
+        next_index = 0
+        exhausted = False
+        try:
+            async with self._journal_batch():
+                try:
+                    while True:
+                        # 已完成但尚未被调用方取走的结果也计入上限，调用方处理得慢时不再读取新的输入
+                        while not exhausted and len(pending) < self.concurrency:
+                            try:
+                                file_path = await inputs.__anext__()
+                            except StopAsyncIteration:
+                                exhausted = True
+                                break
+                            task = asyncio.ensure_future(self._process_one(file_path, timeout, moving))
+                            pending[task] = next_index
+                            next_index += 1
+                        if not pending:
+                            return
+                        
+                        done, _ = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+                        for task in done:
+                            index = pending.pop(task)
+                            result = task.result()
+                            self.processor.count_result(result)
+                            yield index, result
+                finally:
+                    for task in pending:
+                        task.cancel()
+                    if pending:
+                        await asyncio.wait(pending)
+                    if moving:
+                        await asyncio.wait(list(moving))
+        finally:
+            await inputs.aclose()
\ No newline at end of file
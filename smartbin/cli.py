@@ -0,0 +1,239 @@
+import argparse
+import json
+import os
+import sys
+import time
+from pathlib import Path
+from typing import Dict, Iterator, List, Optional
+
+from smartbin.config import Config
+from smartbin.file_recognizer import FileRecognizer
+from smartbin.file_processor import FileProcessor
+from smartbin.journal import OperationRecord
+from smartbin.keywords import build_matcher
+from smartbin.metrics import Metrics, create_metrics, profiled
+from smartbin.recognition_cache import create_cache
+from smartbin.walker import iter_paths, walk_options
+
+EXIT_OK = 0
+EXIT_FAILURES = 1
+EXIT_USAGE = 2
+EXIT_INTERRUPTED = 130
+
+def _to_json(value):
+    # 结果中的 operation 是紧凑的 OperationRecord，输出时才转换为字典
+    if isinstance(value, OperationRecord):
+        return value.as_dict()
+    raise TypeError(f"无法序列化 {type(value).__name__}")
+
+
+def _emit(record: Dict):
+    sys.stdout.write(json.dumps(record, ensure_ascii=False, default=_to_json) + "\n")
+
+
+def _plan(processor: FileProcessor, file_path: str, classification, reserved: set) -> Dict:
+    category, mime_type, status = classification
+    record = {'source': file_path, 'category': category, 'mime_type': mime_type, 'status': status}
+    if status == "伪装文件":
+        record.update(success=False, error=f'检测到伪装文件: {mime_type}')
+        return record
+    if status == "错误":
+        record.update(success=False, error=mime_type)
+        return record
+    
+    # 与实际整理相同的冲突策略（skip / overwrite / dedup）；processor 为 dry_run 模式，不占用名称也不改动文件，
+    # 本次计划中已使用的目标路径记录在 reserved 中
+    try:
+        target = processor._resolve_target(Path(file_path), category, reserved)
+    except Exception as e:
+        record.update(success=False, error=str(e))
+        return record
+    if isinstance(target, dict):
+        record.update(target)
+    else:
+        record.update(success=True, destination=str(target))
+    if record.get('destination'):
+        reserved.add(Path(record['destination']))
+    return record
+
+
+def organize(args) -> int:
+    config = Config()
+    if args.target:
+        config.config['target_directory'] = os.path.abspath(args.target)
+    if args.jobs > 1:
+        config.config['parallel'] = dict(
+            config.config.get('parallel', {}),
+            recognize_workers=args.jobs,
+            move_workers=args.jobs,
+            hash_workers=max(1, args.jobs // 2)
+        )
+    
+    metrics = create_metrics(config)
+    if args.trace and not metrics.enabled:
+        metrics = Metrics()
+    recognizer = FileRecognizer(cache=create_cache(config), keyword_matcher=build_matcher(config.config.get('content_analysis')),
+                                metrics=metrics, sniff_unknown=config.config.get('sniff_text', True))
+    processor = FileProcessor(config, metrics, dry_run=args.dry_run)
+    
+    with metrics.trace(args.trace), profiled(args.profile):
+        options = walk_options(config, recognizer)
+        if args.processes > 1:
+            return _organize_sharded(args, processor, options)
+        paths = iter_paths(args.paths, recursive=not args.no_recursive, **options)
+        return _organize(args, processor, recognizer, paths)
+
+
+def _organize_sharded(args, processor: FileProcessor, options: Dict) -> int:
+    # 多进程模式：工作进程遍历目录并识别，移动在当前进程中完成
+    from smartbin.sharding import ShardedScanner
+    
+    scanner = ShardedScanner(processor.config, args.processes, recursive=not args.no_recursive, walk_options=options)
+    
+    def report(progress):
+        if args.verbose:
+            print(f"已扫描 {progress['directories']} 个目录，识别 {progress['recognized']} 个文件，"
+                  f"已处理 {progress['processed']} 个（失败 {progress['failed']} 个），"
+                  f"{progress['files_per_sec']:.0f} 个/秒", file=sys.stderr)
+    
+    if args.dry_run:
+        reserved = set()
+        failures = 0
+        for file_path, *classification in scanner.scan(args.paths):
+            record = _plan(processor, file_path, classification, reserved)
+            failures += not record['success']
+            _emit(record)
+        sys.stdout.flush()
+        return EXIT_FAILURES if failures else EXIT_OK
+    
+    # 结束时 run() 会再输出一次最终的汇总
+    summary = scanner.run(processor, args.paths, callback=_emit, progress=report, progress_interval=5.0)
+    sys.stdout.flush()
+    return EXIT_FAILURES if summary['failed'] else EXIT_OK
+
+
+def _organize(args, processor: FileProcessor, recognizer: FileRecognizer, paths: Iterator[str]) -> int:
+    failures = 0
+    total = 0
+    started = time.perf_counter()
+    
+    if args.dry_run:
+        reserved = set()
+        for file_path in paths:
+            record = _plan(processor, file_path, processor.classify(recognizer, file_path), reserved)
+            failures += not record['success']
+            total += 1
+            _emit(record)
+    else:
+        def emit_result(index, result):
+            _emit(result)
+        
+        # 整次运行为一个批次，可以整批撤销；结果逐条输出，历史记录分批写入，内存占用与目录大小无关
+        summary = processor.process_stream(paths, recognizer, parallel=args.jobs > 1, callback=emit_result)
+        failures = summary['failed']
+        total = summary['processed']
+    
+    sys.stdout.flush()
+    if args.verbose:
+        elapsed = time.perf_counter() - started
+        print(f"共 {total} 个文件，失败 {failures} 个，耗时 {elapsed:.2f}s", file=sys.stderr)
+    return EXIT_FAILURES if failures else EXIT_OK
+
+
+def undo(args) -> int:
+    config = Config()
+    processor = FileProcessor(config)
+    summary = processor.undo_last_groups(args.groups, verify=args.verify, workers=args.jobs)
+    if summary is None:
+        print("没有可撤销的操作", file=sys.stderr)
+        return EXIT_OK
+    
+    for failure in summary['failed']:
+        operation = failure['operation']
+        _emit({'source': operation['destination'], 'destination': operation['source'],
+               'success': False, 'error': failure['error']})
+    sys.stdout.flush()
+    if args.verbose:
+        print(f"已撤销 {summary['undone']} 个文件，失败 {len(summary['failed'])} 个", file=sys.stderr)
+    return EXIT_OK if summary['success'] else EXIT_FAILURES
+
+
+def watch(args) -> int:
+    # 守护模式：只运行热区监控，不加载图形界面
+    from smartbin.main import watch_config
+    from smartbin.watcher import HotZoneWatcher
+    
+    config = Config()
+    metrics = create_metrics(config, serve=True)
+    recognizer = FileRecognizer(cache=create_cache(config), keyword_matcher=build_matcher(config.config.get('content_analysis')),
+                                metrics=metrics, sniff_unknown=config.config.get('sniff_text', True))
+    processor = FileProcessor(config, metrics)
+    
+    def process(files):
+        for result in processor.batch_process(files, recognizer):
+            _emit(result)
+        sys.stdout.flush()
+    
+    watch_config(config, recognizer)
+    watcher = HotZoneWatcher(config, processor, recognizer, on_batch=process)
+    if not watcher.zones:
+        print("没有可监控的热区，请在配置文件的 hot_zones.zones 中添加目录", file=sys.stderr)
+        return EXIT_USAGE
+    
+    watcher.start()
+    try:
+        while watcher.thread.is_alive():
+            watcher.thread.join(1.0)
+    finally:
+        watcher.stop()
+    # 监控线程异常退出（如输出结果失败）时以失败状态退出，异常信息已由线程输出
+    return EXIT_FAILURES if watcher.error is not None else EXIT_OK
+
+
+def build_parser() -> argparse.ArgumentParser:
+    parser = argparse.ArgumentParser(prog="smartbin", description="SmartBin 智能归档箱")
+    subparsers = parser.add_subparsers(dest="command")
+    
+    organize_parser = subparsers.add_parser("organize", help="整理指定的文件或目录（不启动图形界面）")
+    organize_parser.add_argument("paths", nargs="+", help="要整理的文件或目录")
+    organize_parser.add_argument("--dry-run", action="store_true", help="只输出计划，不移动文件")
+    organize_parser.add_argument("--jobs", "-j", type=int, default=1, help="并行线程数（默认 1，串行）")
+    organize_parser.add_argument("--processes", "-P", type=int, default=1,
+                                 help="用多个进程遍历目录和识别文件（适合一次性整理大量文件）")
+    organize_parser.add_argument("--target", help="临时指定目标目录（不写入配置）")
+    organize_parser.add_argument("--no-recursive", action="store_true", help="不递归进入子目录")
+    organize_parser.add_argument("--verbose", "-v", action="store_true", help="在标准错误输出汇总信息")
+    organize_parser.add_argument("--profile", metavar="FILE", help="用 cProfile 分析本次运行，结果写入 FILE（只分析主线程）")
+    organize_parser.add_argument("--trace", metavar="FILE", help="记录各阶段耗时（含工作线程），以 Chrome trace 格式写入 FILE")
+    organize_parser.set_defaults(func=organize)
+    
+    undo_parser = subparsers.add_parser("undo", help="整批撤销最近的处理")
+    undo_parser.add_argument("--groups", "-n", type=int, default=1, help="撤销最近几个批次（默认 1）")
+    undo_parser.add_argument("--verify", action="store_true", help="移回前按记录的大小和哈希校验文件")
+    undo_parser.add_argument("--jobs", "-j", type=int, default=8, help="并行线程数（默认 8）")
+    undo_parser.add_argument("--verbose", "-v", action="store_true", help="在标准错误输出汇总信息")
+    undo_parser.set_defaults(func=undo)
+    
+    watch_parser = subparsers.add_parser("watch", help="以守护模式运行热区监控")
+    watch_parser.set_defaults(func=watch)
+    
+    gui_parser = subparsers.add_parser("gui", help="启动图形界面（默认）")
+    gui_parser.set_defaults(func=None)
+    return parser
+
+
+def main(argv: Optional[List[str]] = None) -> int:
+    args = build_parser().parse_args(argv)
+    
+    if getattr(args, 'func', None) is None:
+        from smartbin.main import main as gui_main
+        return gui_main()
+    
+    if getattr(args, 'jobs', 1) < 1 or getattr(args, 'processes', 1) < 1:
+        print("--jobs 和 --processes 必须大于 0", file=sys.stderr)
+        return EXIT_USAGE
+    
+    try:
+        return args.func(args)
+    except KeyboardInterrupt:
+        return EXIT_INTERRUPTED
\ No newline at end of file
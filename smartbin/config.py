@@ -1,6 +1,16 @@
+import atexit
+import copy
 import json
 import os
+import tempfile
+import threading
 from pathlib import Path
+from typing import Callable, Dict, Optional, Set
+
+from smartbin.rules import RuleSet
+
+# save_config 之后等待多久再写盘，期间的多次修改合并为一次写入
+SAVE_DELAY = 0.5
 
 class Config:
     def __init__(self):
@@ -23,10 +33,63 @@ class Config:
             },
             "custom_rules": [],
             "conflict_strategy": "rename",
+            "dedup_action": "skip",
+            "hash_algorithm": "blake2b",
+            "hash_mode": "copy",
             "enable_content_analysis": False,
+            "sniff_text": True,
+            "content_analysis": {
+                "max_bytes": 12288,
+                "chunk_size": 65536,
+                "min_score": 2.0,
+                "confidence": 12.0
+            },
+            "parallel": {
+                "enabled": False,
+                "recognize_workers": 4,
+                "move_workers": 2,
+                "hash_workers": 2,
+                "queue_size": 64,
+                "undo_workers": 8
+            },
+            "recognition_cache": {
+                "enabled": True,
+                "max_entries": 100000,
+                "persistent": False
+            },
+            "metrics": {
+                "enabled": False,
+                "snapshot": True,
+                "snapshot_interval": 10.0,
+                "prometheus_host": "127.0.0.1",
+                "prometheus_port": 0
+            },
+            "folders": {
+                "expand": True,
+                "max_depth": None,
+                "ignore": [".git", ".svn", ".hg", "node_modules", "__pycache__", ".DS_Store", "Thumbs.db", "desktop.ini"],
+                "follow_symlinks": False,
+                "keep_together": ["*.app", "*.bundle", "*.photoslibrary"]
+            },
+            "durability": {
+                "sync_every": 64,
+                "sync_interval": 0.2,
+                "fsync_copies": True
+            },
+            "similarity": {
+                "enabled": False,
+                "min_size": 1048576,
+                "avg_chunk": 65536,
+                "sketch_size": 64,
+                "threshold": 0.5
+            },
             "hot_zones": {
                 "enabled": False,
-                "zones": []
+                "zones": [],
+                "settle_seconds": 2.0,
+                "batch_delay": 0.5,
+                "max_batch": 500,
+                "poll_interval": 2.0
             },
             "ui_settings": {
                 "transparency": 0.9,
@@ -36,29 +99,180 @@ class Config:
         }
         
         self.config = {}
+        # 每个顶层配置项的版本号，内容变化时递增；派生的查找表（如编译后的规则）据此判断是否需要重建
+        self.versions: Dict[str, int] = {}
+        self._fingerprints: Dict[str, str] = {}
+        self._unchecked = True
+        self._rules = None
+        self._rules_version = None
+        
+        self._lock = threading.RLock()
+        self._write_lock = threading.Lock()
+        self._dirty = False
+        self._snapshot = None
+        self._save_timer = None
+        self._file_state = None
+        self._listeners = []
+        self._watch_thread = None
+        self._watch_stop = threading.Event()
+        
         self.load_config()
+        atexit.register(self.close)
     
     def load_config(self):
         if self.config_file.exists():
             try:
-                with open(self.config_file, 'r', encoding='utf-8') as f:
-                    self.config = json.load(f)
+                self.config = self._read()
             except Exception as e:
                 print(f"加载配置失败: {e}")
-                self.config = self.default_config.copy()
+                # 保留损坏的文件，避免下次保存时被默认配置覆盖
+                try:
+                    os.replace(self.config_file, self.config_file.with_name(self.config_file.name + ".corrupt"))
+                except OSError:
+                    pass
+                self.config = copy.deepcopy(self.default_config)
+                self.save_config()
         else:
-            self.config = self.default_config.copy()
+            self.config = copy.deepcopy(self.default_config)
             self.save_config()
+        self._detect_changes()
         
         # 不再提前创建所有文件夹，只在需要时创建
     
+    def _read(self) -> Dict:
+        with open(self.config_file, 'r', encoding='utf-8') as f:
+            state = self._stat_file(f.fileno())
+            config = json.load(f)
+        if not isinstance(config, dict):
+            raise ValueError("配置文件格式错误")
+        self._file_state = state
+        return config
+    
+    def _stat_file(self, fd: Optional[int] = None):
+        try:
+            stat = os.fstat(fd) if fd is not None else os.stat(self.config_file)
+        except OSError:
+            return None
+        return (stat.st_ino, stat.st_size, stat.st_mtime_ns)
+    
     def save_config(self):
+        # 标记为待写入，由后台定时器合并写盘；需要立即落盘时再调用 flush()
+        # 写入的是调用时的配置快照：之后只在内存中做的临时修改（如命令行的 --target）不会被定时器写入文件
+        with self._lock:
+            try:
+                self._snapshot = json.dumps(self.config, indent=2, ensure_ascii=False)
+            except Exception as e:
+                print(f"保存配置失败: {e}")
+                return
+            self._unchecked = True
+            self._dirty = True
+            if self._save_timer is None:
+                self._save_timer = threading.Timer(SAVE_DELAY, self.flush)
+                self._save_timer.daemon = True
+                self._save_timer.start()
+    
+    def flush(self):
+        with self._write_lock:
+            with self._lock:
+                if self._save_timer is not None:
+                    self._save_timer.cancel()
+                    self._save_timer = None
+                if not self._dirty:
+                    return
+                data = self._snapshot
+                self._dirty = False
+            
+            try:
+                self._write_atomic(data)
+            except Exception as e:
+                print(f"保存配置失败: {e}")
+                with self._lock:
+                    self._dirty = True
+    
+    def _write_atomic(self, data: str):
+        # 先写临时文件并 fsync，再 rename 覆盖：任何时刻 config.json 都是完整的旧版本或新版本
+        self.config_dir.mkdir(parents=True, exist_ok=True)
+        fd, temp_path = tempfile.mkstemp(prefix=".config-", suffix=".tmp", dir=str(self.config_dir))
+        try:
+            with os.fdopen(fd, 'w', encoding='utf-8') as f:
+                f.write(data)
+                f.flush()
+                os.fsync(f.fileno())
+            os.replace(temp_path, self.config_file)
+        except BaseException:
+            try:
+                os.unlink(temp_path)
+            except OSError:
+                pass
+            raise
+        
+        if hasattr(os, 'O_DIRECTORY'):
+            dir_fd = os.open(self.config_dir, os.O_RDONLY | os.O_DIRECTORY)
+            try:
+                os.fsync(dir_fd)
+            finally:
+                os.close(dir_fd)
+        self._file_state = self._stat_file()
+    
+    def _detect_changes(self) -> Set[str]:
+        # 按顶层配置项比较内容，只有真正变化的项版本号才会递增
+        with self._lock:
+            changed = set()
+            for key in set(self.config) | set(self._fingerprints):
+                fingerprint = json.dumps(self.config.get(key), sort_keys=True, ensure_ascii=False)
+                if self._fingerprints.get(key) != fingerprint:
+                    self._fingerprints[key] = fingerprint
+                    self.versions[key] = self.versions.get(key, 0) + 1
+                    changed.add(key)
+            self._unchecked = False
+            return changed
+    
+    def section_version(self, *keys) -> tuple:
+        if self._unchecked:
+            self._detect_changes()
+        return tuple(self.versions.get(key, 0) for key in keys)
+    
+    def add_listener(self, callback: Callable[[Set[str]], None]):
+        # callback(changed_keys) 在外部修改配置文件并重新加载后调用（在监控线程中）
+        self._listeners.append(callback)
+    
+    def check_for_changes(self) -> Set[str]:
+        # 配置文件被外部修改（编辑器、脚本）时重新加载；本进程还有未写盘的修改时以本进程为准
+        state = self._stat_file()
+        if state is None or state == self._file_state or self._dirty:
+            return set()
         try:
-            self.config_dir.mkdir(parents=True, exist_ok=True)
-            with open(self.config_file, 'w', encoding='utf-8') as f:
-                json.dump(self.config, f, indent=2, ensure_ascii=False)
+            config = self._read()
         except Exception as e:
-            print(f"保存配置失败: {e}")
+            print(f"重新加载配置失败，继续使用当前配置: {e}")
+            self._file_state = state
+            return set()
+        
+        with self._lock:
+            self.config = config
+            changed = self._detect_changes()
+        for callback in self._listeners:
+            try:
+                callback(changed)
+            except Exception as e:
+                print(f"应用配置修改失败: {e}")
+        return changed
+    
+    def start_watching(self, interval: float = 1.0):
+        # 轮询修改时间：编辑器通常以"写临时文件再改名"的方式保存，轮询不受 inode 变化影响
+        if self._watch_thread is not None:
+            return
+        
+        def watch():
+            while not self._watch_stop.wait(interval):
+                self.check_for_changes()
+        
+        self._watch_thread = threading.Thread(target=watch, daemon=True)
+        self._watch_thread.start()
+    
+    def close(self):
+        self._watch_stop.set()
+        self.flush()
     
     def ensure_directories(self):
         target_dir = Path(self.config["target_directory"])
@@ -66,15 +280,22 @@ class Config:
             category_dir = target_dir / category
             category_dir.mkdir(parents=True, exist_ok=True)
     
+    def get_rules(self) -> RuleSet:
+        version = self.section_version("default_categories", "custom_rules")
+        if self._rules is None or self._rules_version != version:
+            self._rules = RuleSet(self.config.get("default_categories", {}), self.config.get("custom_rules", []))
+            self._rules_version = version
+        return self._rules
+    
     def get_category_for_extension(self, extension):
-        extension = extension.lower()
-        for category, extensions in self.config["default_categories"].items():
-            if extension in extensions:
-                return category
-        return "其他"
+        return self.get_rules().category_for_extension(extension) or "其他"
     
     def add_custom_rule(self, rule):
-        self.config["custom_rules"].append(rule)
+        self.config.setdefault("custom_rules", []).append(rule)
+        self.save_config()
+    
+    def add_custom_rules(self, rules):
+        self.config.setdefault("custom_rules", []).extend(rules)
         self.save_config()
     
     def get_target_directory(self):
@@ -0,0 +1,204 @@
+import hashlib
+import os
+import sqlite3
+import threading
+from collections import Counter
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+from smartbin.fileops import hash_file
+from smartbin.walker import iter_entries
+
+# 快速哈希读取的头尾块大小
+QUICK_BLOCK_SIZE = 64 * 1024
+SYNC_BATCH_SIZE = 1000
+
+
+def quick_hash(file_path, size: int) -> str:
+    hasher = hashlib.blake2b(digest_size=16)
+    hasher.update(size.to_bytes(8, 'little'))
+    with open(file_path, 'rb') as f:
+        hasher.update(f.read(QUICK_BLOCK_SIZE))
+        if size > 2 * QUICK_BLOCK_SIZE:
+            f.seek(size - QUICK_BLOCK_SIZE)
+            hasher.update(f.read(QUICK_BLOCK_SIZE))
+        elif size > QUICK_BLOCK_SIZE:
+            hasher.update(f.read())
+    return hasher.hexdigest()
+
+
+# 目标目录下所有文件的内容索引：大小 -> 头尾块哈希 -> 完整哈希，逐级确认重复
+class DedupIndex:
+    def __init__(self, db_file, hash_algorithm: str = 'blake2b'):
+        self.hash_algorithm = hash_algorithm
+        self._lock = threading.RLock()
+        self._sync_thread = None
+        self._stale = False
+        self.synced = False
+        
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_file), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS dedup_files (
+                path TEXT PRIMARY KEY,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                quick_hash TEXT,
+                full_hash TEXT
+            );
+            CREATE INDEX IF NOT EXISTS idx_dedup_size ON dedup_files(size);
+        """)
+        
+        # 每种文件大小的文件数量，绝大多数查询在这一步就能确定没有重复
+        self.sizes = Counter(dict(self.conn.execute("SELECT size, COUNT(*) FROM dedup_files GROUP BY size")))
+    
+    def __len__(self):
+        return sum(self.sizes.values())
+    
+    def add(self, file_path, stat: Optional[os.stat_result] = None, full_hash: Optional[str] = None):
+        file_path = str(file_path)
+        stat = stat or os.stat(file_path)
+        if full_hash and not full_hash.startswith(self.hash_algorithm + ':'):
+            full_hash = None
+        with self._lock:
+            self._remove_locked(file_path)
+            self.conn.execute(
+                "INSERT INTO dedup_files (path, size, mtime_ns, quick_hash, full_hash) VALUES (?, ?, ?, NULL, ?)",
+                (file_path, stat.st_size, stat.st_mtime_ns, full_hash)
+            )
+            self.sizes[stat.st_size] += 1
+    
+    def remove(self, file_path):
+        with self._lock:
+            self._remove_locked(str(file_path))
+    
+    def _remove_locked(self, file_path: str):
+        row = self.conn.execute("SELECT size FROM dedup_files WHERE path = ?", (file_path,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute("DELETE FROM dedup_files WHERE path = ?", (file_path,))
+        self.sizes[row[0]] -= 1
+        if self.sizes[row[0]] <= 0:
+            del self.sizes[row[0]]
+    
+    def find_duplicate(self, file_path, stat: Optional[os.stat_result] = None) -> Optional[str]:
+        try:
+            stat = stat or os.stat(file_path)
+        except OSError:
+            return None
+        
+        size = stat.st_size
+        if size not in self.sizes:
+            return None
+        
+        with self._lock:
+            candidates = self.conn.execute(
+                "SELECT path, mtime_ns, quick_hash, full_hash FROM dedup_files WHERE size = ?", (size,)
+            ).fetchall()
+        
+        source_quick = None
+        source_full = None
+        for path, mtime_ns, candidate_quick, candidate_full in candidates:
+            if os.path.abspath(path) == os.path.abspath(file_path):
+                continue
+            try:
+                candidate_stat = os.stat(path)
+            except OSError:
+                self.remove(path)
+                continue
+            if candidate_stat.st_size != size or candidate_stat.st_mtime_ns != mtime_ns:
+                # 文件已被外部修改，重新登记后参与比较
+                self.add(path, candidate_stat)
+                candidate_quick = candidate_full = None
+                if candidate_stat.st_size != size:
+                    continue
+            
+            try:
+                if source_quick is None:
+                    source_quick = quick_hash(file_path, size)
+                if candidate_quick is None:
+                    candidate_quick = quick_hash(path, size)
+                    self._update(path, quick_hash=candidate_quick)
+                if candidate_quick != source_quick:
+                    continue
+                
+                if source_full is None:
+                    source_full = hash_file(file_path, self.hash_algorithm)
+                if candidate_full is None:
+                    candidate_full = hash_file(path, self.hash_algorithm)
+                    self._update(path, full_hash=candidate_full)
+                if candidate_full == source_full:
+                    return path
+            except OSError:
+                continue
+        
+        return None
+    
+    def _update(self, file_path: str, **columns):
+        assignments = ', '.join(f"{name} = ?" for name in columns)
+        with self._lock:
+            self.conn.execute(f"UPDATE dedup_files SET {assignments} WHERE path = ?", (*columns.values(), file_path))
+    
+    def start_sync(self, roots: List[Path]) -> threading.Thread:
+        # 后台校验/重建：复用 scandir 的 stat 结果，只有大小或修改时间变化的文件才会作废哈希
+        # 每个进程只校验一次；mark_stale 之后再次调用时重新校验
+        with self._lock:
+            if self._sync_thread is not None and (self._sync_thread.is_alive() or not self._stale):
+                return self._sync_thread
+            self._stale = False
+            self._sync_thread = threading.Thread(target=self.sync, args=(list(roots),), daemon=True)
+            self._sync_thread.start()
+            return self._sync_thread
+    
+    def mark_stale(self):
+        # 有文件放入了目标目录但没有登记（当前的冲突策略不使用索引）
+        self._stale = True
+    
+    def sync(self, roots: List[Path]):
+        for root in roots:
+            self._sync_root(Path(root))
+        self.synced = True
+    
+    def _sync_root(self, root: Path):
+        prefix = str(root) + os.sep
+        with self._lock:
+            known: Dict[str, Tuple[int, int]] = {
+                path: (size, mtime_ns) for path, size, mtime_ns in self.conn.execute(
+                    "SELECT path, size, mtime_ns FROM dedup_files WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix)
+                )
+            }
+        
+        pending = []
+        for entry in iter_entries(root):
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            if known.pop(entry.path, None) != (stat.st_size, stat.st_mtime_ns):
+                pending.append((entry.path, stat))
+            if len(pending) >= SYNC_BATCH_SIZE:
+                self._apply_sync(pending, [])
+                pending = []
+        
+        self._apply_sync(pending, list(known))
+    
+    def _apply_sync(self, changed, removed):
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                for path in removed:
+                    self._remove_locked(path)
+                for path, stat in changed:
+                    self.add(path, stat)
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                self.sizes = Counter(dict(self.conn.execute("SELECT size, COUNT(*) FROM dedup_files GROUP BY size")))
+                raise
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
\ No newline at end of file
@@ -1,19 +1,92 @@
 import os
 import shutil
+import stat as stat_module
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 from datetime import datetime
-from typing import List, Dict, Optional
-import hashlib
+from typing import Callable, Dict, Iterable, List, Optional, Set, Union
 
+from smartbin.dedup import DedupIndex
+from smartbin.fileops import discard_partial, feed_file, hash_file, move_file, replaced_path
+from smartbin.inspection import FileInspection
+from smartbin.journal import OperationJournal, OperationRecord
+from smartbin.metrics import NULL_METRICS, Metrics
+from smartbin.names import NameIndexRegistry
+from smartbin.pipeline import BatchPipeline
+
+# 目标名称被其他进程抢占时，重新分配名称的最大次数
+MAX_PLACEMENT_ATTEMPTS = 100
+
+def classify_file(recognizer, rules, file_path: str, content_analysis: bool = False, inspection=None):
+    # 不依赖 FileProcessor 的分类逻辑，多进程扫描的工作进程也使用这个函数
+    # inspection：调用方已打开的文件（见 FileRecognizer.inspect），不传时在这里打开，用完即关闭
+    if inspection is None:
+        with recognizer.inspect(file_path, content_analysis) as inspection:
+            return classify_file(recognizer, rules, file_path, content_analysis, inspection)
+    
+    category, mime_type, status = recognizer.detect_file_type(file_path, inspection)
+    if status == "伪装文件":
+        return category, mime_type, status
+    
+    # 自定义规则优先；识别引擎无法归类时按 default_categories 的扩展名表归类
+    rule_category = rules.match(file_path, mime_type, inspection.stat())
+    if rule_category is None and category == "其他":
+        rule_category = rules.category_for_extension(os.path.splitext(file_path)[1])
+    if rule_category:
+        category = rule_category
+    
+    # 开启内容分析后，文本文件按内容放入分类下的子文件夹，如 文档/财务
+    if status == "正常" and content_analysis:
+        content_category = recognizer.analyze_content(file_path, inspection)
+        if content_category:
+            category = f"{category}/{content_category}"
+    return category, mime_type, status
+
+# dry_run：只计算目标位置（见 _resolve_target），不恢复中断的操作、不创建文件夹、不移动或链接文件，也不占用名称
 class FileProcessor:
-    def __init__(self, config):
+    def __init__(self, config, metrics: Optional[Metrics] = None, dry_run: bool = False):
         self.config = config
-        self.operations_log = []
+        self.metrics = metrics or NULL_METRICS
+        self.dry_run = dry_run
+        durability = config.config.get('durability', {})
+        self.journal = OperationJournal(config.db_file, durability.get('sync_every', 64), durability.get('sync_interval', 0.2))
+        self.names = NameIndexRegistry()
+        self.dedup = DedupIndex(config.db_file, config.config.get('hash_algorithm', 'blake2b'))
+        # 近似重复检测的内容指纹索引，开启后首次使用时创建（见 _similarity_index）
+        self.similarity = None
+        self._similarity_lock = threading.Lock()
+        
+        if not dry_run:
+            summary = self.recover_interrupted()
+            if summary['completed'] or summary['rolled_back']:
+                print(f"已恢复上次中断的操作：完成 {summary['completed']} 个，回滚 {summary['rolled_back']} 个")
+        
+        if config.config.get('conflict_strategy', 'rename') == 'dedup':
+            self._start_dedup_sync()
+        self._similarity_index()
     
-    def process_file(self, file_path: str, category: str) -> Dict:
+    def process_file(self, file_path: str, category: str, inspection: Optional[FileInspection] = None) -> Dict:
+        # inspection：识别时已打开的文件，移动和哈希复用其 stat 结果、描述符和缓冲区
         source_path = Path(file_path)
         
-        if not source_path.exists():
+        start = time.perf_counter()
+        target_path = self._resolve_target(source_path, category, inspection=inspection)
+        self.metrics.observe('resolve', start)
+        if isinstance(target_path, dict):
+            return target_path
+        
+        result = self._move(source_path, target_path, category, inspection)
+        if result['success']:
+            result = self._record(result, inspection=inspection)
+        return result
+    
+    def _resolve_target(self, source_path: Path, category: str, reserved: Optional[Set[Path]] = None,
+                        inspection: Optional[FileInspection] = None) -> Union[Path, Dict]:
+        exists = inspection.stat() is not None if inspection is not None else source_path.exists()
+        if not exists:
             return {
                 'success': False,
                 'error': '文件不存在',
@@ -21,13 +94,14 @@ class FileProcessor:
             }
         
         target_dir = self.config.get_target_directory() / category
-        target_dir.mkdir(parents=True, exist_ok=True)
+        if not self.dry_run:
+            target_dir.mkdir(parents=True, exist_ok=True)
         
         target_path = target_dir / source_path.name
         
         # 检查文件冲突策略
         strategy = self.config.config.get('conflict_strategy', 'rename')
-        if target_path.exists() and strategy == 'skip':
+        if strategy == 'skip' and (target_path.exists() or (reserved is not None and target_path in reserved)):
             return {
                 'success': True,
                 'source': str(source_path),
@@ -36,120 +110,536 @@ class FileProcessor:
                 'error': '文件已存在，已跳过'
             }
         
-        target_path = self._get_unique_target_path(source_path, target_dir)
+        if strategy == 'dedup' and (inspection.is_file() if inspection is not None else source_path.is_file()):
+            self._start_dedup_sync()
+            duplicate = self.dedup.find_duplicate(source_path, inspection.stat() if inspection is not None else None)
+            if duplicate:
+                self.metrics.inc('duplicates')
+                return self._handle_duplicate(source_path, target_dir, category, duplicate, reserved)
         
-        try:
-            shutil.move(str(source_path), str(target_path))
-            
-            operation = {
-                'timestamp': datetime.now().isoformat(),
-                'operation': 'move',
+        return self._get_unique_target_path(source_path, target_dir, reserved)
+    
+    def _category_roots(self) -> List[Path]:
+        target_dir = self.config.get_target_directory()
+        roots = [target_dir / category for category in self.config.get_rules().categories]
+        return [root for root in roots if root.is_dir()]
+    
+    def _start_dedup_sync(self):
+        self.dedup.start_sync(self._category_roots())
+    
+    def _similarity_index(self):
+        # 未开启近似重复检测时返回 None；开启后创建索引，并在后台为目标目录中已有的大文件补算指纹
+        settings = self.config.config.get('similarity', {})
+        if not settings.get('enabled', False):
+            return None
+        with self._similarity_lock:
+            if self.similarity is None:
+                # 只在开启时导入，不增加启动时间
+                from smartbin.similarity import (DEFAULT_AVG_CHUNK, DEFAULT_MIN_SIZE, DEFAULT_SKETCH_SIZE,
+                                                 DEFAULT_THRESHOLD, SimilarityIndex)
+                self.similarity = SimilarityIndex(self.config.db_file,
+                                                  settings.get('avg_chunk', DEFAULT_AVG_CHUNK),
+                                                  settings.get('sketch_size', DEFAULT_SKETCH_SIZE),
+                                                  settings.get('min_size', DEFAULT_MIN_SIZE),
+                                                  settings.get('threshold', DEFAULT_THRESHOLD))
+                self.similarity.start_sync(self._category_roots())
+            return self.similarity
+    
+    def _new_fingerprint(self, source_path: Path, inspection: Optional[FileInspection] = None):
+        # 需要计算内容指纹的文件（开启近似重复检测且不小于 min_size）返回新的 ChunkFingerprint，否则返回 None
+        index = self._similarity_index()
+        if index is None:
+            return None
+        stat = inspection.stat() if inspection is not None else source_path.stat()
+        return index.new_fingerprint() if stat is not None and index.wants(stat) else None
+    
+    def _handle_duplicate(self, source_path: Path, target_dir: Path, category: str, duplicate: str,
+                          reserved: Optional[Set[Path]] = None) -> Union[Path, Dict]:
+        # dedup_action: skip（保留源文件不动）/ hardlink（源文件删除，目标位置硬链接到已有副本）
+        if self.config.config.get('dedup_action', 'skip') != 'hardlink':
+            return {
+                'success': True,
+                'source': str(source_path),
+                'destination': duplicate,
+                'category': category,
+                'duplicate_of': duplicate,
+                'error': '重复文件，已跳过'
+            }
+        
+        target_path = self._get_unique_target_path(source_path, target_dir, reserved)
+        if self.dry_run:
+            return {
+                'success': True,
                 'source': str(source_path),
                 'destination': str(target_path),
                 'category': category,
-                'file_size': source_path.stat().st_size,
-                'file_hash': self._calculate_file_hash(target_path)
+                'duplicate_of': duplicate
             }
-            
-            self.operations_log.append(operation)
+        intent_id = self.journal.begin('link', str(source_path), str(target_path), category)
+        try:
+            os.link(duplicate, target_path)
+        except OSError:
+            # 跨设备或文件系统不支持硬链接时按普通文件移动
+            self.journal.abandon(intent_id)
+            return target_path
+        
+        self.names.release(target_path)
+        file_size = source_path.stat().st_size
+        os.unlink(source_path)
+        return self._record({
+            'success': True,
+            'source': str(source_path),
+            'destination': str(target_path),
+            'category': category,
+            'duplicate_of': duplicate,
+            'file_size': file_size,
+            'file_hash': None,
+            'intent_id': intent_id
+        }, 'link')
+    
+    def _hash_settings(self):
+        # hash_mode: copy（仅在跨设备复制时顺带计算）/ always / never
+        hash_mode = self.config.config.get('hash_mode', 'copy')
+        algorithm = self.config.config.get('hash_algorithm', 'blake2b')
+        return hash_mode, (None if hash_mode == 'never' else algorithm)
+    
+    def _move(self, source_path: Path, target_path: Path, category: str,
+              inspection: Optional[FileInspection] = None) -> Dict:
+        strategy = self.config.config.get('conflict_strategy', 'rename')
+        durable = self.config.config.get('durability', {}).get('fsync_copies', True)
+        intent_id = None
+        try:
+            hash_mode, algorithm = self._hash_settings()
+            # 覆盖已有的文件夹时，旧目标在放置完成前暂存在一旁（见 fileops.move_file）
+            replaces = strategy == 'overwrite' and (inspection.is_dir() if inspection is not None else source_path.is_dir())
+            # 除覆盖策略外，只在目标不存在时放置文件，不会覆盖其他线程或进程刚写入的文件
+            for attempt in range(MAX_PLACEMENT_ATTEMPTS):
+                # 每次尝试前写入意图，进程在移动过程中中断时下次启动可以据此完成或回滚
+                intent_id = self.journal.begin('move', str(source_path), str(target_path), category,
+                                               str(replaced_path(target_path)) if replaces else None)
+                # 跨设备复制时内容指纹随哈希一起计算；每次尝试重新开始
+                fingerprint = self._new_fingerprint(source_path, inspection)
+                try:
+                    start = time.perf_counter()
+                    file_size, file_hash = move_file(source_path, target_path, algorithm,
+                                                     exclusive=strategy != 'overwrite', inspection=inspection,
+                                                     durable=durable, sinks=(fingerprint,) if fingerprint else ())
+                    self.metrics.observe('move', start)
+                    break
+                except FileExistsError:
+                    self.journal.abandon(intent_id)
+                    intent_id = None
+                    self.names.release(target_path)
+                    self.metrics.inc('placement_retries')
+                    if strategy == 'skip':
+                        return {
+                            'success': True,
+                            'source': str(source_path),
+                            'destination': str(target_path),
+                            'category': category,
+                            'error': '文件已存在，已跳过'
+                        }
+                    self.names.get(target_path.parent).add(target_path.name)
+                    target_path = self._get_unique_target_path(source_path, target_path.parent)
+            else:
+                raise FileExistsError(f"无法为 {source_path.name} 分配不冲突的文件名")
+            self.names.release(target_path)
+            self.metrics.inc('bytes_moved', file_size)
+            if file_hash:
+                self.metrics.inc('bytes_hashed', file_size)
             return {
                 'success': True,
                 'source': str(source_path),
                 'destination': str(target_path),
                 'category': category,
-                'operation': operation
+                'file_size': file_size,
+                'file_hash': file_hash,
+                'intent_id': intent_id,
+                'fingerprint': fingerprint
             }
         except Exception as e:
+            if intent_id is not None:
+                self.journal.abandon(intent_id)
+            self.names.forget(target_path)
             return {
                 'success': False,
                 'error': str(e),
                 'source': str(source_path)
             }
     
-    def _get_unique_target_path(self, source_path: Path, target_dir: Path) -> Path:
-        target_path = target_dir / source_path.name
+    def _record(self, result: Dict, operation_type: str = 'move', inspection: Optional[FileInspection] = None) -> Dict:
+        target_path = Path(result['destination'])
+        file_size = result.pop('file_size', None)
+        file_hash = result.pop('file_hash', None)
+        intent_id = result.pop('intent_id', None)
+        fingerprint = result.pop('fingerprint', None)
+        # 移动后 inspection 的 stat 结果仍描述目标文件（rename 不改变大小和修改时间，跨设备复制保留修改时间）
+        stat = inspection.stat() if inspection is not None else None
+        is_file = stat_module.S_ISREG(stat.st_mode) if stat is not None else target_path.is_file()
+        try:
+            hash_mode, algorithm = self._hash_settings()
+            if file_hash is None and hash_mode == 'always' and is_file:
+                start = time.perf_counter()
+                # rename 没有读取数据，内容指纹与哈希共用这一次读取
+                sinks = (fingerprint,) if fingerprint is not None and not fingerprint.size else ()
+                if inspection is not None and inspection.is_open:
+                    file_hash = self._calculate_file_hash(target_path, inspection, sinks)
+                else:
+                    file_hash = self._calculate_file_hash(target_path, sinks=sinks)
+                self.metrics.observe('hash', start)
+                if file_size is not None:
+                    self.metrics.inc('bytes_hashed', file_size)
+            
+            operation = OperationRecord(operation_type, result['source'], result['destination'], result['category'],
+                                        file_size if file_size is not None else target_path.stat().st_size, file_hash)
+            
+            start = time.perf_counter()
+            self.journal.record(operation, intent_id)
+            if is_file:
+                # 只有 dedup 策略使用内容索引；其他策略下不登记，之后切换到 dedup 时由后台校验补上
+                if self.config.config.get('conflict_strategy', 'rename') == 'dedup':
+                    self.dedup.add(target_path, stat, full_hash=file_hash)
+                else:
+                    self.dedup.mark_stale()
+            self.metrics.observe('record', start)
+            if fingerprint is not None:
+                self._find_similar(result, target_path, stat, fingerprint, inspection)
+            result['operation'] = operation
+            return result
+        except Exception as e:
+            return {
+                'success': False,
+                'error': str(e),
+                'source': result['source']
+            }
+    
+    def _find_similar(self, result: Dict, target_path: Path, stat: Optional[os.stat_result], fingerprint,
+                      inspection: Optional[FileInspection] = None):
+        # 与目标目录中已有的文件比较，再把这个文件加入索引；找到相似文件时在结果中加入 similar_to 和 similarity
+        # 失败只影响检测结果，不影响已经完成的移动
+        start = time.perf_counter()
+        try:
+            size = stat.st_size if stat is not None else target_path.stat().st_size
+            if fingerprint.size != size:
+                # 移动和哈希都没有读取完整的内容（同一设备上 rename），单独读取一遍
+                fingerprint = self.similarity.new_fingerprint()
+                if inspection is not None and inspection.is_open:
+                    inspection.feed((fingerprint,))
+                else:
+                    feed_file(target_path, (fingerprint,))
+            sketch = fingerprint.sketch()
+            match = self.similarity.find_similar(sketch, exclude=target_path)
+            self.similarity.add(target_path, stat, sketch)
+        except Exception as e:
+            print(f"近似重复检测失败: {e}")
+            return
+        self.metrics.observe('similarity', start)
+        self.metrics.inc('bytes_fingerprinted', size)
+        if match:
+            self.metrics.inc('similar_files')
+            result['similar_to'], result['similarity'] = match[0], round(match[1], 2)
+    
+    def recover_interrupted(self) -> Dict[str, int]:
+        # 上次运行中断（崩溃、被强制结束、断电）时留下的意图：已经放置到目标位置的补写历史记录，其余回滚
+        summary = {'completed': 0, 'rolled_back': 0, 'failed': 0}
+        for intent in self.journal.interrupted():
+            try:
+                completed = self._recover(intent)
+            except Exception as e:
+                print(f"恢复中断的操作失败: {e}")
+                summary['failed'] += 1
+                continue
+            summary['completed' if completed else 'rolled_back'] += 1
+        return summary
+    
+    def _recover(self, intent: Dict) -> bool:
+        source_path = Path(intent['source'])
+        target_path = Path(intent['destination'])
+        discard_partial(target_path)
         
-        if not target_path.exists():
-            return target_path
+        # 目标已放置但源文件还没删除（或文件夹只删除了一部分）
+        if os.path.lexists(source_path) and os.path.lexists(target_path) and self._same_content(source_path, target_path):
+            self._remove_path(source_path)
         
-        strategy = self.config.config.get('conflict_strategy', 'rename')
+        # 覆盖已有的文件夹时中断：旧目标还在暂存位置，目标位置上的内容只可能是这次移动放置的
+        replaced = Path(intent['replaced']) if intent.get('replaced') else None
+        if replaced is not None and not os.path.lexists(replaced):
+            replaced = None
         
-        if strategy == 'overwrite':
-            return target_path
-        else:  # rename
-            counter = 1
-            stem = source_path.stem
-            suffix = source_path.suffix
-            
-            while True:
-                new_name = f"{stem}({counter}){suffix}"
-                new_path = target_dir / new_name
-                
-                if not new_path.exists():
-                    return new_path
-                
-                counter += 1
+        if os.path.lexists(source_path) or not os.path.lexists(target_path):
+            # 移动没有发生：源文件保持原样，被替换的文件夹改回原名，只删除意图
+            if replaced is not None:
+                if os.path.lexists(target_path):
+                    self._remove_path(target_path)
+                os.rename(replaced, target_path)
+            self.journal.abandon(intent['id'])
+            return False
+        
+        if replaced is not None:
+            self._remove_path(replaced)
+        
+        is_file = target_path.is_file()
+        self.journal.complete(intent['id'], OperationRecord(
+            intent['operation'], intent['source'], intent['destination'], intent['category'],
+            target_path.stat().st_size if is_file else 0,
+            timestamp=datetime.fromisoformat(intent['timestamp']), group_id=intent['group_id']
+        ))
+        return True
+    
+    def _remove_path(self, path: Path):
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path)
+        else:
+            os.unlink(path)
+    
+    def _same_content(self, source_path: Path, target_path: Path) -> bool:
+        if source_path.is_dir():
+            # 文件夹：源文件夹中剩下的每个文件在目标中都有大小相同的副本
+            for root, _, files in os.walk(source_path):
+                for name in files:
+                    source_file = Path(root) / name
+                    target_file = target_path / source_file.relative_to(source_path)
+                    if not target_file.is_file() or target_file.stat().st_size != source_file.stat().st_size:
+                        return False
+            return target_path.is_dir()
+        if os.path.samefile(source_path, target_path):
+            return True
+        if not target_path.is_file() or source_path.stat().st_size != target_path.stat().st_size:
+            return False
+        return hash_file(source_path) == hash_file(target_path)
     
-    def _calculate_file_hash(self, file_path: Path) -> str:
+    def _get_unique_target_path(self, source_path: Path, target_dir: Path,
+                                reserved: Optional[Set[Path]] = None) -> Path:
+        # 名称在目录索引中立即登记，本批次中已分配但尚未落盘的目标路径也不会被重复分配；
+        # dry_run 时不登记，已计划使用的路径由调用方放在 reserved 中
+        overwrite = self.config.config.get('conflict_strategy', 'rename') == 'overwrite'
+        if self.dry_run:
+            taken = (lambda name: target_dir / name in reserved) if reserved is not None else None
+            name = self.names.get(target_dir).suggest(source_path.name, overwrite, taken)
+        else:
+            name = self.names.get(target_dir).claim(source_path.name, overwrite)
+        if name != source_path.name:
+            self.metrics.inc('rename_collisions')
+        return target_dir / name
+    
+    def _calculate_file_hash(self, file_path: Path, inspection: Optional[FileInspection] = None, sinks=()) -> str:
+        algorithm = self.config.config.get('hash_algorithm', 'blake2b')
         try:
-            hash_md5 = hashlib.md5()
-            with open(file_path, "rb") as f:
-                for chunk in iter(lambda: f.read(4096), b""):
-                    hash_md5.update(chunk)
-            return hash_md5.hexdigest()
+            if inspection is not None:
+                return inspection.hash(algorithm, sinks)
+            return hash_file(file_path, algorithm, sinks)
         except Exception:
             return ""
     
     def undo_last_operation(self) -> Optional[Dict]:
-        if not self.operations_log:
+        last_op = self.journal.last()
+        if last_op is None:
             return None
         
-        last_op = self.operations_log.pop()
-        
-        try:
-            source_path = Path(last_op['destination'])
-            target_path = Path(last_op['source'])
-            
-            if source_path.exists():
-                shutil.move(str(source_path), str(target_path))
-                return {
-                    'success': True,
-                    'operation': last_op
-                }
-            else:
-                return {
-                    'success': False,
-                    'error': '源文件不存在',
-                    'operation': last_op
-                }
-        except Exception as e:
+        self.journal.delete(last_op['id'])
+        error = self._undo_operation(last_op)
+        if error:
             return {
                 'success': False,
-                'error': str(e),
+                'error': error,
                 'operation': last_op
             }
+        return {
+            'success': True,
+            'operation': last_op
+        }
+    
+    def undo_last_groups(self, count: int = 1, verify: bool = False, workers: Optional[int] = None) -> Optional[Dict]:
+        # 撤销最近 count 个批次（每次 batch_process 为一个批次），从最新的批次开始
+        group_ids = self.journal.recent_groups(count)
+        if not group_ids:
+            return None
+        
+        summary = {'success': True, 'groups': group_ids, 'undone': 0, 'failed': []}
+        for group_id in group_ids:
+            result = self.undo_group(group_id, verify, workers)
+            summary['undone'] += result['undone']
+            summary['failed'].extend(result['failed'])
+        summary['success'] = not summary['failed']
+        return summary
     
-    def batch_process(self, file_paths: List[str], recognizer) -> List[Dict]:
-        results = []
+    def undo_group(self, group_id: int, verify: bool = False, workers: Optional[int] = None) -> Dict:
+        # 并行执行整批的反向移动；单个文件失败不影响其他文件，失败的记录保留在历史中以便重试
+        # verify: 移回前按记录的大小和哈希确认文件未被修改
+        operations = self.journal.group(group_id)
+        if workers is None:
+            workers = self.config.config.get('parallel', {}).get('undo_workers', 8)
+        
+        # 目标路径相同的操作（覆盖策略）必须按时间倒序依次撤销
+        chains = defaultdict(list)
+        for operation in operations:
+            chains[operation['destination']].append(operation)
+        
+        def undo_chain(chain):
+            return [(operation, self._undo_operation(operation, verify)) for operation in chain]
         
-        for file_path in file_paths:
-            category, mime_type, status = recognizer.detect_file_type(file_path)
+        undone = []
+        failed = []
+        with ThreadPoolExecutor(max_workers=max(1, workers)) as executor:
+            for outcomes in executor.map(undo_chain, chains.values()):
+                for operation, error in outcomes:
+                    if error:
+                        failed.append({'operation': operation, 'error': error})
+                    else:
+                        undone.append(operation['id'])
+        
+        self.journal.delete_many(undone)
+        return {
+            'success': not failed,
+            'group_id': group_id,
+            'undone': len(undone),
+            'failed': failed
+        }
+    
+    def _undo_operation(self, operation: Dict, verify: bool = False) -> Optional[str]:
+        # 成功返回 None，否则返回错误信息
+        try:
+            source_path = Path(operation['destination'])
+            target_path = Path(operation['source'])
             
-            if status == "伪装文件":
-                results.append({
-                    'success': False,
-                    'error': f'检测到伪装文件: {mime_type}',
-                    'source': file_path
-                })
-                continue
+            if not os.path.lexists(source_path):
+                return '源文件不存在'
+            if verify:
+                error = self._verify_operation(operation, source_path)
+                if error:
+                    return error
             
-            result = self.process_file(file_path, category)
-            results.append(result)
+            target_path.parent.mkdir(parents=True, exist_ok=True)
+            # 原位置已有新文件时不覆盖
+            move_file(source_path, target_path, exclusive=True)
+            self.dedup.remove(source_path)
+            if self.similarity is not None:
+                self.similarity.remove(source_path)
+            self.names.forget(source_path)
+            return None
+        except FileExistsError:
+            return '原位置已存在同名文件'
+        except Exception as e:
+            return str(e)
+    
+    def _verify_operation(self, operation: Dict, file_path: Path) -> Optional[str]:
+        if operation.get('file_size') is not None and file_path.is_file():
+            if file_path.stat().st_size != operation['file_size']:
+                return '文件大小与记录不一致'
+        stored_hash = operation.get('file_hash') or ''
+        if ':' in stored_hash and file_path.is_file():
+            algorithm = stored_hash.split(':', 1)[0]
+            if hash_file(file_path, algorithm) != stored_hash:
+                return '文件内容与记录不一致'
+        return None
+    
+    def inspect(self, recognizer, file_path: str) -> FileInspection:
+        return recognizer.inspect(file_path, self.config.config.get('enable_content_analysis', False))
+    
+    def classify(self, recognizer, file_path: str, inspection: Optional[FileInspection] = None):
+        start = time.perf_counter()
+        category, mime_type, status = self._classify(recognizer, file_path, inspection)
+        self.metrics.observe('classify', start)
+        return category, mime_type, status
+    
+    def _classify(self, recognizer, file_path: str, inspection: Optional[FileInspection] = None):
+        return classify_file(recognizer, self.config.get_rules(), file_path,
+                             self.config.config.get('enable_content_analysis', False), inspection)
+    
+    def batch_process(self, file_paths: Iterable[str], recognizer, parallel: Optional[bool] = None,
+                      callback: Optional[Callable[[int, Dict], None]] = None,
+                      should_stop: Optional[Callable[[], bool]] = None) -> List[Dict]:
+        # 结果按输入顺序返回；文件很多（如整个目录树）时用 process_stream，不保留每个文件的结果
+        results = {}
+        
+        def collect(index, result):
+            results[index] = result
+            if callback:
+                callback(index, result)
         
-        return results
+        self.process_stream(file_paths, recognizer, parallel, collect, should_stop)
+        return [results[index] for index in range(len(results))]
+    
+    def process_stream(self, file_paths: Iterable[str], recognizer, parallel: Optional[bool] = None,
+                       callback: Optional[Callable[[int, Dict], None]] = None,
+                       should_stop: Optional[Callable[[], bool]] = None) -> Dict:
+        # callback(index, result) 在每个文件处理完成后调用；should_stop() 返回 True 时不再处理后续文件
+        # 只返回汇总：处理、成功、失败的文件数和找到的相似文件，内存占用与文件数无关
+        summary = {'processed': 0, 'succeeded': 0, 'failed': 0, 'similar': []}
+        # 并行模式下 callback 在流水线的多个线程中调用
+        lock = threading.Lock()
+        
+        def tally(index, result):
+            with lock:
+                summary['processed'] += 1
+                summary['succeeded' if result['success'] else 'failed'] += 1
+                if result.get('similar_to'):
+                    summary['similar'].append({'destination': result['destination'], 'similar_to': result['similar_to'],
+                                               'similarity': result['similarity']})
+            if callback:
+                callback(index, result)
+        
+        parallel_settings = self.config.config.get('parallel', {})
+        if parallel is None:
+            parallel = parallel_settings.get('enabled', False)
+        
+        if parallel:
+            pipeline = BatchPipeline(
+                self, recognizer,
+                recognize_workers=parallel_settings.get('recognize_workers', 4),
+                move_workers=parallel_settings.get('move_workers', 2),
+                hash_workers=parallel_settings.get('hash_workers', 2),
+                queue_size=parallel_settings.get('queue_size', 64)
+            )
+            with self.journal.batch():
+                pipeline.run(file_paths, tally, should_stop)
+            return summary
+        
+        with self.journal.batch():
+            for index, file_path in enumerate(file_paths):
+                if should_stop and should_stop():
+                    break
+                
+                # 识别、移动和哈希共用一次打开和一次 stat
+                with self.inspect(recognizer, file_path) as inspection:
+                    category, mime_type, status = self.classify(recognizer, file_path, inspection)
+                    
+                    if status == "伪装文件":
+                        self.metrics.inc('disguised_files')
+                        result = {
+                            'success': False,
+                            'error': f'检测到伪装文件: {mime_type}',
+                            'source': file_path
+                        }
+                    else:
+                        result = self.process_file(file_path, category, inspection)
+                
+                self.count_result(result)
+                tally(index, result)
+        
+        return summary
+    
+    def count_result(self, result: Dict):
+        if not result['success']:
+            self.metrics.inc('files_failed')
+        elif result.get('error'):
+            self.metrics.inc('files_skipped')
+        else:
+            self.metrics.inc('files_processed')
+    
+    def get_operation_history(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+        # 返回按时间顺序排列的一页记录，offset 从最新的记录往前数
+        return list(reversed(self.journal.recent(limit, offset)))
+    
+    def query_operation_history(self, limit: int = 200, before=None, **filters) -> List[OperationRecord]:
+        # 按时间倒序的一页记录，可按分类、时间范围和文件名筛选（见 OperationJournal.query）
+        return self.journal.query(limit, before, **filters)
+    
+    def get_history_categories(self) -> List[str]:
+        return self.journal.categories()
     
-    def get_operation_history(self, limit: int = 100) -> List[Dict]:
-        return self.operations_log[-limit:]
+    def get_operation_count(self) -> int:
+        return self.journal.count()
     
     def clear_history(self):
-        self.operations_log.clear()
\ No newline at end of file
+        self.journal.clear()
\ No newline at end of file
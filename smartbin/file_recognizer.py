@@ -1,51 +1,27 @@
 import os
+import time
 from pathlib import Path
 from typing import Dict, Optional, Tuple
 
+from smartbin.inspection import SNIFF_SIZE, FileInspection, looks_binary
+from smartbin.keywords import KeywordMatcher, build_matcher
+from smartbin.metrics import NULL_METRICS, Metrics
+from smartbin.recognition_cache import NOT_ANALYZED, RecognitionCache, cache_key
+from smartbin.signatures import build_index
+from smartbin.sniffer import sniff_text
+from smartbin.walker import FOLDER_CATEGORY
+
 class FileRecognizer:
-    def __init__(self):
-        self.magic_numbers = {
-            b'\xFF\xD8\xFF': 'image/jpeg',
-            b'\x89PNG\r\n\x1A\n': 'image/png',
-            b'GIF87a': 'image/gif',
-            b'GIF89a': 'image/gif',
-            b'BM': 'image/bmp',
-            b'RIFF': 'video/webp',
-            b'%PDF': 'application/pdf',
-            b'PK\x03\x04': 'application/zip',
-            b'PK\x05\x06': 'application/zip',
-            b'PK\x07\x08': 'application/zip',
-            b'Rar!': 'application/x-rar-compressed',
-            b'\x1f\x8b': 'application/gzip',
-            b'7z\xBC\xAF\x27\x1C': 'application/x-7z-compressed',
-            b'\x25\x21\x50\x53\x2D\x41\x44\x4F\x42\x45': 'application/postscript',
-            b'\x38\x42\x50\x53': 'image/vnd.adobe.photoshop',
-            b'II*\x00': 'image/tiff',
-            b'MM\x00*': 'image/tiff',
-            b'\x00\x00\x01\x00': 'application/x-msdownload',
-            b'MZ': 'application/x-msdownload',
-            b'\x7fELF': 'application/x-executable',
-            b'\xCA\xFE\xBA\xBE': 'application/x-mach-binary',
-            b'\xFE\xED\xFA': 'application/x-mach-binary',
-            b'\xCE\xFA\xED\xFE': 'application/x-mach-binary',
-            b'\x4D\x5A': 'application/x-dosexec',
-            b'ID3': 'audio/mpeg',
-            b'\xFF\xFB': 'audio/mpeg',
-            b'\xFF\xFA': 'audio/mpeg',
-            b'\xFF\xF3': 'audio/mpeg',
-            b'\xFF\xF2': 'audio/mpeg',
-            b'OggS': 'audio/ogg',
-            b'fLaC': 'audio/flac',
-            b'RIFF': 'audio/wav',
-            b'\x1A\x45\xDF\xA3': 'video/webm',
-            b'\x00\x00\x00\x18ftypmp42': 'video/mp4',
-            b'\x00\x00\x00\x1Cftypisom': 'video/mp4',
-            b'\x00\x00\x00\x20ftypmp42': 'video/mp4',
-            b'\x00\x00\x00\x1CftypM4V': 'video/mp4',
-            b'\x1A\x45\xDF\xA3': 'video/webm',
-            b'\x1E\xDF\xA3': 'video/webm',
-            b'\x00\x00\x00\x14ftypqt': 'video/quicktime',
-        }
+    def __init__(self, signature_file: Optional[str] = None, cache: Optional[RecognitionCache] = None,
+                 keyword_matcher: Optional[KeywordMatcher] = None, metrics: Optional[Metrics] = None,
+                 sniff_unknown: bool = True):
+        self.cache = cache
+        # 签名和扩展名都无法识别时，按开头的内容判断是否为文本（见 sniffer.sniff_text）
+        self.sniff_enabled = sniff_unknown
+        self.metrics = metrics or NULL_METRICS
+        self.keyword_matcher = keyword_matcher or build_matcher()
+        self.signature_index = build_index(signature_file)
+        self.header_size = max(32, self.signature_index.header_size)
         
         self.mime_to_category = {
             'image/jpeg': '图片',
@@ -55,6 +31,8 @@ class FileRecognizer:
             'image/webp': '图片',
             'image/tiff': '图片',
             'image/vnd.adobe.photoshop': '图片',
+            'image/heic': '图片',
+            'image/avif': '图片',
             'application/pdf': '文档',
             'application/msword': '文档',
             'application/vnd.openxmlformats-officedocument.wordprocessingml.document': '文档',
@@ -75,25 +53,77 @@ class FileRecognizer:
             'audio/wav': '音频',
             'audio/ogg': '音频',
             'audio/flac': '音频',
+            'audio/mp4': '音频',
             'video/mp4': '视频',
+            'video/3gpp': '视频',
             'video/webm': '视频',
             'video/quicktime': '视频',
+            'video/x-msvideo': '视频',
+            'inode/directory': FOLDER_CATEGORY,
+        }
+        
+        # 按内容识别出的文本类型；只用于没有可识别扩展名的文件，不影响按扩展名归类
+        self.text_to_category = {
+            'text/plain': '文档',
+            'text/csv': '文档',
+            'text/tab-separated-values': '文档',
+            'application/json': '代码',
+            'application/xml': '代码',
+            'text/html': '代码',
+            'text/x-python': '代码',
+            'text/x-shellscript': '代码',
+            'text/javascript': '代码',
+            'text/x-perl': '代码',
+            'text/x-ruby': '代码',
+            'text/x-php': '代码',
+            'text/x-script': '代码',
+            'image/svg+xml': '图片',
         }
     
-    def detect_by_magic_number(self, file_path: str) -> Optional[str]:
+    def inspect(self, file_path: str, content_analysis: bool = False) -> FileInspection:
+        # 文件只打开一次：首次读取同时满足文件头签名和（需要时）内容分析的第一块
+        inspection = FileInspection(file_path, self.header_size)
+        if self.sniff_enabled:
+            inspection.want(SNIFF_SIZE)
+        if content_analysis and self.keyword_matcher.handles(Path(file_path).suffix):
+            inspection.want(min(self.keyword_matcher.chunk_size, self.keyword_matcher.max_bytes))
+        return inspection
+    
+    def detect_by_magic_number(self, file_path: str, inspection: Optional[FileInspection] = None) -> Optional[str]:
         try:
-            with open(file_path, 'rb') as f:
-                header = f.read(32)
-            
-            for magic, mime in self.magic_numbers.items():
-                if header.startswith(magic):
-                    return mime
+            start = time.perf_counter()
+            if inspection is not None:
+                header = inspection.header(self.header_size)
+            else:
+                with open(file_path, 'rb') as f:
+                    header = f.read(self.header_size)
+            self.metrics.observe('header_read', start)
             
-            return None
+            return self.signature_index.lookup(header)
         except Exception as e:
             print(f"读取文件头失败: {e}")
             return None
     
+    def sniff(self, file_path: str, inspection: Optional[FileInspection] = None) -> Optional[Tuple[str, str]]:
+        # 返回 (MIME, 编码)，二进制文件返回 None
+        try:
+            start = time.perf_counter()
+            if inspection is not None:
+                header = inspection.header(SNIFF_SIZE)
+                stat = inspection.stat()
+                complete = stat is not None and stat.st_size <= len(header)
+            else:
+                with open(file_path, 'rb') as f:
+                    header = f.read(SNIFF_SIZE + 1)
+                complete = len(header) <= SNIFF_SIZE
+                header = header[:SNIFF_SIZE]
+            result = sniff_text(header, complete)
+            self.metrics.observe('sniff', start)
+            return result
+        except Exception as e:
+            print(f"读取文件内容失败: {e}")
+            return None
+    
     def detect_by_extension(self, file_path: str) -> Optional[str]:
         extension = Path(file_path).suffix.lower()
         
@@ -104,6 +134,9 @@ class FileRecognizer:
             '.gif': 'image/gif',
             '.bmp': 'image/bmp',
             '.webp': 'image/webp',
+            '.heic': 'image/heic',
+            '.heif': 'image/heic',
+            '.avif': 'image/avif',
             '.svg': 'image/svg+xml',
             '.pdf': 'application/pdf',
             '.doc': 'application/msword',
@@ -122,7 +155,9 @@ class FileRecognizer:
             '.wav': 'audio/wav',
             '.ogg': 'audio/ogg',
             '.flac': 'audio/flac',
+            '.m4a': 'audio/mp4',
             '.mp4': 'video/mp4',
+            '.3gp': 'video/3gpp',
             '.avi': 'video/x-msvideo',
             '.mkv': 'video/x-matroska',
             '.mov': 'video/quicktime',
@@ -142,13 +177,48 @@ class FileRecognizer:
         
         return ext_to_mime.get(extension)
     
-    def detect_file_type(self, file_path: str) -> Tuple[str, str, str]:
-        mime_by_magic = self.detect_by_magic_number(file_path)
+    def _cache_key(self, file_path: str, inspection: Optional[FileInspection] = None) -> Optional[Tuple]:
+        if self.cache is None:
+            return None
+        if inspection is not None:
+            stat = inspection.stat()
+            return cache_key(file_path, stat) if stat is not None else None
+        try:
+            return cache_key(file_path, os.stat(file_path))
+        except OSError:
+            return None
+    
+    def detect_file_type(self, file_path: str, inspection: Optional[FileInspection] = None) -> Tuple[str, str, str]:
+        # inspection：与内容分析、移动共用的已打开文件，不传时只读取文件头
+        key = self._cache_key(file_path, inspection)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None:
+                self.metrics.inc('cache_hits')
+                return cached[:3]
+            self.metrics.inc('cache_misses')
+        
+        start = time.perf_counter()
+        result = self._detect_file_type(file_path, inspection)
+        self.metrics.observe('detect', start)
+        
+        if key is not None:
+            self.cache.put(key, *result)
+        return result
+    
+    def _detect_file_type(self, file_path: str, inspection: Optional[FileInspection] = None) -> Tuple[str, str, str]:
+        if inspection is not None and inspection.is_dir():
+            # 整体归档的文件夹（见 walker.iter_paths 的 keep / expand）
+            return self.mime_to_category['inode/directory'], 'inode/directory', "正常"
+        
+        mime_by_magic = self.detect_by_magic_number(file_path, inspection)
         mime_by_ext = self.detect_by_extension(file_path)
         
         # 特殊处理 Office 2007+ 文件（.docx, .xlsx, .pptx），它们本质上是 zip 压缩文件
         extension = Path(file_path).suffix.lower()
         office_open_xml_extensions = ['.docx', '.xlsx', '.pptx']
+        # ISO 媒体容器（ftyp）：isom、mp42 等通用品牌无法区分音频、视频和图片，以扩展名为准
+        iso_media_mimes = ['video/mp4', 'audio/mp4', 'video/quicktime', 'video/3gpp', 'image/heic', 'image/avif']
         
         if mime_by_magic and mime_by_ext:
             if mime_by_magic != mime_by_ext:
@@ -156,6 +226,9 @@ class FileRecognizer:
                 if mime_by_magic == 'application/zip' and extension in office_open_xml_extensions:
                     category = self.mime_to_category.get(mime_by_ext, "其他")
                     return category, mime_by_ext, "正常"
+                elif mime_by_magic == 'video/mp4' and mime_by_ext in iso_media_mimes:
+                    category = self.mime_to_category.get(mime_by_ext, "其他")
+                    return category, mime_by_ext, "正常"
                 else:
                     return "可疑文件", mime_by_magic, "伪装文件"
             else:
@@ -167,30 +240,43 @@ class FileRecognizer:
         elif mime_by_ext:
             category = self.mime_to_category.get(mime_by_ext, "其他")
             return category, mime_by_ext, "正常"
-        else:
-            return "其他", "application/octet-stream", "未知"
+        
+        sniffed = self.sniff(file_path, inspection) if self.sniff_enabled else None
+        if sniffed is not None:
+            mime_type = sniffed[0]
+            return self.text_to_category.get(mime_type, "文档"), mime_type, "正常"
+        return "其他", "application/octet-stream", "未知"
+    
+    def analyze_content(self, file_path: str, inspection: Optional[FileInspection] = None) -> Optional[str]:
+        key = self._cache_key(file_path, inspection)
+        if key is not None:
+            cached = self.cache.get(key)
+            if cached is not None and cached[3] != NOT_ANALYZED:
+                self.metrics.inc('cache_hits')
+                return cached[3]
+            self.metrics.inc('cache_misses')
+        
+        start = time.perf_counter()
+        content_category = self._analyze_content(file_path, inspection)
+        self.metrics.observe('analyze_content', start)
+        
+        if key is not None:
+            self.cache.set_content(key, content_category)
+        return content_category
     
-    def analyze_content(self, file_path: str) -> Optional[str]:
+    def _analyze_content(self, file_path: str, inspection: Optional[FileInspection] = None) -> Optional[str]:
         try:
-            extension = Path(file_path).suffix.lower()
-            
-            if extension in ['.txt', '.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.h']:
-                with open(file_path, 'r', encoding='utf-8', errors='ignore') as f:
-                    content = f.read(4096)
-                
-                keywords = {
-                    '财务': ['金额', '发票', '税号', '合同', '账单', '支付', '收款', '银行', '账户'],
-                    '法律': ['合同', '协议', '律师', '诉讼', '判决', '法律', '条款', '责任'],
-                    '工作': ['报告', '会议', '项目', '任务', '计划', '总结', '方案', '需求'],
-                    '学习': ['教程', '笔记', '学习', '课程', '作业', '考试', '复习'],
-                }
-                
-                for category, words in keywords.items():
-                    for word in words:
-                        if word in content:
-                            return category
-            
-            return None
+            matcher = self.keyword_matcher
+            if not matcher.handles(Path(file_path).suffix):
+                return None
+            if inspection is None:
+                return matcher.classify_file(file_path)
+            if not inspection.is_file():
+                return None
+            # 直接使用识别时读入的缓冲区，二进制内容不做分析
+            if looks_binary(inspection.header(SNIFF_SIZE)):
+                return None
+            return matcher.classify_chunks(inspection.chunks(matcher.chunk_size, matcher.max_bytes))
         except Exception as e:
             print(f"内容分析失败: {e}")
             return None
\ No newline at end of file
@@ -0,0 +1,331 @@
+import errno
+import hashlib
+import os
+import shutil
+import stat as stat_module
+import zlib
+from pathlib import Path
+from typing import Iterable, Optional, Tuple
+
+COPY_BUFFER_SIZE = 1024 * 1024
+
+# 零拷贝失败时回退到用户态复制的错误码（跨文件系统、内核/文件系统不支持等）
+_ZERO_COPY_FALLBACK_ERRORS = {errno.EXDEV, errno.ENOSYS, errno.EINVAL, errno.EOPNOTSUPP, errno.EBADF, errno.ENOTSUP}
+
+# 跨设备复制时先写入同目录下的临时文件，完成后再改名为最终名称；最终名称下不会出现只复制了一半的文件
+PARTIAL_SUFFIX = '.smartbin-part'
+# 覆盖已有的文件夹时，旧的目标在新文件夹放置完成前暂存的名称
+REPLACED_SUFFIX = '.smartbin-replaced'
+
+
+class _Crc32:
+    name = 'crc32'
+    
+    def __init__(self):
+        self.value = 0
+    
+    def update(self, data):
+        self.value = zlib.crc32(data, self.value)
+    
+    def hexdigest(self) -> str:
+        return f"{self.value:08x}"
+
+
+def _import_xxhash():
+    # xxhash 是可选依赖，只在需要时才尝试导入
+    try:
+        import xxhash
+        return xxhash
+    except ImportError:
+        return None
+
+
+def available_hash_algorithms():
+    algorithms = ['blake2b', 'md5', 'sha256', 'crc32']
+    if _import_xxhash() is not None:
+        algorithms.append('xxh64')
+    return algorithms
+
+
+def new_hasher(algorithm: str):
+    if algorithm == 'blake2b':
+        return hashlib.blake2b(digest_size=32)
+    if algorithm == 'crc32':
+        return _Crc32()
+    if algorithm == 'xxh64':
+        xxhash = _import_xxhash()
+        if xxhash is None:
+            raise ValueError("xxh64 需要安装 xxhash 包")
+        return xxhash.xxh64()
+    return hashlib.new(algorithm)
+
+
+def format_digest(algorithm: str, hasher) -> str:
+    return f"{algorithm}:{hasher.hexdigest()}"
+
+
+def feed_file(file_path, sinks: Iterable):
+    # 读取一遍文件，每一块依次交给 sinks 中的每个对象（哈希器、内容指纹等，有 update 方法即可）
+    buffer = bytearray(COPY_BUFFER_SIZE)
+    view = memoryview(buffer)
+    with open(file_path, 'rb', buffering=0) as f:
+        while True:
+            n = f.readinto(buffer)
+            if not n:
+                break
+            for sink in sinks:
+                sink.update(view[:n])
+
+
+def hash_file(file_path, algorithm: str = 'blake2b', sinks: Iterable = ()) -> str:
+    # sinks：需要同一份数据的其他对象，与哈希共用一次读取
+    hasher = new_hasher(algorithm)
+    feed_file(file_path, (hasher, *sinks))
+    return format_digest(algorithm, hasher)
+
+
+def _zero_copy(src_fd: int, dst_fd: int, size: int, copied: int = 0) -> int:
+    # 从偏移 copied 开始复制到 size，返回复制结束的位置；不支持时可能只复制了一部分（或完全没有复制）
+    for method in ('copy_file_range', 'sendfile'):
+        func = getattr(os, method, None)
+        if func is None:
+            continue
+        try:
+            while copied < size:
+                if method == 'copy_file_range':
+                    n = func(src_fd, dst_fd, min(size - copied, 1 << 30), copied, copied)
+                else:
+                    os.lseek(dst_fd, copied, os.SEEK_SET)
+                    n = func(dst_fd, src_fd, copied, min(size - copied, 1 << 30))
+                if n == 0:
+                    break
+                copied += n
+            return copied
+        except OSError as e:
+            if e.errno not in _ZERO_COPY_FALLBACK_ERRORS:
+                raise
+    return copied
+
+
+def partial_path(target) -> Path:
+    target = Path(target)
+    return target.with_name(f".{target.name}{PARTIAL_SUFFIX}")
+
+
+def replaced_path(target) -> Path:
+    # 覆盖已有的文件夹时旧目标暂存的位置（见 move_file）
+    target = Path(target)
+    return target.with_name(f".{target.name}{REPLACED_SUFFIX}")
+
+
+def _fsync_directory(directory):
+    # 改名后同步目录项；Windows 不支持打开目录
+    if not hasattr(os, 'O_DIRECTORY'):
+        return
+    dir_fd = os.open(directory, os.O_RDONLY | os.O_DIRECTORY)
+    try:
+        os.fsync(dir_fd)
+    finally:
+        os.close(dir_fd)
+
+
+def discard_partial(target):
+    # 删除中断的复制留下的临时文件（或文件夹）
+    _remove(partial_path(target))
+
+
+def _remove(path: Path):
+    try:
+        if path.is_dir() and not path.is_symlink():
+            shutil.rmtree(path)
+        else:
+            path.unlink()
+    except FileNotFoundError:
+        pass
+
+
+def _write_all(dst, chunk):
+    while chunk:
+        written = dst.write(chunk)
+        chunk = chunk[written:]
+
+
+def copy_file(source: Path, target: Path, algorithm: Optional[str] = None,
+              exclusive: bool = False, inspection=None, durable: bool = False,
+              sinks: Iterable = ()) -> Tuple[int, Optional[str]]:
+    # 单次遍历完成复制和哈希；不需要哈希时优先使用内核零拷贝
+    # exclusive: 目标已存在时抛出 FileExistsError，而不是覆盖
+    # inspection: 识别时已打开的源文件（FileInspection），复用其描述符，已读入的缓冲区直接作为第一块
+    # durable: 返回前 fsync 目标文件
+    # sinks: 同样需要文件内容的其他对象（如内容指纹），复制时顺带输入，不必再读一遍
+    if inspection is not None and inspection.is_open:
+        return _copy_inspected(inspection, target, algorithm, exclusive, durable, sinks)
+    
+    hasher = new_hasher(algorithm) if algorithm else None
+    sinks = ((hasher,) if hasher is not None else ()) + tuple(sinks)
+    size = 0
+    with open(source, 'rb', buffering=0) as src, open(target, 'xb' if exclusive else 'wb', buffering=0) as dst:
+        total = os.fstat(src.fileno()).st_size
+        if not sinks:
+            size = _zero_copy(src.fileno(), dst.fileno(), total)
+            src.seek(size)
+            dst.seek(size)
+        
+        buffer = bytearray(COPY_BUFFER_SIZE)
+        view = memoryview(buffer)
+        while True:
+            n = src.readinto(buffer)
+            if not n:
+                break
+            _write_all(dst, view[:n])
+            for sink in sinks:
+                sink.update(view[:n])
+            size += n
+        if durable:
+            os.fsync(dst.fileno())
+    
+    shutil.copystat(source, target)
+    return size, format_digest(algorithm, hasher) if hasher else None
+
+
+def _copy_inspected(inspection, target: Path, algorithm: Optional[str], exclusive: bool,
+                    durable: bool = False, sinks: Iterable = ()) -> Tuple[int, Optional[str]]:
+    hasher = new_hasher(algorithm) if algorithm else None
+    sinks = ((hasher,) if hasher is not None else ()) + tuple(sinks)
+    size = 0
+    with open(target, 'xb' if exclusive else 'wb', buffering=0) as dst:
+        if not sinks:
+            # 先写入已读取的缓冲区，其余部分用零拷贝
+            buffer = inspection.buffer
+            _write_all(dst, buffer)
+            size = _zero_copy(inspection.fd, dst.fileno(), inspection.stat().st_size, len(buffer))
+            dst.seek(size)
+        if sinks or size < inspection.stat().st_size:
+            chunks = inspection.chunks()
+            skip = size
+            for chunk in chunks:
+                # 零拷贝已经复制过的部分跳过
+                if skip >= len(chunk):
+                    skip -= len(chunk)
+                    continue
+                chunk = chunk[skip:]
+                skip = 0
+                _write_all(dst, chunk)
+                for sink in sinks:
+                    sink.update(chunk)
+                size += len(chunk)
+        if durable:
+            os.fsync(dst.fileno())
+    
+    shutil.copystat(inspection.file_path, target)
+    return size, format_digest(algorithm, hasher) if hasher else None
+
+
+def _link_exclusive(source: Path, target: Path):
+    # 不覆盖已有文件的原子 rename：先建立硬链接（目标已存在时失败），再删除源文件。
+    # 文件系统不支持硬链接时，先以 O_EXCL 占位再用 rename 替换占位文件。
+    try:
+        os.link(source, target, follow_symlinks=False)
+    except FileExistsError:
+        raise
+    except OSError as e:
+        if e.errno == errno.EXDEV:
+            raise
+        os.close(os.open(target, os.O_WRONLY | os.O_CREAT | os.O_EXCL, 0o600))
+        try:
+            os.replace(source, target)
+        except BaseException:
+            os.unlink(target)
+            raise
+        return
+    
+    try:
+        os.unlink(source)
+    except BaseException:
+        os.unlink(target)
+        raise
+
+
+def _move_tree(source: Path, target: Path, exclusive: bool, durable: bool):
+    # 跨设备移动文件夹：整个复制到临时名称下再改名，最后删除源文件夹
+    partial = partial_path(target)
+    _remove(partial)
+    try:
+        shutil.copytree(source, partial, symlinks=True)
+        if exclusive and os.path.lexists(target):
+            raise FileExistsError(errno.EEXIST, "目标已存在", str(target))
+        os.replace(partial, target)
+    except BaseException:
+        _remove(partial)
+        raise
+    if durable:
+        _fsync_directory(target.parent)
+    shutil.rmtree(source)
+
+
+def move_file(source: Path, target: Path, algorithm: Optional[str] = None, exclusive: bool = False,
+              inspection=None, durable: bool = False, sinks: Iterable = ()) -> Tuple[int, Optional[str]]:
+    # 同一设备上直接 rename，不读取任何数据；跨设备时边复制边计算哈希
+    # exclusive: 只在目标不存在时放置（原子操作），否则抛出 FileExistsError
+    # inspection: 识别时已打开的源文件（FileInspection），复用其 stat 结果、描述符和缓冲区
+    # durable: 跨设备复制的文件先 fsync 再改名为最终名称，删除源文件前同步目标目录
+    # sinks: 跨设备复制时随哈希一起输入数据的其他对象；同一设备上 rename 不读取数据，不会输入
+    source = Path(source)
+    target = Path(target)
+    
+    source_stat = inspection.stat() if inspection is not None else None
+    if source_stat is None:
+        source_stat = source.stat()
+    if stat_module.S_ISDIR(source_stat.st_mode):
+        if exclusive and os.path.lexists(target):
+            raise FileExistsError(errno.EEXIST, "目标已存在", str(target))
+        # 覆盖时整体替换已有的目标：旧目标先改名到一旁，放置完成后再删除，失败时改回原名；
+        # 进程在此期间中断时由 FileProcessor._recover 按意图中记录的位置恢复或删除。
+        # 目标文件夹已存在时 shutil.move 会把源文件夹放进去（target/<名称>），与记录的路径不符
+        replaced = None
+        if os.path.lexists(target):
+            replaced = replaced_path(target)
+            _remove(replaced)
+            os.rename(target, replaced)
+        try:
+            if source_stat.st_dev != target.parent.stat().st_dev:
+                _move_tree(source, target, exclusive, durable)
+            else:
+                shutil.move(str(source), str(target))
+        except BaseException:
+            if replaced is not None:
+                os.rename(replaced, target)
+            raise
+        if replaced is not None:
+            _remove(replaced)
+        return 0, None
+    
+    if os.name == 'nt' and inspection is not None:
+        # Windows 上打开的文件不能被移动或删除
+        inspection.release()
+    if source_stat.st_dev == target.parent.stat().st_dev:
+        try:
+            if exclusive:
+                _link_exclusive(source, target)
+            else:
+                os.replace(source, target)
+            # rename 不读取数据，需要哈希时由调用方计算（见 FileProcessor._record 的 hash_mode=always）
+            return source_stat.st_size, None
+        except OSError as e:
+            if e.errno != errno.EXDEV:
+                raise
+    
+    partial = partial_path(target)
+    try:
+        size, digest = copy_file(source, partial, algorithm, inspection=inspection, durable=durable, sinks=sinks)
+        if exclusive:
+            _link_exclusive(partial, target)
+        else:
+            os.replace(partial, target)
+    except BaseException:
+        _remove(partial)
+        raise
+    if durable:
+        _fsync_directory(target.parent)
+    os.unlink(source)
+    return size, digest
\ No newline at end of file
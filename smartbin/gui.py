@@ -1,13 +1,22 @@
+import os
 import sys
+import queue
+import threading
+import time
 from PyQt5.QtWidgets import (QApplication, QWidget, QLabel, QVBoxLayout, QHBoxLayout, 
                              QPushButton, QSystemTrayIcon, QMenu, QAction, QFileDialog,
-                             QMessageBox, QSlider, QComboBox, QListWidget, QListWidgetItem,
-                             QGroupBox, QLineEdit, QTextEdit, QDialog, QDialogButtonBox)
-from PyQt5.QtCore import Qt, QTimer, QPoint, pyqtSignal, QSize
-from PyQt5.QtGui import QIcon, QPixmap, QPainter, QColor, QFont, QDragEnterEvent, QDropEvent
+                             QMessageBox, QSlider, QComboBox, QTreeView, QDateEdit,
+                             QGroupBox, QLineEdit, QTextEdit, QDialog, QDialogButtonBox, QCheckBox)
+from PyQt5.QtCore import (Qt, QTimer, QPoint, pyqtSignal, QSize, QThread, QAbstractTableModel, QModelIndex,
+                          QDate)
+from PyQt5.QtGui import QIcon, QPixmap, QPainter, QPen, QColor, QFont, QDragEnterEvent, QDropEvent
 from pathlib import Path
 from typing import List
 
+from smartbin.fileops import available_hash_algorithms
+from smartbin.walker import iter_paths, walk_options
+from smartbin.watcher import HotZoneWatcher
+
 class FloatingWidget(QWidget):
     files_dropped = pyqtSignal(list)
     
@@ -28,6 +37,8 @@ class FloatingWidget(QWidget):
         self.setup_ui()
         self.is_dragging = False
         self.drag_position = QPoint()
+        self.progress_done = 0
+        self.progress_total = 0
     
     def setup_ui(self):
         layout = QVBoxLayout()
@@ -53,6 +64,24 @@ class FloatingWidget(QWidget):
         painter.setBrush(color)
         painter.setPen(Qt.NoPen)
         painter.drawRoundedRect(self.rect(), 50, 50)
+        
+        if self.progress_total > 0:
+            pen = QPen(QColor(255, 255, 255, 230))
+            pen.setWidth(6)
+            pen.setCapStyle(Qt.RoundCap)
+            painter.setPen(pen)
+            painter.setBrush(Qt.NoBrush)
+            span = int(-360 * 16 * self.progress_done / self.progress_total)
+            painter.drawArc(self.rect().adjusted(5, 5, -5, -5), 90 * 16, span)
+    
+    def set_progress(self, done, total):
+        self.progress_done = done
+        self.progress_total = total
+        if total > 0:
+            self.setToolTip(f"正在处理 {done}/{total}")
+        else:
+            self.setToolTip("")
+        self.update()
     
     def mousePressEvent(self, event):
         if event.button() == Qt.LeftButton:
@@ -110,7 +139,7 @@ class SettingsDialog(QDialog):
         super().__init__(parent)
         self.config = config
         self.setWindowTitle("SmartBin 设置")
-        self.setFixedSize(500, 400)
+        self.setFixedSize(500, 460)
         self.setup_ui()
     
     def setup_ui(self):
@@ -128,12 +157,26 @@ class SettingsDialog(QDialog):
         conflict_group = QGroupBox("文件冲突处理")
         conflict_layout = QHBoxLayout()
         self.conflict_combo = QComboBox()
-        self.conflict_combo.addItems(['rename', 'overwrite', 'skip'])
+        self.conflict_combo.addItems(['rename', 'overwrite', 'skip', 'dedup'])
         self.conflict_combo.setCurrentText(self.config.config.get('conflict_strategy', 'rename'))
         conflict_layout.addWidget(QLabel("策略:"))
         conflict_layout.addWidget(self.conflict_combo)
         conflict_group.setLayout(conflict_layout)
         
+        hash_group = QGroupBox("文件哈希")
+        hash_layout = QHBoxLayout()
+        self.hash_algorithm_combo = QComboBox()
+        self.hash_algorithm_combo.addItems(available_hash_algorithms())
+        self.hash_algorithm_combo.setCurrentText(self.config.config.get('hash_algorithm', 'blake2b'))
+        self.hash_mode_combo = QComboBox()
+        self.hash_mode_combo.addItems(['copy', 'always', 'never'])
+        self.hash_mode_combo.setCurrentText(self.config.config.get('hash_mode', 'copy'))
+        hash_layout.addWidget(QLabel("算法:"))
+        hash_layout.addWidget(self.hash_algorithm_combo)
+        hash_layout.addWidget(QLabel("计算时机:"))
+        hash_layout.addWidget(self.hash_mode_combo)
+        hash_group.setLayout(hash_layout)
+        
         transparency_group = QGroupBox("界面透明度")
         transparency_layout = QHBoxLayout()
         self.transparency_slider = QSlider(Qt.Horizontal)
@@ -145,13 +188,30 @@ class SettingsDialog(QDialog):
         transparency_layout.addWidget(self.transparency_label)
         transparency_group.setLayout(transparency_layout)
         
+        folder_group = QGroupBox("拖入文件夹")
+        folder_layout = QHBoxLayout()
+        self.expand_folders_check = QCheckBox("整理文件夹中的文件（不勾选时整个文件夹移入\"文件夹\"分类）")
+        self.expand_folders_check.setChecked(self.config.config.get('folders', {}).get('expand', True))
+        folder_layout.addWidget(self.expand_folders_check)
+        folder_group.setLayout(folder_layout)
+        
+        similarity_group = QGroupBox("近似重复检测")
+        similarity_layout = QHBoxLayout()
+        self.similarity_check = QCheckBox("提示与已有文件内容相似的大文件（如同一文件的不同版本）")
+        self.similarity_check.setChecked(self.config.config.get('similarity', {}).get('enabled', False))
+        similarity_layout.addWidget(self.similarity_check)
+        similarity_group.setLayout(similarity_layout)
+        
         buttons = QDialogButtonBox(QDialogButtonBox.Ok | QDialogButtonBox.Cancel)
         buttons.accepted.connect(self.save_settings)
         buttons.rejected.connect(self.reject)
         
         layout.addWidget(target_group)
         layout.addWidget(conflict_group)
+        layout.addWidget(hash_group)
         layout.addWidget(transparency_group)
+        layout.addWidget(folder_group)
+        layout.addWidget(similarity_group)
         layout.addWidget(buttons)
         self.setLayout(layout)
     
@@ -163,34 +223,354 @@ class SettingsDialog(QDialog):
     def save_settings(self):
         self.config.config['target_directory'] = self.target_path.text()
         self.config.config['conflict_strategy'] = self.conflict_combo.currentText()
+        self.config.config['hash_algorithm'] = self.hash_algorithm_combo.currentText()
+        self.config.config['hash_mode'] = self.hash_mode_combo.currentText()
         self.config.config['ui_settings']['transparency'] = self.transparency_slider.value() / 100
+        self.config.config['folders'] = dict(self.config.config.get('folders', {}),
+                                             expand=self.expand_folders_check.isChecked())
+        self.config.config['similarity'] = dict(self.config.config.get('similarity', {}),
+                                                enabled=self.similarity_check.isChecked())
         self.config.save_config()
         self.accept()
 
+class HistoryLoader(QThread):
+    # 在后台线程中读取历史记录页：文件名筛选在大历史库上可能要几百毫秒，不阻塞界面
+    # 发出 (请求序号, 记录列表)；筛选条件改变后，旧条件的结果由接收方按序号丢弃
+    page_loaded = pyqtSignal(int, list)
+    
+    def __init__(self, file_processor, parent=None):
+        super().__init__(parent)
+        self.file_processor = file_processor
+        self.pending = queue.Queue()
+    
+    def request(self, generation, limit, before, filters):
+        self.pending.put((generation, limit, before, dict(filters)))
+    
+    def stop(self):
+        self.pending.put(None)
+        self.wait()
+    
+    def run(self):
+        while True:
+            item = self.pending.get()
+            # 连续输入时只执行最新的请求，中间的请求直接跳过
+            while item is not None and not self.pending.empty():
+                item = self.pending.get()
+            if item is None:
+                return
+            generation, limit, before, filters = item
+            try:
+                page = self.file_processor.query_operation_history(limit, before, **filters)
+            except Exception as e:
+                print(f"读取历史记录失败: {e}")
+                page = []
+            self.page_loaded.emit(generation, page)
+
+class HistoryModel(QAbstractTableModel):
+    # 历史记录按页从数据库读取：视图滚动到底部时才取下一页（canFetchMore / fetchMore），
+    # 只保存已取出的原始记录，每一行的显示文字在绘制时才生成；每一页都由 HistoryLoader 在后台读取
+    PAGE_SIZE = 200
+    COLUMNS = ("时间", "操作", "分类", "原文件", "新文件")
+    
+    def __init__(self, file_processor, parent=None):
+        super().__init__(parent)
+        self.file_processor = file_processor
+        self.rows = []
+        self.filters = {}
+        self.exhausted = False
+        # 每次改变筛选条件加一，用来识别过期的结果；loading 时不再发出新的请求
+        self.generation = 0
+        self.loading = False
+        self.loader = HistoryLoader(file_processor, self)
+        self.loader.page_loaded.connect(self.on_page_loaded)
+        self.loader.start()
+    
+    def set_filters(self, **filters):
+        self.beginResetModel()
+        self.filters = {key: value for key, value in filters.items() if value}
+        self.rows = []
+        self.exhausted = False
+        self.generation += 1
+        self.loading = False
+        self.endResetModel()
+    
+    def stop(self):
+        self.loader.stop()
+    
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.rows)
+    
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.COLUMNS)
+    
+    def headerData(self, section, orientation, role=Qt.DisplayRole):
+        if orientation == Qt.Horizontal and role == Qt.DisplayRole:
+            return self.COLUMNS[section]
+        return None
+    
+    def data(self, index, role=Qt.DisplayRole):
+        if not index.isValid():
+            return None
+        op = self.rows[index.row()]
+        column = index.column()
+        if role == Qt.DisplayRole:
+            if column == 0:
+                return op['timestamp'][:19].replace('T', ' ')
+            if column == 1:
+                return op['operation']
+            if column == 2:
+                return op['category'] or ''
+            return os.path.basename(op['source'] if column == 3 else op['destination'])
+        if role == Qt.ToolTipRole and column >= 3:
+            return op['source'] if column == 3 else op['destination']
+        return None
+    
+    def canFetchMore(self, parent=QModelIndex()):
+        return not parent.isValid() and not self.exhausted and not self.loading
+    
+    def fetchMore(self, parent=QModelIndex()):
+        if not self.canFetchMore(parent):
+            return
+        before = (self.rows[-1]['timestamp'], self.rows[-1]['id']) if self.rows else None
+        self.loading = True
+        self.loader.request(self.generation, self.PAGE_SIZE, before, self.filters)
+    
+    def on_page_loaded(self, generation, page):
+        if generation != self.generation:
+            return
+        self.loading = False
+        self.exhausted = len(page) < self.PAGE_SIZE
+        if page:
+            self.beginInsertRows(QModelIndex(), len(self.rows), len(self.rows) + len(page) - 1)
+            self.rows.extend(page)
+            self.endInsertRows()
+
 class HistoryDialog(QDialog):
-    def __init__(self, operations_log, parent=None):
+    # 文件名输入停止这么久（毫秒）后再重新查询
+    FILTER_DELAY = 300
+    
+    def __init__(self, file_processor, parent=None):
         super().__init__(parent)
+        self.file_processor = file_processor
         self.setWindowTitle("操作历史")
-        self.setFixedSize(600, 400)
-        self.setup_ui(operations_log)
+        self.resize(760, 480)
+        self.setup_ui()
+        self.apply_filters()
     
-    def setup_ui(self, operations_log):
+    def done(self, result):
+        # 关闭对话框前结束后台读取线程
+        self.model.stop()
+        super().done(result)
+    
+    def setup_ui(self):
         layout = QVBoxLayout()
         
-        self.history_list = QListWidget()
-        
-        for op in reversed(operations_log):
-            item_text = f"{op['timestamp'][:19]} | {op['operation']} | {Path(op['source']).name} -> {Path(op['destination']).name}"
-            item = QListWidgetItem(item_text)
-            self.history_list.addItem(item)
+        filter_layout = QHBoxLayout()
+        self.category_combo = QComboBox()
+        self.category_combo.addItem("全部分类", "")
+        for category in self.file_processor.get_history_categories():
+            self.category_combo.addItem(category, category)
+        self.category_combo.currentIndexChanged.connect(self.apply_filters)
+        
+        self.date_check = QCheckBox("日期:")
+        today = QDate.currentDate()
+        self.since_edit = QDateEdit(today.addDays(-30))
+        self.until_edit = QDateEdit(today)
+        for edit in (self.since_edit, self.until_edit):
+            edit.setCalendarPopup(True)
+            edit.setDisplayFormat("yyyy-MM-dd")
+            edit.setEnabled(False)
+            edit.dateChanged.connect(self.apply_filters)
+        self.date_check.toggled.connect(self.since_edit.setEnabled)
+        self.date_check.toggled.connect(self.until_edit.setEnabled)
+        self.date_check.toggled.connect(self.apply_filters)
+        
+        self.name_edit = QLineEdit()
+        self.name_edit.setPlaceholderText("文件名包含...")
+        self.name_timer = QTimer(self)
+        self.name_timer.setSingleShot(True)
+        self.name_timer.setInterval(self.FILTER_DELAY)
+        self.name_timer.timeout.connect(self.apply_filters)
+        self.name_edit.textChanged.connect(lambda text: self.name_timer.start())
+        
+        filter_layout.addWidget(self.category_combo)
+        filter_layout.addWidget(self.date_check)
+        filter_layout.addWidget(self.since_edit)
+        filter_layout.addWidget(QLabel("至"))
+        filter_layout.addWidget(self.until_edit)
+        filter_layout.addWidget(self.name_edit)
+        
+        # 行高固定，视图只为可见的行计算布局和取数据
+        self.model = HistoryModel(self.file_processor, self)
+        self.history_view = QTreeView()
+        self.history_view.setRootIsDecorated(False)
+        self.history_view.setUniformRowHeights(True)
+        self.history_view.setAlternatingRowColors(True)
+        self.history_view.setModel(self.model)
+        self.history_view.setColumnWidth(0, 140)
+        self.history_view.setColumnWidth(1, 50)
+        self.history_view.setColumnWidth(2, 90)
+        self.history_view.setColumnWidth(3, 200)
         
         buttons = QDialogButtonBox(QDialogButtonBox.Close)
         buttons.rejected.connect(self.accept)
         
-        layout.addWidget(QLabel("最近操作:"))
-        layout.addWidget(self.history_list)
+        layout.addLayout(filter_layout)
+        layout.addWidget(self.history_view)
         layout.addWidget(buttons)
         self.setLayout(layout)
+    
+    def apply_filters(self):
+        since = until = None
+        if self.date_check.isChecked():
+            since = self.since_edit.date().toString("yyyy-MM-dd")
+            # 结束日期当天的记录也包含在内
+            until = self.until_edit.date().addDays(1).toString("yyyy-MM-dd")
+        self.model.set_filters(
+            category=self.category_combo.currentData(),
+            since=since,
+            until=until,
+            name=self.name_edit.text().strip()
+        )
+        if self.model.canFetchMore():
+            self.model.fetchMore()
+
+# 排在批次队列中的撤销请求：与文件处理在同一个工作线程中依次执行，不会与正在进行的批次同时改动文件
+_UNDO = object()
+
+
+class BatchWorker(QThread):
+    file_processed = pyqtSignal(int, dict)
+    progress = pyqtSignal(int, int)
+    batch_finished = pyqtSignal(dict, bool)
+    # 撤销的结果（见 FileProcessor.undo_last_groups），没有可撤销的操作时为 None
+    undo_finished = pyqtSignal(object)
+    
+    # 进度信号的最短间隔（秒），避免大批量时刷屏阻塞事件循环
+    PROGRESS_INTERVAL = 0.05
+    
+    def __init__(self, file_processor, file_recognizer, parent=None):
+        super().__init__(parent)
+        self.file_processor = file_processor
+        self.file_recognizer = file_recognizer
+        self.pending = queue.Queue()
+        self.lock = threading.Lock()
+        self.generation = 0
+        self.cancelled_generation = -1
+        self.done = 0
+        self.total = 0
+        self.undoing = False
+        self.last_progress = 0.0
+    
+    def enqueue(self, files):
+        # 拖入的文件夹先按一项计入总数，处理时再展开
+        with self.lock:
+            self.total += len(files)
+            generation = self.generation
+            done, total = self.done, self.total
+        self.pending.put((generation, list(files)))
+        self.progress.emit(done, total)
+    
+    def enqueue_undo(self):
+        # 撤销可能要移回成千上万个文件（或跨设备复制），在工作线程中执行，完成后发出 undo_finished
+        with self.lock:
+            self.undoing = True
+        self.pending.put(_UNDO)
+    
+    def cancel(self):
+        # 取消当前批次以及所有已排队的批次，之后投放的文件不受影响
+        with self.lock:
+            self.cancelled_generation = self.generation
+            self.generation += 1
+    
+    def stop(self):
+        self.cancel()
+        self.pending.put(None)
+        self.wait()
+    
+    def is_busy(self):
+        with self.lock:
+            return self.total > 0 or self.undoing
+    
+    def run(self):
+        while True:
+            item = self.pending.get()
+            if item is None:
+                return
+            if item is _UNDO:
+                self.undo()
+                continue
+            
+            generation, files = item
+            should_stop = lambda: generation <= self.cancelled_generation
+            
+            batch = {'count': len(files), 'done': 0}
+            
+            if should_stop():
+                summary = {'processed': 0, 'succeeded': 0, 'failed': 0, 'similar': []}
+            else:
+                try:
+                    # 结果逐个通过信号发出，不在内存中保留，拖入整个目录树时内存占用不随文件数增长
+                    summary = self.file_processor.process_stream(
+                        self.expand(files, batch), self.file_recognizer,
+                        callback=lambda index, result: self.on_file_processed(batch, index, result),
+                        should_stop=should_stop
+                    )
+                except Exception as e:
+                    # 批次失败时不让工作线程退出，之后投放的文件仍能处理
+                    print(f"批量处理失败: {e}")
+                    summary = {'processed': batch['done'], 'succeeded': 0, 'failed': 1, 'similar': []}
+            
+            with self.lock:
+                self.total -= batch['count'] - summary['processed']
+                if self.done >= self.total:
+                    self.done = self.total = 0
+                done, total = self.done, self.total
+            
+            self.progress.emit(done, total)
+            self.batch_finished.emit(summary, should_stop())
+    
+    def undo(self):
+        # 整批撤销：一次拖拽（或一次热区批次）处理的所有文件一起移回原位置
+        try:
+            result = self.file_processor.undo_last_groups(1)
+        except Exception as e:
+            print(f"撤销失败: {e}")
+            result = {'success': False, 'undone': 0, 'failed': [{'error': str(e)}]}
+        with self.lock:
+            self.undoing = False
+        self.undo_finished.emit(result)
+    
+    def expand(self, files, batch):
+        # 文件夹在处理过程中逐步展开，先找到的文件先移动；进度总数随展开增加
+        options = walk_options(self.file_processor.config, self.file_recognizer)
+        for path in files:
+            found = 0
+            for file_path in iter_paths([path], **options):
+                if found:
+                    self.grow(batch, 1)
+                found += 1
+                yield file_path
+            if not found:
+                self.grow(batch, -1)
+    
+    def grow(self, batch, count):
+        with self.lock:
+            self.total += count
+            batch['count'] += count
+    
+    def on_file_processed(self, batch, index, result):
+        with self.lock:
+            batch['done'] += 1
+            self.done += 1
+            done, total = self.done, self.total
+        
+        self.file_processed.emit(index, result)
+        
+        now = time.monotonic()
+        if now - self.last_progress >= self.PROGRESS_INTERVAL:
+            self.last_progress = now
+            self.progress.emit(done, total)
 
 class SmartBinGUI:
     def __init__(self, config, file_processor, file_recognizer):
@@ -204,6 +584,8 @@ class SmartBinGUI:
         self.setup_tray_icon()
         self.setup_floating_widget()
         self.setup_notification()
+        self.setup_worker()
+        self.setup_hot_zones()
     
     def setup_tray_icon(self):
         self.tray_icon = QSystemTrayIcon()
@@ -231,6 +613,10 @@ class SmartBinGUI:
         undo_action.triggered.connect(self.undo_last)
         menu.addAction(undo_action)
         
+        cancel_action = QAction("取消处理", self.app)
+        cancel_action.triggered.connect(self.cancel_processing)
+        menu.addAction(cancel_action)
+        
         menu.addSeparator()
         
         quit_action = QAction("退出", self.app)
@@ -257,6 +643,21 @@ class SmartBinGUI:
         self.notification_timer = QTimer()
         self.notification_timer.timeout.connect(self.hide_notification)
     
+    def setup_worker(self):
+        self.worker = BatchWorker(self.file_processor, self.file_recognizer)
+        self.worker.progress.connect(self.floating_widget.set_progress)
+        self.worker.batch_finished.connect(self.on_batch_finished)
+        self.worker.undo_finished.connect(self.on_undo_finished)
+        self.worker.start()
+    
+    def setup_hot_zones(self):
+        self.hot_zone_watcher = None
+        if self.config.config.get('hot_zones', {}).get('enabled', False):
+            self.hot_zone_watcher = HotZoneWatcher(
+                self.config, self.file_processor, self.file_recognizer, on_batch=self.worker.enqueue
+            )
+            self.hot_zone_watcher.start()
+    
     def create_icon(self):
         pixmap = QPixmap(64, 64)
         pixmap.fill(Qt.transparent)
@@ -292,27 +693,53 @@ class SmartBinGUI:
             self.apply_settings()
     
     def show_history(self):
-        dialog = HistoryDialog(self.file_processor.operations_log)
+        dialog = HistoryDialog(self.file_processor)
         dialog.exec_()
     
     def undo_last(self):
-        result = self.file_processor.undo_last_operation()
-        if result and result['success']:
-            self.show_notification("撤销成功")
+        if self.worker.is_busy():
+            self.show_notification("正在处理文件，请稍后再撤销")
+            return
+        self.worker.enqueue_undo()
+    
+    def on_undo_finished(self, result):
+        if result is None:
+            self.show_notification("没有可撤销的操作")
+        elif result['success']:
+            self.show_notification(f"撤销成功: {result['undone']} 个文件")
         else:
-            self.show_notification("撤销失败: " + (result.get('error', '未知错误')))
+            first_error = result['failed'][0]['error']
+            self.show_notification(f"已撤销 {result['undone']} 个文件，{len(result['failed'])} 个失败: {first_error}")
     
     def handle_dropped_files(self, files):
-        results = self.file_processor.batch_process(files, self.file_recognizer)
-        
-        success_count = sum(1 for r in results if r['success'])
-        fail_count = len(results) - success_count
+        if self.worker.is_busy():
+            self.show_notification(f"已加入队列: {len(files)} 个项目")
+        self.worker.enqueue(files)
+    
+    def cancel_processing(self):
+        if self.worker.is_busy():
+            self.worker.cancel()
+    
+    def on_batch_finished(self, summary, cancelled):
+        success_count = summary['succeeded']
+        fail_count = summary['failed']
         
         if success_count > 0:
             message = f"已处理 {success_count} 个文件"
             if fail_count > 0:
                 message += f"，失败 {fail_count} 个"
+            if cancelled:
+                message += "，其余已取消"
+            similar = summary['similar']
+            if len(similar) == 1:
+                first = similar[0]
+                message += (f"\n{Path(first['destination']).name} 与已有的 {Path(first['similar_to']).name} "
+                            f"相似度 {first['similarity']:.0%}")
+            elif similar:
+                message += f"\n{len(similar)} 个文件与已有文件内容相似"
             self.show_notification(message)
+        elif cancelled:
+            self.show_notification("已取消处理")
         else:
             self.show_notification("处理失败")
     
@@ -331,6 +758,10 @@ class SmartBinGUI:
         position = self.floating_widget.pos()
         self.config.config['ui_settings']['position'] = {'x': position.x(), 'y': position.y()}
         self.config.save_config()
+        self.config.flush()
+        if self.hot_zone_watcher is not None:
+            self.hot_zone_watcher.stop()
+        self.worker.stop()
         self.app.quit()
     
     def run(self):
@@ -0,0 +1,131 @@
+import os
+import stat as stat_module
+from typing import Iterable, Iterator, Optional
+
+from smartbin.fileops import COPY_BUFFER_SIZE, format_digest, new_hasher
+
+# 判断二进制文件时检查的字节数
+SNIFF_SIZE = 1024
+
+_OPEN_FLAGS = os.O_RDONLY | getattr(os, 'O_BINARY', 0) | getattr(os, 'O_CLOEXEC', 0)
+
+
+def _read_at(fd: int, view: memoryview, offset: int) -> int:
+    if hasattr(os, 'preadv'):
+        return os.preadv(fd, [view], offset)
+    # 没有 preadv 的平台（Windows）
+    os.lseek(fd, offset, os.SEEK_SET)
+    data = os.read(fd, len(view))
+    view[:len(data)] = data
+    return len(data)
+
+
+def looks_binary(data) -> bool:
+    # 开头出现 NUL 字节的按二进制处理，不做内容分析
+    return b'\x00' in bytes(data[:SNIFF_SIZE])
+
+
+# 一个文件在识别、内容分析、移动和哈希之间共用的状态：一次 stat、一个文件描述符和首次读取的缓冲区。
+# 首次读取的大小按最长的文件头签名和内容分析的第一块确定，缓冲区以 memoryview 共享、不复制；
+# 哈希和跨设备复制从缓冲区之后继续读取同一个描述符。
+class FileInspection:
+    def __init__(self, file_path: str, read_size: int = 32):
+        self.file_path = str(file_path)
+        self.read_size = read_size
+        self.fd = None
+        self._stat = None
+        self._buffer = None
+        self._released = False
+    
+    def __enter__(self):
+        return self
+    
+    def __exit__(self, *exc_info):
+        self.release()
+    
+    def stat(self) -> Optional[os.stat_result]:
+        # 文件不存在或无法访问时返回 None
+        if self._stat is None:
+            try:
+                self._stat = os.fstat(self.fd) if self.fd is not None else os.stat(self.file_path)
+            except OSError:
+                return None
+        return self._stat
+    
+    def is_file(self) -> bool:
+        stat = self.stat()
+        return stat is not None and stat_module.S_ISREG(stat.st_mode)
+    
+    def is_dir(self) -> bool:
+        stat = self.stat()
+        return stat is not None and stat_module.S_ISDIR(stat.st_mode)
+    
+    def want(self, size: int):
+        # 在首次读取之前扩大读取的字节数
+        if self._buffer is None:
+            self.read_size = max(self.read_size, size)
+    
+    @property
+    def is_open(self) -> bool:
+        return self.fd is not None
+    
+    def _open(self) -> int:
+        if self.fd is None:
+            if self._released:
+                raise ValueError(f"{self.file_path} 已关闭")
+            self.fd = os.open(self.file_path, _OPEN_FLAGS)
+        return self.fd
+    
+    @property
+    def buffer(self) -> memoryview:
+        # 首次读取的数据，文件比缓冲区小时即为整个文件；读取失败时抛出 OSError
+        if self._buffer is None:
+            fd = self._open()
+            data = bytearray(self.read_size)
+            size = _read_at(fd, memoryview(data), 0)
+            self._buffer = memoryview(data)[:size]
+        return self._buffer
+    
+    def header(self, size: int) -> memoryview:
+        return self.buffer[:size]
+    
+    def chunks(self, chunk_size: int = COPY_BUFFER_SIZE, limit: Optional[int] = None) -> Iterator[memoryview]:
+        # 先产出已读取的缓冲区，再从同一个描述符继续读取；后续各块复用同一个缓冲区，调用方需在取下一块前处理完
+        buffer = self.buffer
+        if limit is not None and len(buffer) >= limit:
+            yield buffer[:limit]
+            return
+        if buffer:
+            yield buffer
+        if len(buffer) < self.read_size:
+            return
+        
+        fd = self._open()
+        offset = len(buffer)
+        block = bytearray(chunk_size)
+        view = memoryview(block)
+        while limit is None or offset < limit:
+            wanted = view if limit is None else view[:min(chunk_size, limit - offset)]
+            size = _read_at(fd, wanted, offset)
+            if not size:
+                return
+            offset += size
+            yield view[:size]
+    
+    def feed(self, sinks: Iterable):
+        # 从头读取一遍，每一块依次交给 sinks 中的每个对象（有 update 方法即可）
+        for chunk in self.chunks():
+            for sink in sinks:
+                sink.update(chunk)
+    
+    def hash(self, algorithm: str, sinks: Iterable = ()) -> str:
+        hasher = new_hasher(algorithm)
+        self.feed((hasher, *sinks))
+        return format_digest(algorithm, hasher)
+    
+    def release(self):
+        # 关闭描述符，stat 结果和缓冲区仍然可用
+        self._released = True
+        if self.fd is not None:
+            fd, self.fd = self.fd, None
+            os.close(fd)
\ No newline at end of file
@@ -0,0 +1,510 @@
+import os
+import sqlite3
+import sys
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timedelta
+from pathlib import Path
+from typing import Dict, Iterator, List, Mapping, Optional, Tuple
+
+OPERATION_COLUMNS = ('timestamp', 'operation', 'source', 'destination', 'category', 'file_size', 'file_hash', 'group_id')
+
+# 没有批次编号的记录（单独处理的文件、旧版本数据）各自视为一个批次，用负的记录 id 区分
+GROUP_KEY = "COALESCE(group_id, -id)"
+
+INTENT_COLUMNS = ('timestamp', 'operation', 'source', 'destination', 'category', 'group_id', 'pid', 'owner', 'replaced')
+
+# 每个进程的身份标识，按 pid 缓存（fork 出的子进程重新计算）
+_owners: Dict[int, str] = {}
+
+
+def _start_token(pid: int) -> Optional[str]:
+    # 进程的启动标识（Linux：开机编号 + 进程启动时刻），pid 被重新分配给其他进程后随之改变；无法获取时为 None
+    try:
+        with open('/proc/sys/kernel/random/boot_id') as f:
+            boot_id = f.read().strip()
+        with open(f'/proc/{pid}/stat') as f:
+            stat = f.read()
+        # 进程名可能包含空格和括号，从最后一个 ')' 之后数：第 22 个字段为启动时刻
+        return f"{boot_id}:{stat[stat.rindex(')') + 2:].split()[19]}"
+    except (OSError, ValueError, IndexError):
+        return None
+
+
+def _current_owner() -> str:
+    # 写入意图的进程标识：pid 加上启动标识，无法获取启动标识时用随机编号
+    pid = os.getpid()
+    owner = _owners.get(pid)
+    if owner is None:
+        owner = _owners[pid] = f"{pid}:{_start_token(pid) or uuid.uuid4().hex}"
+    return owner
+
+
+def _owner_alive(pid: int, owner: Optional[str]) -> bool:
+    # 容器中或重启后，新进程常常拿到与崩溃的进程相同的 pid，只比较 pid 会把中断的意图当作仍在进行
+    if owner == _current_owner():
+        return True
+    if pid == os.getpid() or not _process_alive(pid):
+        return False
+    # pid 已被其他进程使用
+    token = _start_token(pid)
+    return token is None or owner is None or owner == f"{pid}:{token}"
+
+
+def _process_alive(pid: int) -> bool:
+    if os.name == 'nt':
+        import ctypes
+        # SYNCHRONIZE 权限打开进程，进程仍在运行时等待立即超时
+        handle = ctypes.windll.kernel32.OpenProcess(0x00100000, False, pid)
+        if not handle:
+            return False
+        try:
+            return ctypes.windll.kernel32.WaitForSingleObject(handle, 0) == 0x00000102
+        finally:
+            ctypes.windll.kernel32.CloseHandle(handle)
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+def _file_name(column: str) -> str:
+    # 路径中最后一个分隔符（/ 或 \）之后的部分，在 SQLite 中计算
+    separators = f"replace(replace({column}, '/', ''), '\\', '')"
+    return f"substr({column}, length(rtrim({column}, {separators})) + 1)"
+
+
+def _like_pattern(text: str) -> str:
+    escaped = text.replace('\\', '\\\\').replace('%', '\\%').replace('_', '\\_')
+    return f"%{escaped}%"
+
+
+RECORD_FIELDS = ('id',) + OPERATION_COLUMNS
+
+# 批次中缓存的记录达到这个数量时提前写入，长时间运行的批次内存占用有上限
+MAX_PENDING = 10000
+
+_EPOCH = datetime(1970, 1, 1)
+_MICROSECOND = timedelta(microseconds=1)
+
+
+def _split_path(path: str) -> Tuple[str, str]:
+    # 目录部分（含末尾的分隔符）驻留，同一目录下的记录共用一个字符串
+    index = max(path.rfind('/'), path.rfind(os.sep)) + 1
+    return sys.intern(path[:index]), path[index:]
+
+
+class OperationRecord:
+    # 一条操作记录的紧凑表示：时间为微秒整数，哈希为二进制摘要，分类、操作类型和目录前缀驻留；
+    # 批次结束前缓存的记录、处理结果中的 operation 和历史对话框已加载的行都使用它。
+    # 按键读取（record['source']）与原来的字典兼容，字符串形式的时间、路径和哈希在读取时才生成
+    __slots__ = ('id', 'micros', 'operation', '_source_dir', '_source_name', '_destination_dir', '_destination_name',
+                 'category', 'file_size', 'hash_algorithm', 'digest', 'group_id')
+    
+    def __init__(self, operation: str, source: str, destination: str, category: Optional[str] = None,
+                 file_size: Optional[int] = None, file_hash: Optional[str] = None,
+                 timestamp: Optional[datetime] = None, group_id: Optional[int] = None, id: Optional[int] = None):
+        self.id = id
+        self.micros = ((timestamp or datetime.now()) - _EPOCH) // _MICROSECOND
+        self.operation = sys.intern(operation)
+        self._source_dir, self._source_name = _split_path(source)
+        self._destination_dir, self._destination_name = _split_path(destination)
+        if self._destination_name == self._source_name:
+            # 没有改名时源文件名和目标文件名共用一个字符串
+            self._destination_name = self._source_name
+        self.category = sys.intern(category) if category else category
+        self.file_size = file_size
+        self.group_id = group_id
+        self.hash_algorithm = None
+        self.digest = None
+        if file_hash:
+            algorithm, _, hex_digest = file_hash.rpartition(':')
+            try:
+                self.digest = bytes.fromhex(hex_digest)
+                self.hash_algorithm = sys.intern(algorithm)
+            except ValueError:
+                # 无法解析的旧数据原样保留
+                self.digest = file_hash
+    
+    @classmethod
+    def from_row(cls, row: Mapping) -> 'OperationRecord':
+        return cls(row['operation'], row['source'], row['destination'], row['category'], row['file_size'],
+                   row['file_hash'], datetime.fromisoformat(row['timestamp']), row['group_id'], row['id'])
+    
+    @property
+    def timestamp(self) -> str:
+        return (_EPOCH + timedelta(microseconds=self.micros)).isoformat()
+    
+    @property
+    def source(self) -> str:
+        return self._source_dir + self._source_name
+    
+    @property
+    def destination(self) -> str:
+        return self._destination_dir + self._destination_name
+    
+    @property
+    def file_hash(self) -> str:
+        if isinstance(self.digest, bytes):
+            return f"{self.hash_algorithm}:{self.digest.hex()}" if self.hash_algorithm else self.digest.hex()
+        return self.digest or ''
+    
+    def __getitem__(self, key: str):
+        if key not in RECORD_FIELDS:
+            raise KeyError(key)
+        return getattr(self, key)
+    
+    def __contains__(self, key) -> bool:
+        return key in RECORD_FIELDS
+    
+    def __iter__(self) -> Iterator[str]:
+        return iter(RECORD_FIELDS)
+    
+    def get(self, key: str, default=None):
+        return getattr(self, key) if key in RECORD_FIELDS else default
+    
+    def keys(self):
+        return RECORD_FIELDS
+    
+    def as_dict(self) -> Dict:
+        # 导出 JSON、显示时使用的字典形式；还没有写入数据库的记录没有 id
+        fields = RECORD_FIELDS if self.id is not None else OPERATION_COLUMNS
+        return {key: getattr(self, key) for key in fields}
+    
+    def row(self) -> tuple:
+        return tuple(getattr(self, column) for column in OPERATION_COLUMNS)
+    
+    def __repr__(self) -> str:
+        return f"OperationRecord({self.as_dict()!r})"
+
+
+# 操作历史 + 预写意图记录：每次移动开始前先写入一条意图（intents 表），移动完成的记录写入历史时在同一个事务中删除意图；
+# 进程崩溃或断电后留下的意图说明哪些移动可能只做了一半，启动时据此完成或回滚（见 FileProcessor.recover_interrupted）。
+# 写入本身只需 write() 即可在进程崩溃后保留（WAL 模式）；落盘（fsync）按组提交：每 sync_every 条意图或
+# 距上次落盘超过 sync_interval 秒时执行一次，批次结束时再执行一次，断电时最多丢失最近一组意图。
+class OperationJournal:
+    def __init__(self, db_file, sync_every: int = 64, sync_interval: float = 0.2):
+        self.db_file = Path(db_file)
+        self.db_file.parent.mkdir(parents=True, exist_ok=True)
+        
+        self._lock = threading.RLock()
+        self._pending = None
+        self._batch_depth = 0
+        self.group_id = None
+        self.sync_every = max(1, sync_every)
+        self.sync_interval = sync_interval
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+        
+        self.conn = sqlite3.connect(str(self.db_file), check_same_thread=False, isolation_level=None)
+        self.conn.row_factory = sqlite3.Row
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self._create_schema()
+    
+    def _create_schema(self):
+        with self._lock:
+            self.conn.executescript("""
+                CREATE TABLE IF NOT EXISTS operations (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    operation TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    destination TEXT NOT NULL,
+                    category TEXT,
+                    file_size INTEGER,
+                    file_hash TEXT
+                );
+                CREATE INDEX IF NOT EXISTS idx_operations_timestamp ON operations(timestamp);
+                CREATE INDEX IF NOT EXISTS idx_operations_source ON operations(source);
+                CREATE INDEX IF NOT EXISTS idx_operations_destination ON operations(destination);
+                CREATE TABLE IF NOT EXISTS operation_groups (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL DEFAULT CURRENT_TIMESTAMP
+                );
+            """)
+            columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(operations)")}
+            if 'group_id' not in columns:
+                self.conn.execute("ALTER TABLE operations ADD COLUMN group_id INTEGER")
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_operations_group ON operations(group_id)")
+            # 按分类筛选历史时同时按时间排序；旧版本的单列分类索引由它取代
+            self.conn.execute("CREATE INDEX IF NOT EXISTS idx_operations_category_time ON operations(category, timestamp)")
+            self.conn.execute("DROP INDEX IF EXISTS idx_operations_category")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS intents (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    operation TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    destination TEXT NOT NULL,
+                    category TEXT,
+                    group_id INTEGER,
+                    pid INTEGER NOT NULL,
+                    owner TEXT,
+                    replaced TEXT
+                )
+            """)
+            columns = {row['name'] for row in self.conn.execute("PRAGMA table_info(intents)")}
+            if 'owner' not in columns:
+                self.conn.execute("ALTER TABLE intents ADD COLUMN owner TEXT")
+            # 覆盖已有文件夹时旧目标暂存的位置
+            if 'replaced' not in columns:
+                self.conn.execute("ALTER TABLE intents ADD COLUMN replaced TEXT")
+            self.has_name_index = self._create_name_index()
+    
+    def _create_name_index(self) -> bool:
+        # 按文件名筛选历史用的 trigram 全文索引（SQLite 3.34+ 的 FTS5），由触发器与 operations 表同步；
+        # 不支持时返回 False，筛选退回逐行比较
+        exists = self.conn.execute(
+            "SELECT 1 FROM sqlite_master WHERE type = 'table' AND name = 'operation_names'"
+        ).fetchone() is not None
+        try:
+            self.conn.execute("""
+                CREATE VIRTUAL TABLE IF NOT EXISTS operation_names
+                USING fts5(source_name, destination_name, tokenize = 'trigram')
+            """)
+        except sqlite3.OperationalError:
+            return False
+        self.conn.executescript(f"""
+            CREATE TRIGGER IF NOT EXISTS operation_names_insert AFTER INSERT ON operations BEGIN
+                INSERT INTO operation_names (rowid, source_name, destination_name)
+                VALUES (new.id, {_file_name('new.source')}, {_file_name('new.destination')});
+            END;
+            CREATE TRIGGER IF NOT EXISTS operation_names_delete AFTER DELETE ON operations BEGIN
+                DELETE FROM operation_names WHERE rowid = old.id;
+            END;
+        """)
+        if not exists:
+            # 旧版本的数据库：为已有的记录建立索引
+            self.conn.execute(f"""
+                INSERT INTO operation_names (rowid, source_name, destination_name)
+                SELECT id, {_file_name('source')}, {_file_name('destination')} FROM operations
+            """)
+        return True
+    
+    @contextmanager
+    def batch(self):
+        # 批处理期间的记录先缓存，结束时在一个事务中写入；同一批次的记录共用一个批次编号，可整批撤销
+        with self._lock:
+            if self._batch_depth == 0:
+                self._pending = []
+                self.group_id = self.conn.execute("INSERT INTO operation_groups DEFAULT VALUES").lastrowid
+            self._batch_depth += 1
+        try:
+            yield self
+        finally:
+            with self._lock:
+                self._batch_depth -= 1
+                if self._batch_depth == 0:
+                    pending, self._pending = self._pending, None
+                    self.group_id = None
+                    self._insert(pending, sync=True)
+    
+    def checkpoint(self):
+        # 长时间运行的批次中途写入已缓存的记录，批次编号不变，仍可整批撤销
+        with self._lock:
+            if not self._pending:
+                return
+            pending, self._pending = self._pending, []
+            self._insert(pending, sync=True)
+    
+    def record(self, operation: OperationRecord, intent_id: Optional[int] = None):
+        # intent_id：这次操作开始前由 begin() 写入的意图，与历史记录在同一个事务中删除
+        with self._lock:
+            if operation.group_id is None:
+                operation.group_id = self.group_id
+            if self._pending is not None:
+                self._pending.append((operation, intent_id))
+                if len(self._pending) >= MAX_PENDING:
+                    self.checkpoint()
+            else:
+                self._insert([(operation, intent_id)], sync=self._sync_due())
+    
+    def _sync_due(self) -> bool:
+        self._unsynced += 1
+        return self._unsynced >= self.sync_every or time.monotonic() - self._last_sync >= self.sync_interval
+    
+    def _execute(self, statements, sync: bool = False):
+        # sync：这次提交同时把 WAL 落盘，之前所有未落盘的提交一起持久化（组提交）
+        with self._lock:
+            if sync:
+                self.conn.execute("PRAGMA synchronous=FULL")
+            try:
+                self.conn.execute("BEGIN")
+                try:
+                    for sql, rows in statements:
+                        if rows:
+                            self.conn.executemany(sql, rows)
+                    self.conn.execute("COMMIT")
+                except Exception:
+                    self.conn.execute("ROLLBACK")
+                    raise
+            finally:
+                if sync:
+                    self.conn.execute("PRAGMA synchronous=NORMAL")
+                    self._unsynced = 0
+                    self._last_sync = time.monotonic()
+    
+    def _insert(self, entries: List[Tuple[OperationRecord, Optional[int]]], sync: bool = False):
+        if not entries:
+            return
+        rows = [operation.row() for operation, _ in entries]
+        intents = [(intent_id,) for _, intent_id in entries if intent_id is not None]
+        self._execute([
+            (f"INSERT INTO operations ({', '.join(OPERATION_COLUMNS)}) "
+             f"VALUES ({', '.join('?' for _ in OPERATION_COLUMNS)})", rows),
+            ("DELETE FROM intents WHERE id = ?", intents),
+        ], sync)
+    
+    def begin(self, operation_type: str, source: str, destination: str, category: Optional[str] = None,
+              replaced: Optional[str] = None) -> int:
+        # 在文件系统操作之前写入意图记录，返回意图 id；replaced 为覆盖时旧目标暂存的位置
+        with self._lock:
+            sync = self._sync_due()
+            if sync:
+                self.conn.execute("PRAGMA synchronous=FULL")
+            try:
+                return self.conn.execute(
+                    f"INSERT INTO intents ({', '.join(INTENT_COLUMNS)}) VALUES ({', '.join('?' for _ in INTENT_COLUMNS)})",
+                    (datetime.now().isoformat(), operation_type, source, destination, category, self.group_id,
+                     os.getpid(), _current_owner(), replaced)
+                ).lastrowid
+            finally:
+                if sync:
+                    self.conn.execute("PRAGMA synchronous=NORMAL")
+                    self._unsynced = 0
+                    self._last_sync = time.monotonic()
+    
+    def abandon(self, intent_id: int):
+        # 操作没有发生（失败、跳过或换了目标名称）时删除意图
+        with self._lock:
+            self.conn.execute("DELETE FROM intents WHERE id = ?", (intent_id,))
+    
+    def complete(self, intent_id: int, operation: OperationRecord):
+        # 恢复时补写已完成操作的历史记录
+        self._insert([(operation, intent_id)], sync=True)
+    
+    def interrupted(self) -> List[Dict]:
+        # 写入意图的进程已经退出、但操作没有完成记录的意图
+        with self._lock:
+            rows = self.conn.execute("SELECT * FROM intents ORDER BY id").fetchall()
+        return [dict(row) for row in rows if not _owner_alive(row['pid'], row['owner'])]
+    
+    def recent(self, limit: int = 100, offset: int = 0) -> List[Dict]:
+        # 按时间倒序分页
+        with self._lock:
+            rows = self.conn.execute(
+                "SELECT * FROM operations ORDER BY id DESC LIMIT ? OFFSET ?",
+                (limit, offset)
+            ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def query(self, limit: int = 200, before: Optional[Tuple[str, int]] = None, category: Optional[str] = None,
+              since: Optional[str] = None, until: Optional[str] = None, name: Optional[str] = None) -> List[OperationRecord]:
+        # 按时间倒序的一页记录；before 为上一页最后一条记录的 (timestamp, id)，沿索引定位，翻到多深都不需要 OFFSET 扫描
+        # since / until：ISO 格式的时间下限（含）和上限（不含）；name：源文件名或目标文件名包含的文字（不区分大小写）
+        conditions = []
+        params = []
+        if before is not None:
+            conditions.append("(timestamp, id) < (?, ?)")
+            params.extend(before)
+        if category:
+            conditions.append("category = ?")
+            params.append(category)
+        if since:
+            conditions.append("timestamp >= ?")
+            params.append(since)
+        if until:
+            conditions.append("timestamp < ?")
+            params.append(until)
+        if name and self.has_name_index and len(name) >= 3:
+            # trigram 索引只能查找至少三个字符的片段；文字加引号按整段匹配
+            conditions.append("id IN (SELECT rowid FROM operation_names WHERE operation_names MATCH ?)")
+            params.append('"' + name.replace('"', '""') + '"')
+        elif name:
+            # 先按整个路径快速筛选，再确认匹配的是文件名部分
+            pattern = _like_pattern(name)
+            conditions.append("(destination LIKE ? ESCAPE '\\' OR source LIKE ? ESCAPE '\\')")
+            conditions.append(f"({_file_name('destination')} LIKE ? ESCAPE '\\' "
+                              f"OR {_file_name('source')} LIKE ? ESCAPE '\\')")
+            params.extend([pattern] * 4)
+        where = f"WHERE {' AND '.join(conditions)}" if conditions else ""
+        with self._lock:
+            rows = self.conn.execute(
+                f"SELECT * FROM operations {where} ORDER BY timestamp DESC, id DESC LIMIT ?", (*params, limit)
+            ).fetchall()
+        return [OperationRecord.from_row(row) for row in rows]
+    
+    def categories(self) -> List[str]:
+        # 历史中出现过的分类；沿分类索引逐个跳到下一个不同的值，不扫描整张表
+        with self._lock:
+            rows = self.conn.execute("""
+                WITH RECURSIVE names(category) AS (
+                    SELECT MIN(category) FROM operations
+                    UNION ALL
+                    SELECT (SELECT MIN(category) FROM operations WHERE category > names.category)
+                    FROM names WHERE names.category IS NOT NULL
+                )
+                SELECT category FROM names WHERE category IS NOT NULL
+            """).fetchall()
+        return [row[0] for row in rows]
+    
+    def last(self) -> Optional[Dict]:
+        rows = self.recent(1)
+        return rows[0] if rows else None
+    
+    def recent_groups(self, limit: int = 1) -> List[int]:
+        # 最近的 limit 个批次，按时间倒序
+        groups = []
+        with self._lock:
+            # 从最新的记录往前读，凑够 limit 个批次即停止，不扫描整张表
+            for (group_key,) in self.conn.execute(f"SELECT {GROUP_KEY} FROM operations ORDER BY id DESC"):
+                if group_key not in groups:
+                    if len(groups) == limit:
+                        break
+                    groups.append(group_key)
+        return groups
+    
+    def group(self, group_id: int) -> List[Dict]:
+        # 批次内的全部记录，按时间倒序
+        with self._lock:
+            if group_id < 0:
+                rows = self.conn.execute("SELECT * FROM operations WHERE id = ?", (-group_id,)).fetchall()
+            else:
+                rows = self.conn.execute(
+                    "SELECT * FROM operations WHERE group_id = ? ORDER BY id DESC", (group_id,)
+                ).fetchall()
+        return [dict(row) for row in rows]
+    
+    def count(self) -> int:
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM operations").fetchone()[0]
+    
+    def delete(self, operation_id: int):
+        with self._lock:
+            self.conn.execute("DELETE FROM operations WHERE id = ?", (operation_id,))
+    
+    def delete_many(self, operation_ids: List[int]):
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.executemany("DELETE FROM operations WHERE id = ?", [(i,) for i in operation_ids])
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+    
+    def clear(self):
+        with self._lock:
+            if self._pending is not None:
+                self._pending.clear()
+            self.conn.execute("DELETE FROM operations")
+    
+    def close(self):
+        with self._lock:
+            self.conn.close()
\ No newline at end of file
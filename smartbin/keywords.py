@@ -0,0 +1,123 @@
+import codecs
+import re
+from typing import Dict, Iterable, List, Optional, Tuple, Union
+
+# 默认关键词及权重：权重越高，说明该词越能代表这一类内容
+DEFAULT_KEYWORDS = {
+    '财务': {'发票': 3, '税号': 3, '账单': 3, '收款': 2, '金额': 2, '支付': 2, '银行': 1, '账户': 1, '合同': 1},
+    '法律': {'诉讼': 3, '判决': 3, '律师': 3, '条款': 2, '协议': 2, '法律': 2, '合同': 2, '责任': 1},
+    '工作': {'会议': 2, '项目': 2, '需求': 2, '方案': 2, '报告': 1, '任务': 1, '计划': 1, '总结': 1},
+    '学习': {'教程': 3, '课程': 3, '作业': 3, '考试': 3, '复习': 2, '笔记': 2, '学习': 1},
+}
+
+DEFAULT_EXTENSIONS = ['.txt', '.md', '.csv', '.py', '.js', '.html', '.css', '.java', '.cpp', '.c', '.h']
+
+# 每个文件默认最多读取的字节数：约 4096 个汉字，文件的开头通常已足以判断内容分类
+DEFAULT_MAX_BYTES = 12 * 1024
+
+
+class KeywordMatcher:
+    # 所有关键词编译成一个正则（长词优先），每个文本块只扫描一遍
+    def __init__(self, keywords: Dict[str, Union[Dict[str, float], List[str]]], extensions: Optional[List[str]] = None,
+                 max_bytes: int = DEFAULT_MAX_BYTES, chunk_size: int = 64 * 1024,
+                 min_score: float = 2.0, confidence: float = 12.0):
+        self.categories = list(keywords)
+        self.extensions = {ext.lower() for ext in (extensions if extensions is not None else DEFAULT_EXTENSIONS)}
+        self.max_bytes = max_bytes
+        self.chunk_size = chunk_size
+        # min_score：最高分低于此值时不归类；confidence：领先第二名这么多分时提前结束
+        self.min_score = min_score
+        self.confidence = confidence
+        
+        # 同一个词可以属于多个分类（如"合同"）
+        self.weights: Dict[str, List[Tuple[int, float]]] = {}
+        for position, category in enumerate(self.categories):
+            words = keywords[category]
+            if not isinstance(words, dict):
+                words = dict.fromkeys(words, 1)
+            for word, weight in words.items():
+                if word:
+                    self.weights.setdefault(word.lower(), []).append((position, float(weight)))
+        
+        self.max_word_length = max((len(word) for word in self.weights), default=0)
+        if self.weights:
+            alternatives = sorted(self.weights, key=len, reverse=True)
+            self.pattern = re.compile('|'.join(map(re.escape, alternatives)), re.IGNORECASE)
+        else:
+            self.pattern = None
+    
+    def handles(self, extension: str) -> bool:
+        return self.pattern is not None and extension.lower() in self.extensions
+    
+    def score_text(self, text: str, scores: List[float], skip: int = 0):
+        # skip：文本开头已经在上一块中统计过的字符数，只统计在此之后结束的匹配
+        for match in self.pattern.finditer(text):
+            if match.end() <= skip:
+                continue
+            for position, weight in self.weights.get(match.group(0).lower(), ()):
+                scores[position] += weight
+    
+    def _decided(self, scores: List[float]) -> bool:
+        ranked = sorted(scores, reverse=True)
+        runner_up = ranked[1] if len(ranked) > 1 else 0.0
+        return ranked[0] - runner_up >= self.confidence
+    
+    def _best(self, scores: List[float]) -> Optional[str]:
+        best = max(range(len(scores)), key=lambda position: scores[position], default=None)
+        if best is None or scores[best] < self.min_score:
+            return None
+        return self.categories[best]
+    
+    def classify_text(self, text: str) -> Optional[str]:
+        if self.pattern is None:
+            return None
+        scores = [0.0] * len(self.categories)
+        self.score_text(text, scores)
+        return self._best(scores)
+    
+    def classify_file(self, file_path: str) -> Optional[str]:
+        if self.pattern is None:
+            return None
+        
+        def read_chunks():
+            remaining = self.max_bytes
+            with open(file_path, 'rb') as f:
+                while remaining > 0:
+                    data = f.read(min(self.chunk_size, remaining))
+                    if not data:
+                        break
+                    remaining -= len(data)
+                    yield data
+        
+        return self.classify_chunks(read_chunks())
+    
+    def classify_chunks(self, chunks: Iterable[Union[bytes, memoryview]]) -> Optional[str]:
+        # chunks：按顺序的字节块（合计不超过 max_bytes），可以是共享缓冲区的 memoryview
+        if self.pattern is None:
+            return None
+        scores = [0.0] * len(self.categories)
+        decoder = codecs.getincrementaldecoder('utf-8')(errors='ignore')
+        # 块之间保留上一块末尾的若干字符，跨块的关键词也能匹配到
+        overlap = max(0, self.max_word_length - 1)
+        tail = ''
+        
+        for data in chunks:
+            text = decoder.decode(data)
+            
+            self.score_text(tail + text, scores, skip=len(tail))
+            if self._decided(scores):
+                break
+            tail = (tail + text)[-overlap:] if overlap else ''
+        
+        return self._best(scores)
+
+def build_matcher(settings: Optional[Dict] = None) -> KeywordMatcher:
+    settings = settings or {}
+    return KeywordMatcher(
+        settings.get('keywords') or DEFAULT_KEYWORDS,
+        extensions=settings.get('extensions'),
+        max_bytes=settings.get('max_bytes', DEFAULT_MAX_BYTES),
+        chunk_size=settings.get('chunk_size', 64 * 1024),
+        min_score=settings.get('min_score', 2.0),
+        confidence=settings.get('confidence', 12.0)
+    )
\ No newline at end of file
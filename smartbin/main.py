@@ -4,19 +4,40 @@ import os
 from smartbin.config import Config
 from smartbin.file_recognizer import FileRecognizer
 from smartbin.file_processor import FileProcessor
-from smartbin.gui import SmartBinGUI
+from smartbin.keywords import build_matcher
+from smartbin.metrics import create_metrics
+from smartbin.recognition_cache import content_version, create_cache
+
+def watch_config(config, recognizer):
+    # 配置文件被外部修改后自动生效；规则表按版本号按需重建，关键词表只在 content_analysis 变化时重建，
+    # 同时作废识别缓存中按旧关键词表得出的内容分类
+    def on_changed(changed):
+        if 'content_analysis' in changed:
+            recognizer.keyword_matcher = build_matcher(config.config.get('content_analysis'))
+            if recognizer.cache is not None:
+                recognizer.cache.set_content_version(content_version(config))
+        if changed:
+            print(f"配置已重新加载: {', '.join(sorted(changed))}")
+    
+    config.add_listener(on_changed)
+    config.start_watching()
 
 def main():
     print("正在启动 SmartBin 智能归档箱...")
     
     config = Config()
-    recognizer = FileRecognizer()
-    processor = FileProcessor(config)
+    metrics = create_metrics(config)
+    recognizer = FileRecognizer(cache=create_cache(config), keyword_matcher=build_matcher(config.config.get('content_analysis')),
+                                metrics=metrics, sniff_unknown=config.config.get('sniff_text', True))
+    processor = FileProcessor(config, metrics)
+    watch_config(config, recognizer)
     
     print(f"目标目录: {config.get_target_directory()}")
     print("初始化文件识别引擎...")
     print("初始化文件处理器...")
     
+    # 图形界面只在这里导入，命令行模式（python -m smartbin organize）不会加载 PyQt5
+    from smartbin.gui import SmartBinGUI
     gui = SmartBinGUI(config, processor, recognizer)
     
     print("SmartBin 已启动！")
@@ -0,0 +1,307 @@
+import atexit
+import json
+import os
+import tempfile
+import threading
+import time
+from bisect import bisect_left
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Callable, Dict, List, Optional
+
+# 各阶段耗时直方图的桶上界（秒），与 Prometheus 的累积桶一致
+LATENCY_BUCKETS = (0.0001, 0.00025, 0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+# 单次 trace 最多记录的事件数，超出后丢弃
+MAX_TRACE_EVENTS = 1000000
+
+
+class Histogram:
+    __slots__ = ('counts', 'count', 'sum', 'max')
+    
+    def __init__(self):
+        self.counts = [0] * (len(LATENCY_BUCKETS) + 1)
+        self.count = 0
+        self.sum = 0.0
+        self.max = 0.0
+    
+    def observe(self, value: float):
+        self.counts[bisect_left(LATENCY_BUCKETS, value)] += 1
+        self.count += 1
+        self.sum += value
+        if value > self.max:
+            self.max = value
+    
+    def quantile(self, q: float) -> float:
+        # 按桶估算分位数：取累计数达到 q 的桶的上界
+        if not self.count:
+            return 0.0
+        rank = q * self.count
+        total = 0
+        for bound, count in zip(LATENCY_BUCKETS, self.counts):
+            total += count
+            if total >= rank:
+                return min(bound, self.max)
+        return self.max
+    
+    def snapshot(self) -> Dict:
+        return {
+            'count': self.count,
+            'sum': self.sum,
+            'max': self.max,
+            'p50': self.quantile(0.50),
+            'p95': self.quantile(0.95),
+            'p99': self.quantile(0.99),
+            'buckets': dict(zip([str(bound) for bound in LATENCY_BUCKETS] + ['+Inf'], self.counts)),
+        }
+
+
+# 识别和处理过程的运行指标：各阶段耗时直方图、计数器（字节数、缓存命中、重名冲突等）和按需读取的瞬时值（队列长度）。
+# 热路径上只做一次加锁的累加；未启用时使用 NullMetrics，所有调用都是空操作。
+class Metrics:
+    enabled = True
+    
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = time.time()
+        self.histograms: Dict[str, Histogram] = {}
+        self.counters: Dict[str, float] = {}
+        self.gauges: Dict[str, Callable[[], float]] = {}
+        self.sinks: List = []
+        self._trace_events = None
+        self._report_thread = None
+        self._report_stop = threading.Event()
+    
+    def observe(self, stage: str, start: float):
+        # start 为阶段开始时的 time.perf_counter()
+        elapsed = time.perf_counter() - start
+        with self.lock:
+            histogram = self.histograms.get(stage)
+            if histogram is None:
+                histogram = self.histograms[stage] = Histogram()
+            histogram.observe(elapsed)
+            if self._trace_events is not None and len(self._trace_events) < MAX_TRACE_EVENTS:
+                self._trace_events.append((stage, threading.get_ident(), start, elapsed))
+    
+    def inc(self, name: str, value: float = 1):
+        with self.lock:
+            self.counters[name] = self.counters.get(name, 0) + value
+    
+    def gauge(self, name: str, func: Optional[Callable[[], float]]):
+        # 瞬时值在导出时才读取；func 为 None 时移除
+        with self.lock:
+            if func is None:
+                self.gauges.pop(name, None)
+            else:
+                self.gauges[name] = func
+    
+    def snapshot(self) -> Dict:
+        with self.lock:
+            histograms = {stage: histogram.snapshot() for stage, histogram in self.histograms.items()}
+            counters = dict(self.counters)
+            gauges = list(self.gauges.items())
+        values = {}
+        for name, func in gauges:
+            try:
+                values[name] = func()
+            except Exception:
+                continue
+        return {
+            'timestamp': time.time(),
+            'uptime': time.time() - self.started,
+            'pid': os.getpid(),
+            'stages': histograms,
+            'counters': counters,
+            'gauges': values,
+        }
+    
+    def to_prometheus(self) -> str:
+        snapshot = self.snapshot()
+        lines = []
+        if snapshot['stages']:
+            lines.append("# HELP smartbin_stage_seconds 各处理阶段的耗时")
+            lines.append("# TYPE smartbin_stage_seconds histogram")
+            for stage, histogram in sorted(snapshot['stages'].items()):
+                cumulative = 0
+                for bound, count in histogram['buckets'].items():
+                    cumulative += count
+                    lines.append(f'smartbin_stage_seconds_bucket{{stage="{stage}",le="{bound}"}} {cumulative}')
+                lines.append(f'smartbin_stage_seconds_sum{{stage="{stage}"}} {histogram["sum"]}')
+                lines.append(f'smartbin_stage_seconds_count{{stage="{stage}"}} {histogram["count"]}')
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE smartbin_{name}_total counter")
+            lines.append(f"smartbin_{name}_total {value}")
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f"# TYPE smartbin_{name} gauge")
+            lines.append(f"smartbin_{name} {value}")
+        return "\n".join(lines) + "\n"
+    
+    def add_sink(self, sink):
+        # sink 需要实现 emit(metrics)
+        self.sinks.append(sink)
+    
+    def flush(self):
+        for sink in self.sinks:
+            try:
+                sink.emit(self)
+            except Exception as e:
+                print(f"输出运行指标失败: {e}")
+    
+    def start_reporting(self, interval: float = 10.0):
+        if self._report_thread is not None or not self.sinks:
+            return
+        
+        def report():
+            while not self._report_stop.wait(interval):
+                self.flush()
+        
+        self._report_thread = threading.Thread(target=report, daemon=True)
+        self._report_thread.start()
+    
+    def close(self):
+        self._report_stop.set()
+        self.flush()
+        for sink in self.sinks:
+            if hasattr(sink, 'close'):
+                sink.close()
+        self.sinks = []
+    
+    @contextmanager
+    def trace(self, output: Optional[str]):
+        # 记录期间每个阶段的开始时间、线程和耗时，输出为 Chrome trace 格式（chrome://tracing 或 Perfetto 打开）
+        if not output:
+            yield
+            return
+        with self.lock:
+            self._trace_events = []
+        try:
+            yield
+        finally:
+            with self.lock:
+                events, self._trace_events = self._trace_events, None
+            write_trace(output, events)
+
+
+class NullMetrics(Metrics):
+    enabled = False
+    
+    def observe(self, stage: str, start: float):
+        pass
+    
+    def inc(self, name: str, value: float = 1):
+        pass
+    
+    def gauge(self, name: str, func: Optional[Callable[[], float]]):
+        pass
+
+
+NULL_METRICS = NullMetrics()
+
+
+def write_trace(output: str, events):
+    origin = min((event[2] for event in events), default=0.0)
+    trace_events = [
+        {'name': stage, 'ph': 'X', 'pid': os.getpid(), 'tid': thread,
+         'ts': (start - origin) * 1e6, 'dur': elapsed * 1e6}
+        for stage, thread, start, elapsed in events
+    ]
+    with open(output, 'w', encoding='utf-8') as f:
+        json.dump({'traceEvents': trace_events, 'displayTimeUnit': 'ms'}, f)
+
+
+def _write_atomic(path: Path, text: str):
+    fd, temp_path = tempfile.mkstemp(prefix=path.name + ".", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, 'w', encoding='utf-8') as f:
+            f.write(text)
+        os.replace(temp_path, path)
+    except BaseException:
+        try:
+            os.unlink(temp_path)
+        except OSError:
+            pass
+        raise
+
+
+class JsonSnapshotSink:
+    # 定期把快照写入 JSON 文件（原子替换，读取方不会看到写了一半的文件）
+    def __init__(self, path: Path):
+        self.path = Path(path)
+    
+    def emit(self, metrics: Metrics):
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        _write_atomic(self.path, json.dumps(metrics.snapshot(), ensure_ascii=False, indent=2))
+
+
+class PrometheusEndpoint:
+    # 本地 HTTP 端点，以 Prometheus 文本格式导出；默认只监听 127.0.0.1
+    def __init__(self, metrics: Metrics, host: str = "127.0.0.1", port: int = 9464):
+        # 只在守护模式开启端点时才加载 http.server
+        from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+        self.metrics = metrics
+        
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(handler):
+                if handler.path.split('?')[0] not in ('/', '/metrics'):
+                    handler.send_error(404)
+                    return
+                body = metrics.to_prometheus().encode('utf-8')
+                handler.send_response(200)
+                handler.send_header('Content-Type', 'text/plain; version=0.0.4; charset=utf-8')
+                handler.send_header('Content-Length', str(len(body)))
+                handler.end_headers()
+                handler.wfile.write(body)
+            
+            def log_message(handler, format, *args):
+                pass
+        
+        self.server = ThreadingHTTPServer((host, port), Handler)
+        self.server.daemon_threads = True
+        self.thread = threading.Thread(target=self.server.serve_forever, daemon=True)
+        self.thread.start()
+    
+    @property
+    def address(self):
+        return self.server.server_address
+    
+    def emit(self, metrics: Metrics):
+        pass
+    
+    def close(self):
+        self.server.shutdown()
+        self.server.server_close()
+
+
+@contextmanager
+def profiled(output: Optional[str]):
+    # 用 cProfile 分析一次批量处理，结果可用 python -m pstats 或 snakeviz 查看；只分析调用线程
+    if not output:
+        yield
+        return
+    import cProfile
+    profiler = cProfile.Profile()
+    profiler.enable()
+    try:
+        yield
+    finally:
+        profiler.disable()
+        profiler.dump_stats(output)
+
+
+def create_metrics(config, serve: bool = False) -> Metrics:
+    # serve: 守护模式下按配置启动 Prometheus 端点
+    settings = config.config.get('metrics', {})
+    if not settings.get('enabled', False):
+        return NULL_METRICS
+    metrics = Metrics()
+    if settings.get('snapshot', True):
+        metrics.add_sink(JsonSnapshotSink(config.config_dir / "metrics.json"))
+    port = settings.get('prometheus_port', 0)
+    if serve and port:
+        try:
+            metrics.add_sink(PrometheusEndpoint(metrics, settings.get('prometheus_host', "127.0.0.1"), port))
+        except OSError as e:
+            print(f"启动指标端点失败: {e}")
+    metrics.start_reporting(settings.get('snapshot_interval', 10.0))
+    atexit.register(metrics.close)
+    return metrics
\ No newline at end of file
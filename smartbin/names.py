@@ -0,0 +1,134 @@
+import os
+import re
+import threading
+from pathlib import Path
+from typing import Callable, Dict, Optional, Tuple
+
+# 匹配 "名称(编号)" 形式的文件名主干
+_NUMBERED_STEM = re.compile(r'^(.*)\((\d+)\)$')
+
+
+def _split(name: str) -> Tuple[str, str]:
+    path = Path(name)
+    return path.stem, path.suffix
+
+
+# 单个目标目录的文件名索引：首次使用时 scandir 一次，之后在内存中分配不冲突的文件名。
+# 每个 (主干, 扩展名) 记录已出现的最大编号，重命名时直接取下一个编号，不再逐个探测。
+class DirectoryNameIndex:
+    def __init__(self, directory: Path):
+        self.directory = Path(directory)
+        self.lock = threading.Lock()
+        self.names = set()
+        # 本进程分配过、还没有落盘的名称；移动完成或失败后释放，之后由 lstat 判断是否仍然存在
+        self.claimed = set()
+        self.highest: Dict[Tuple[str, str], int] = {}
+        try:
+            with os.scandir(self.directory) as entries:
+                for entry in entries:
+                    self._add(entry.name)
+        except FileNotFoundError:
+            pass
+    
+    def _key(self, name: str) -> str:
+        # 不区分大小写的文件系统（Windows）上按规范化后的名称判断冲突
+        return os.path.normcase(name)
+    
+    def _add(self, name: str):
+        self.names.add(self._key(name))
+        stem, suffix = _split(name)
+        match = _NUMBERED_STEM.match(stem)
+        if match:
+            key = (self._key(match.group(1)), self._key(suffix))
+            number = int(match.group(2))
+            if number > self.highest.get(key, 0):
+                self.highest[key] = number
+    
+    def __contains__(self, name: str) -> bool:
+        with self.lock:
+            return self._key(name) in self.names
+    
+    def add(self, name: str):
+        with self.lock:
+            self._add(name)
+    
+    def discard(self, name: str):
+        with self.lock:
+            self.names.discard(self._key(name))
+            self.claimed.discard(self._key(name))
+    
+    def release(self, name: str):
+        with self.lock:
+            self.claimed.discard(self._key(name))
+    
+    def claim(self, name: str, overwrite: bool = False) -> str:
+        # 分配一个名称并立即登记，同一进程中的其他线程不会再拿到它
+        with self.lock:
+            return self._claim(self._allocate(name, overwrite))
+    
+    def suggest(self, name: str, overwrite: bool = False, taken: Optional[Callable[[str], bool]] = None) -> str:
+        # 与 claim 相同的分配规则，但不登记（只输出计划时使用）；taken(name) 为调用方已计划使用的名称
+        with self.lock:
+            return self._allocate(name, overwrite, taken)
+    
+    def _allocate(self, name: str, overwrite: bool, taken: Optional[Callable[[str], bool]] = None) -> str:
+        if overwrite or (self._is_free(name) and not (taken and taken(name))):
+            return name
+        
+        stem, suffix = _split(name)
+        key = (self._key(stem), self._key(suffix))
+        counter = self.highest.get(key, 0) + 1
+        while True:
+            candidate = f"{stem}({counter}){suffix}"
+            if self._key(candidate) not in self.names and not (taken and taken(candidate)):
+                return candidate
+            counter += 1
+    
+    def _is_free(self, name: str) -> bool:
+        key = self._key(name)
+        if key not in self.names:
+            return True
+        # 扫描时存在的原名可能已被用户删除，用一次 lstat 确认（只针对原名，不逐个探测编号）
+        if key not in self.claimed and not os.path.lexists(self.directory / name):
+            self.names.discard(key)
+            return True
+        return False
+    
+    def _claim(self, name: str) -> str:
+        self._add(name)
+        self.claimed.add(self._key(name))
+        return name
+
+
+class NameIndexRegistry:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.indexes: Dict[Path, DirectoryNameIndex] = {}
+    
+    def get(self, directory: Path) -> DirectoryNameIndex:
+        directory = Path(directory)
+        with self.lock:
+            index = self.indexes.get(directory)
+            if index is None:
+                index = self.indexes[directory] = DirectoryNameIndex(directory)
+            return index
+    
+    def forget(self, file_path: Path):
+        # 文件被移走（如撤销操作）后释放其名称；目录尚未建立索引时无需处理
+        file_path = Path(file_path)
+        with self.lock:
+            index = self.indexes.get(file_path.parent)
+        if index is not None:
+            index.discard(file_path.name)
+    
+    def release(self, file_path: Path):
+        # 文件已放置到目标位置（或放置失败）后调用，名称保留在索引中，但不再视为本进程占用
+        file_path = Path(file_path)
+        with self.lock:
+            index = self.indexes.get(file_path.parent)
+        if index is not None:
+            index.release(file_path.name)
+    
+    def clear(self):
+        with self.lock:
+            self.indexes.clear()
\ No newline at end of file
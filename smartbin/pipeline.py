@@ -0,0 +1,191 @@
+import threading
+import time
+from pathlib import Path
+from queue import Queue
+from typing import Callable, Dict, Iterable, List, Optional
+
+_DONE = object()
+
+
+# 识别 -> 规划 -> 移动 -> 哈希 四级流水线，各级之间用有界队列连接。
+# 规划阶段只有一个线程且按输入顺序处理，同名冲突的解析结果与串行处理一致；
+# 数据移动和哈希计算在各自的线程池中并行执行。结果不在流水线中保留，只通过 callback 逐个传出。
+class BatchPipeline:
+    def __init__(self, processor, recognizer, recognize_workers: int = 4, move_workers: int = 2,
+                 hash_workers: int = 2, queue_size: int = 64):
+        self.processor = processor
+        self.recognizer = recognizer
+        self.recognize_workers = max(1, recognize_workers)
+        self.move_workers = max(1, move_workers)
+        self.hash_workers = max(1, hash_workers)
+        self.queue_size = max(1, queue_size)
+    
+    def run(self, file_paths: Iterable[str], callback: Optional[Callable[[int, Dict], None]] = None,
+            should_stop: Optional[Callable[[], bool]] = None) -> int:
+        # 返回送入流水线的文件数，每个文件的结果以 callback(index, result) 传出
+        self.errors = []
+        self.callback = callback
+        # 已规划但还没有移动完成的目标路径；移动完成后移除，内存占用只与队列长度有关，与文件总数无关
+        self.reserved = set()
+        self.inflight = {}
+        self.inflight_lock = threading.Lock()
+        self.recognize_queue = Queue(self.queue_size)
+        self.plan_queue = Queue(self.queue_size)
+        self.move_queue = Queue(self.queue_size)
+        self.hash_queue = Queue(self.queue_size)
+        queues = {'recognize': self.recognize_queue, 'plan': self.plan_queue,
+                  'move': self.move_queue, 'hash': self.hash_queue}
+        # 各级队列的长度在导出指标时读取，不影响处理速度
+        for stage, queue in queues.items():
+            self.processor.metrics.gauge(f"queue_depth_{stage}", queue.qsize)
+        
+        recognizers = self._start(self._recognize_worker, self.recognize_queue, self.recognize_workers)
+        planner = self._start(self._plan_worker, self.plan_queue, 1)
+        movers = self._start(self._move_worker, self.move_queue, self.move_workers)
+        hashers = self._start(self._hash_worker, self.hash_queue, self.hash_workers)
+        
+        total = 0
+        for index, file_path in enumerate(file_paths):
+            if should_stop and should_stop():
+                break
+            self.recognize_queue.put((index, file_path))
+            total += 1
+        
+        self._finish(self.recognize_queue, recognizers)
+        self._finish(self.plan_queue, planner)
+        self._finish(self.move_queue, movers)
+        self._finish(self.hash_queue, hashers)
+        for stage in queues:
+            self.processor.metrics.gauge(f"queue_depth_{stage}", None)
+        
+        if self.errors:
+            raise RuntimeError(f"批量处理线程异常退出: {self.errors[0]}") from self.errors[0]
+        return total
+    
+    def _start(self, target, queue: Queue, count: int) -> List[threading.Thread]:
+        threads = [threading.Thread(target=self._guard, args=(target, queue), daemon=True) for _ in range(count)]
+        for thread in threads:
+            thread.start()
+        return threads
+    
+    def _guard(self, target, queue: Queue):
+        # 某一级线程异常退出时记录错误，并继续取走本级的输入直到结束标记，上游不会因队列已满而阻塞；
+        # run 在所有线程结束后抛出异常
+        try:
+            target()
+        except BaseException as e:
+            self.errors.append(e)
+            while queue.get() is not _DONE:
+                pass
+    
+    def _finish(self, queue: Queue, threads: List[threading.Thread]):
+        for _ in threads:
+            queue.put(_DONE)
+        for thread in threads:
+            thread.join()
+    
+    def _set_result(self, index: int, result: Dict):
+        self.processor.count_result(result)
+        if self.callback:
+            self.callback(index, result)
+    
+    def _recognize_worker(self):
+        while True:
+            item = self.recognize_queue.get()
+            if item is _DONE:
+                return
+            index, file_path = item
+            try:
+                category, mime_type, status = self.processor.classify(self.recognizer, file_path)
+            except Exception as e:
+                self.plan_queue.put((index, file_path, None, str(e), "错误"))
+                continue
+            self.plan_queue.put((index, file_path, category, mime_type, status))
+    
+    def _plan_worker(self):
+        pending = {}
+        next_index = 0
+        overwrite = self.processor.config.config.get('conflict_strategy', 'rename') == 'overwrite'
+        
+        while True:
+            item = self.plan_queue.get()
+            if item is _DONE:
+                return
+            pending[item[0]] = item
+            
+            # 按输入顺序放行，保证冲突解析结果与串行处理一致
+            while next_index in pending:
+                index, file_path, category, mime_type, status = pending.pop(next_index)
+                next_index += 1
+                
+                if status == "伪装文件":
+                    self.processor.metrics.inc('disguised_files')
+                    self._set_result(index, {
+                        'success': False,
+                        'error': f'检测到伪装文件: {mime_type}',
+                        'source': file_path
+                    })
+                    continue
+                if status == "错误":
+                    self._set_result(index, {
+                        'success': False,
+                        'error': mime_type,
+                        'source': file_path
+                    })
+                    continue
+                
+                source_path = Path(file_path)
+                start = time.perf_counter()
+                try:
+                    target_path = self.processor._resolve_target(source_path, category, self.reserved)
+                except Exception as e:
+                    # 例如分类文件夹的名称被同名文件占用，mkdir 失败
+                    self._set_result(index, {
+                        'success': False,
+                        'error': str(e),
+                        'source': file_path
+                    })
+                    continue
+                self.processor.metrics.observe('resolve', start)
+                if isinstance(target_path, dict):
+                    self._set_result(index, target_path)
+                    continue
+                
+                # 覆盖策略下，同一目标路径的移动必须按顺序完成
+                with self.inflight_lock:
+                    previous = self.inflight.get(target_path) if overwrite else None
+                if previous is not None:
+                    previous.wait()
+                moved = threading.Event()
+                with self.inflight_lock:
+                    self.reserved.add(target_path)
+                    self.inflight[target_path] = moved
+                self.move_queue.put((index, source_path, target_path, category, moved))
+    
+    def _move_worker(self):
+        while True:
+            item = self.move_queue.get()
+            if item is _DONE:
+                return
+            index, source_path, target_path, category, moved = item
+            try:
+                result = self.processor._move(source_path, target_path, category)
+            finally:
+                moved.set()
+                # 文件已经落盘（或移动失败），之后的冲突由文件系统和名称索引判断
+                with self.inflight_lock:
+                    if self.inflight.get(target_path) is moved:
+                        del self.inflight[target_path]
+                        self.reserved.discard(target_path)
+            if result['success']:
+                self.hash_queue.put((index, result))
+            else:
+                self._set_result(index, result)
+    
+    def _hash_worker(self):
+        while True:
+            item = self.hash_queue.get()
+            if item is _DONE:
+                return
+            index, result = item
+            self._set_result(index, self.processor._record(result))
\ No newline at end of file
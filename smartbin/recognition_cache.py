@@ -0,0 +1,177 @@
+import atexit
+import json
+import os
+import sqlite3
+import threading
+from collections import OrderedDict
+from pathlib import Path
+from typing import Dict, Optional, Tuple
+
+# analyze_content 尚未计算时的占位值（None 是合法的分析结果）
+NOT_ANALYZED = '\x00'
+
+PERSIST_BATCH_SIZE = 256
+
+
+def cache_key(file_path: str, stat: os.stat_result) -> Tuple:
+    # 扩展名参与识别，文件改名后即使 inode 不变也要重新识别
+    return (stat.st_dev, stat.st_ino, stat.st_size, stat.st_mtime_ns, Path(file_path).suffix.lower())
+
+
+def content_version(config) -> str:
+    # 内容分析的设置（关键词表、阈值），缓存的内容分类只在设置相同时有效
+    return json.dumps(config.config.get('content_analysis'), sort_keys=True, ensure_ascii=False)
+
+
+class RecognitionCache:
+    def __init__(self, max_entries: int = 100000, db_file=None, content_version: str = ''):
+        self.max_entries = max_entries
+        self.entries = OrderedDict()
+        self.lock = threading.Lock()
+        
+        self.hits = 0
+        self.misses = 0
+        self.persistent_hits = 0
+        
+        self.conn = None
+        self.pending = {}
+        self.content_version = None
+        if db_file is not None:
+            Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+            self.conn = sqlite3.connect(str(db_file), check_same_thread=False, isolation_level=None)
+            self.conn.execute("PRAGMA journal_mode=WAL")
+            self.conn.execute("PRAGMA synchronous=NORMAL")
+            self.conn.execute("""
+                CREATE TABLE IF NOT EXISTS recognition_cache (
+                    dev INTEGER, ino INTEGER, size INTEGER, mtime_ns INTEGER, suffix TEXT,
+                    category TEXT, mime_type TEXT, status TEXT, content_category TEXT,
+                    PRIMARY KEY (dev, ino, size, mtime_ns, suffix)
+                ) WITHOUT ROWID
+            """)
+            self.conn.execute("CREATE TABLE IF NOT EXISTS recognition_cache_meta (key TEXT PRIMARY KEY, value TEXT)")
+        self.set_content_version(content_version)
+    
+    def get(self, key: Tuple) -> Optional[Tuple[str, str, str, Optional[str]]]:
+        with self.lock:
+            value = self.entries.get(key)
+            if value is not None:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return value
+            
+            value = self.pending.get(key)
+            if value is None and self.conn is not None:
+                row = self.conn.execute(
+                    "SELECT category, mime_type, status, content_category FROM recognition_cache "
+                    "WHERE dev = ? AND ino = ? AND size = ? AND mtime_ns = ? AND suffix = ?",
+                    key
+                ).fetchone()
+                value = tuple(row) if row else None
+            
+            if value is None:
+                self.misses += 1
+                return None
+            
+            self.persistent_hits += 1
+            self.hits += 1
+            self._put_memory(key, value)
+            return value
+    
+    def put(self, key: Tuple, category: str, mime_type: str, status: str, content_category: Optional[str] = NOT_ANALYZED):
+        value = (category, mime_type, status, content_category)
+        with self.lock:
+            self._put_memory(key, value)
+            if self.conn is not None:
+                self.pending[key] = value
+                if len(self.pending) >= PERSIST_BATCH_SIZE:
+                    self._flush_locked()
+    
+    def set_content(self, key: Tuple, content_category: Optional[str]):
+        with self.lock:
+            value = self.entries.get(key) or self.pending.get(key)
+        if value is not None:
+            self.put(key, value[0], value[1], value[2], content_category)
+    
+    def set_content_version(self, version: str):
+        # 内容分析的设置变化后（包括两次运行之间），已缓存的内容分类作废；文件类型的识别结果仍然有效
+        with self.lock:
+            if version == self.content_version:
+                return
+            self.content_version = version
+            for values in (self.entries, self.pending):
+                for key, value in list(values.items()):
+                    if value[3] != NOT_ANALYZED:
+                        values[key] = value[:3] + (NOT_ANALYZED,)
+            if self.conn is None:
+                return
+            row = self.conn.execute("SELECT value FROM recognition_cache_meta WHERE key = 'content_version'").fetchone()
+            if row is not None and row[0] == version:
+                return
+            self.conn.execute("BEGIN")
+            try:
+                self.conn.execute("UPDATE recognition_cache SET content_category = ? WHERE content_category != ?",
+                                  (NOT_ANALYZED, NOT_ANALYZED))
+                self.conn.execute("INSERT OR REPLACE INTO recognition_cache_meta VALUES ('content_version', ?)", (version,))
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+    
+    def _put_memory(self, key: Tuple, value: Tuple):
+        self.entries[key] = value
+        self.entries.move_to_end(key)
+        while len(self.entries) > self.max_entries:
+            self.entries.popitem(last=False)
+    
+    def flush(self):
+        with self.lock:
+            self._flush_locked()
+    
+    def _flush_locked(self):
+        if self.conn is None or not self.pending:
+            return
+        rows = [key + value for key, value in self.pending.items()]
+        self.pending.clear()
+        self.conn.execute("BEGIN")
+        try:
+            self.conn.executemany("INSERT OR REPLACE INTO recognition_cache VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)", rows)
+            self.conn.execute("COMMIT")
+        except Exception:
+            self.conn.execute("ROLLBACK")
+            raise
+    
+    def stats(self) -> Dict[str, float]:
+        with self.lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'persistent_hits': self.persistent_hits,
+                'entries': len(self.entries),
+                'hit_rate': self.hits / lookups if lookups else 0.0
+            }
+    
+    def clear(self):
+        with self.lock:
+            self.entries.clear()
+            self.pending.clear()
+            self.hits = self.misses = self.persistent_hits = 0
+            if self.conn is not None:
+                self.conn.execute("DELETE FROM recognition_cache")
+    
+    def close(self):
+        with self.lock:
+            if self.conn is not None:
+                self._flush_locked()
+                self.conn.close()
+                self.conn = None
+
+
+def create_cache(config) -> Optional[RecognitionCache]:
+    settings = config.config.get('recognition_cache', {})
+    if not settings.get('enabled', True):
+        return None
+    db_file = config.config_dir / "recognition_cache.db" if settings.get('persistent', False) else None
+    cache = RecognitionCache(settings.get('max_entries', 100000), db_file, content_version(config))
+    atexit.register(cache.close)
+    return cache
\ No newline at end of file
@@ -0,0 +1,284 @@
+import fnmatch
+import os
+import re
+import time
+from bisect import bisect_left
+from collections import Counter
+from typing import Dict, List, Optional
+
+DAY_SECONDS = 24 * 3600
+
+
+
+def _as_list(value) -> List:
+    if value is None:
+        return []
+    if isinstance(value, (list, tuple)):
+        return list(value)
+    return [value]
+
+
+def _normalize_extension(extension: str) -> str:
+    extension = extension.lower()
+    return extension if extension.startswith('.') else '.' + extension
+
+
+# 预筛选索引的片段长度；只有两个字的片段（中文关键词很常见）直接作为索引键
+GRAM_SIZE = 3
+MIN_GRAM_SIZE = 2
+_REGEX_META = set('.^$*+?{}[]\\|()')
+# 正则开头的全局标志，如 (?i)
+_GLOBAL_FLAGS = re.compile(r'\(\?([aiLmsux]+)\)')
+
+
+def _glob_literals(glob: str) -> List[str]:
+    # 通配符中连续的普通字符片段，文件名必须包含其中每一段
+    runs = ['']
+    i = 0
+    while i < len(glob):
+        char = glob[i]
+        if char in '*?':
+            runs.append('')
+        elif char == '[':
+            # 与 fnmatch 相同的字符集解析规则；没有闭合的 '[' 按普通字符处理
+            j = i + 1
+            if j < len(glob) and glob[j] == '!':
+                j += 1
+            if j < len(glob) and glob[j] == ']':
+                j += 1
+            j = glob.find(']', j)
+            if j < 0:
+                runs[-1] += char
+            else:
+                runs.append('')
+                i = j
+        else:
+            runs[-1] += char
+        i += 1
+    return [run.lower() for run in runs if run]
+
+
+def _regex_literals(regex: str) -> List[str]:
+    # 正则开头的普通字符片段；含有 '|' 或以特殊结构开头时无法确定，返回空列表
+    if '|' in regex:
+        return []
+    run = ''
+    for i, char in enumerate(regex.lstrip('^')):
+        if char in _REGEX_META:
+            if char in '*?{' and run:
+                run = run[:-1]
+            break
+        run += char
+    return [run.lower()] if run else []
+
+
+def _scoped(regex: str) -> str:
+    # 多个正则合并为一个模式时，开头的全局标志改写为只作用于本段的 (?i:...)；
+    # 全局标志不在整个模式开头时 Python 3.11 起会报错
+    flags = ''
+    match = _GLOBAL_FLAGS.match(regex)
+    while match:
+        flags += match.group(1)
+        regex = regex[match.end():]
+        match = _GLOBAL_FLAGS.match(regex)
+    return f"(?{flags}:{regex})" if flags else f"(?:{regex})"
+
+
+def _grams(literal: str) -> List[str]:
+    if len(literal) < GRAM_SIZE:
+        return [literal] if len(literal) >= MIN_GRAM_SIZE else []
+    return [literal[i:i + GRAM_SIZE] for i in range(len(literal) - GRAM_SIZE + 1)]
+
+
+class _FileFacts:
+    # 规则求值时按需获取的文件属性，stat 最多执行一次
+    __slots__ = ('file_path', 'mime_type', '_stat', 'now')
+    
+    def __init__(self, file_path: str, mime_type: Optional[str], stat: Optional[os.stat_result] = None):
+        self.file_path = file_path
+        self.mime_type = mime_type or ''
+        self._stat = stat
+        self.now = None
+    
+    def stat(self) -> Optional[os.stat_result]:
+        if self._stat is None:
+            try:
+                self._stat = os.stat(self.file_path)
+            except OSError:
+                return None
+        return self._stat
+
+
+class Rule:
+    __slots__ = ('index', 'category', 'extensions', 'pattern', 'literals', 'grams', 'mimes', 'mime_prefixes',
+                 'min_size', 'max_size', 'min_age', 'max_age')
+    
+    def __init__(self, index: int, spec: Dict):
+        category = spec.get('category')
+        if not category:
+            raise ValueError("规则缺少 category")
+        self.index = index
+        self.category = category
+        self.extensions = {_normalize_extension(ext) for ext in _as_list(spec.get('extensions'))}
+        
+        # 通配符（不区分大小写，整个文件名匹配）和正则（在文件名中搜索）合并为一个模式
+        globs = _as_list(spec.get('glob'))
+        regexes = _as_list(spec.get('regex'))
+        alternatives = [f"(?i:{fnmatch.translate(glob)})" for glob in globs]
+        alternatives += [f"(?s:.*?){_scoped(regex)}" for regex in regexes]
+        self.pattern = re.compile('|'.join(alternatives)) if alternatives else None
+        # 每个模式必须出现的字符片段，用于建立预筛选索引；任一模式没有片段时为 None
+        self.literals = [_glob_literals(glob) for glob in globs] + [_regex_literals(regex) for regex in regexes]
+        self.grams = None
+        
+        mimes = [mime.lower() for mime in _as_list(spec.get('mime'))]
+        self.mimes = {mime for mime in mimes if not mime.endswith('*')}
+        self.mime_prefixes = tuple(mime[:-1] for mime in mimes if mime.endswith('*'))
+        
+        self.min_size = spec.get('min_size')
+        self.max_size = spec.get('max_size')
+        self.min_age = spec['min_age_days'] * DAY_SECONDS if spec.get('min_age_days') is not None else None
+        self.max_age = spec['max_age_days'] * DAY_SECONDS if spec.get('max_age_days') is not None else None
+    
+    def check(self, facts: _FileFacts) -> bool:
+        # 扩展名和文件名已在索引阶段判断；剩余条件按开销从低到高求值：MIME -> 大小 -> 修改时间
+        if self.mimes or self.mime_prefixes:
+            mime_type = facts.mime_type
+            if mime_type not in self.mimes and not (self.mime_prefixes and mime_type.startswith(self.mime_prefixes)):
+                return False
+        
+        if self.min_size is not None or self.max_size is not None:
+            stat = facts.stat()
+            if stat is None:
+                return False
+            if self.min_size is not None and stat.st_size < self.min_size:
+                return False
+            if self.max_size is not None and stat.st_size > self.max_size:
+                return False
+        
+        if self.min_age is not None or self.max_age is not None:
+            stat = facts.stat()
+            if stat is None:
+                return False
+            if facts.now is None:
+                facts.now = time.time()
+            age = facts.now - stat.st_mtime
+            if self.min_age is not None and age < self.min_age:
+                return False
+            if self.max_age is not None and age > self.max_age:
+                return False
+        return True
+
+
+class _Bucket:
+    # 某个扩展名下可能命中的规则，按有无文件名模式分开并保持配置顺序
+    __slots__ = ('plain', 'plain_min_size', 'patterned', 'patterned_indexes', 'grams', 'gram_sizes', 'unindexed')
+    
+    def __init__(self, rules: List[Rule]):
+        rules = sorted(rules, key=lambda rule: rule.index)
+        self.plain = [rule for rule in rules if rule.pattern is None]
+        self.patterned = [rule for rule in rules if rule.pattern is not None]
+        self.patterned_indexes = [rule.index for rule in self.patterned]
+        # 所有无模式规则都要求的最小文件大小：文件更小时整组跳过（如"大文件单独归档"一类的规则）
+        self.plain_min_size = min((rule.min_size or 0 for rule in self.plain), default=0)
+        
+        # 索引片段 -> 规则位置；无法建立索引的规则每次都要逐条匹配
+        self.grams: Dict[str, List[int]] = {}
+        self.unindexed: List[int] = []
+        for position, rule in enumerate(self.patterned):
+            if rule.grams is None:
+                self.unindexed.append(position)
+                continue
+            for gram in rule.grams:
+                self.grams.setdefault(gram, []).append(position)
+        self.gram_sizes = sorted({len(gram) for gram in self.grams})
+    
+    def candidates(self, name: str, end: int) -> List[int]:
+        # 文件名中每个片段查一次哈希表，开销只与文件名长度有关，与规则数量无关
+        positions = set(position for position in self.unindexed if position < end)
+        lowered = name.lower()
+        for size in self.gram_sizes:
+            for i in range(len(lowered) - size + 1):
+                hits = self.grams.get(lowered[i:i + size])
+                if hits:
+                    positions.update(position for position in hits if position < end)
+        return sorted(positions)
+
+
+# 编译后的分类规则：自定义规则按配置顺序，第一条满足全部条件的规则生效；
+# 都不满足时按 default_categories 的扩展名表归类。
+class RuleSet:
+    def __init__(self, categories: Dict[str, List[str]], custom_rules: List[Dict]):
+        self.extension_map: Dict[str, str] = {}
+        self.categories = list(categories)
+        for category, extensions in categories.items():
+            for extension in extensions:
+                self.extension_map.setdefault(_normalize_extension(extension), category)
+        
+        self.rules: List[Rule] = []
+        for spec in custom_rules:
+            try:
+                rule = Rule(len(self.rules), spec)
+            except (ValueError, TypeError, KeyError, re.error) as e:
+                print(f"忽略无效的自定义规则 {spec!r}: {e}")
+                continue
+            self.rules.append(rule)
+            if rule.category not in self.categories:
+                self.categories.append(rule.category)
+        
+        # 每个模式选出现次数最少的片段作为索引键，减少误命中
+        frequency = Counter(
+            gram for rule in self.rules for literals in rule.literals for literal in literals
+            for gram in _grams(literal)
+        )
+        for rule in self.rules:
+            grams = []
+            for literals in rule.literals:
+                options = [gram for literal in literals for gram in _grams(literal)]
+                if not options:
+                    grams = None
+                    break
+                grams.append(min(options, key=frequency.__getitem__))
+            rule.grams = grams
+        
+        # 扩展名 -> 候选规则；没有扩展名条件的规则出现在每个桶中
+        generic = [rule for rule in self.rules if not rule.extensions]
+        by_extension: Dict[str, List[Rule]] = {}
+        for rule in self.rules:
+            for extension in rule.extensions:
+                by_extension.setdefault(extension, list(generic)).append(rule)
+        self.generic_bucket = _Bucket(generic)
+        self.buckets = {extension: _Bucket(rules) for extension, rules in by_extension.items()}
+    
+    def __len__(self):
+        return len(self.rules)
+    
+    def category_for_extension(self, extension: str) -> Optional[str]:
+        return self.extension_map.get(_normalize_extension(extension)) if extension else None
+    
+    def match(self, file_path: str, mime_type: Optional[str] = None,
+              stat: Optional[os.stat_result] = None) -> Optional[str]:
+        if not self.rules:
+            return None
+        name = os.path.basename(file_path)
+        bucket = self.buckets.get(os.path.splitext(name)[1].lower(), self.generic_bucket)
+        facts = _FileFacts(file_path, mime_type, stat)
+        
+        # 先找第一条满足条件的无文件名模式规则，之后只需检查编号比它小的带模式规则
+        found = None
+        plain = bucket.plain
+        if bucket.plain_min_size:
+            stat = facts.stat()
+            if stat is None or stat.st_size < bucket.plain_min_size:
+                plain = ()
+        for rule in plain:
+            if rule.check(facts):
+                found = rule
+                break
+        end = bisect_left(bucket.patterned_indexes, found.index) if found else len(bucket.patterned)
+        
+        for position in bucket.candidates(name, end):
+            rule = bucket.patterned[position]
+            if rule.pattern.match(name) and rule.check(facts):
+                return rule.category
+        return found.category if found else None
\ No newline at end of file
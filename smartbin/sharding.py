@@ -0,0 +1,237 @@
+import multiprocessing
+import os
+import time
+from array import array
+from collections import deque
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+
+from smartbin.file_processor import classify_file
+from smartbin.walker import _name_matcher, _normalize
+
+# 每个识别任务包含的文件数；目录中的文件更多时拆成多个任务分给不同的进程
+CHUNK_SIZE = 512
+
+# 识别失败时使用的状态，与并行流水线一致
+ERROR_STATUS = "错误"
+
+# 工作进程内的识别器和规则表、目录遍历选项，由 _init_worker 创建
+_worker = None
+_walk = None
+
+
+def _init_worker(settings: Dict):
+    global _worker, _walk
+    from smartbin.file_recognizer import FileRecognizer
+    from smartbin.keywords import build_matcher
+    from smartbin.rules import RuleSet
+    
+    recognizer = FileRecognizer(keyword_matcher=build_matcher(settings.get('content_analysis')),
+                                sniff_unknown=settings.get('sniff_text', True))
+    rules = RuleSet(settings.get('default_categories', {}), settings.get('custom_rules', []))
+    _worker = (recognizer, rules, settings.get('enable_content_analysis', False))
+    # 与 walker.iter_entries 相同的遍历规则，多进程扫描和单进程遍历访问同样的文件
+    walk = settings.get('walk', {})
+    _walk = (walk.get('max_depth'), _name_matcher(walk.get('ignore')), _name_matcher(walk.get('keep')),
+             {_normalize(path) for path in walk.get('exclude', ())}, walk.get('follow_symlinks', False))
+
+
+def _recognize(directory: str, names: List[str]) -> Tuple:
+    # 结果按块返回：文件名列表 + 本块内不重复的 (分类, MIME, 状态) 表 + 每个文件在表中的编号，
+    # 同一目录下的大量文件只传一次目录名和一份分类表
+    recognizer, rules, content_analysis = _worker
+    table = []
+    positions = {}
+    codes = array('I')
+    for name in names:
+        file_path = os.path.join(directory, name)
+        try:
+            result = classify_file(recognizer, rules, file_path, content_analysis)
+        except Exception as e:
+            result = (None, str(e), ERROR_STATUS)
+        code = positions.get(result)
+        if code is None:
+            code = positions[result] = len(table)
+            table.append(result)
+        codes.append(code)
+    return directory, names, table, codes
+
+
+def _scan_directory(directory: str, depth: int, chunk_size: int) -> Tuple:
+    # 遍历一个目录（不递归）：子目录交回协调进程重新分配，第一块文件直接识别，其余的拆成块交回
+    # 子目录附带 (st_dev, st_ino)，跟随符号链接时协调进程据此跳过已进入的目录
+    max_depth, ignored, kept, excluded, follow_symlinks = _walk
+    subdirs = []
+    names = []
+    try:
+        with os.scandir(directory) as it:
+            for entry in it:
+                if ignored is not None and ignored(entry.name):
+                    continue
+                try:
+                    if entry.is_file(follow_symlinks=follow_symlinks):
+                        names.append(entry.name)
+                    elif entry.is_dir(follow_symlinks=follow_symlinks):
+                        if kept is not None and kept(entry.name):
+                            names.append(entry.name)
+                        elif (max_depth is None or depth < max_depth) and _normalize(entry.path) not in excluded:
+                            key = None
+                            if follow_symlinks:
+                                stat = entry.stat()
+                                key = (stat.st_dev, stat.st_ino)
+                            subdirs.append((entry.path, key))
+                except OSError:
+                    continue
+    except OSError:
+        pass
+    chunks = [names[i:i + chunk_size] for i in range(chunk_size, len(names), chunk_size)]
+    return subdirs, _recognize(directory, names[:chunk_size]), chunks
+
+
+def _settings(config, walk: Dict) -> Dict:
+    keys = ('default_categories', 'custom_rules', 'content_analysis', 'enable_content_analysis', 'sniff_text')
+    settings = {key: config.config.get(key) for key in keys if key in config.config}
+    settings['walk'] = walk
+    return settings
+
+
+# 多进程扫描：目录遍历和识别分片到多个进程中执行，结果在协调进程中汇总。
+# 每个任务是一个目录或一块文件，进程之间只传递目录名、文件名和紧凑的识别结果；
+# 文件移动和重名冲突解析只在协调进程中进行，结果与单进程处理一致。
+# walk_options 为 walker.walk_options 的结果，不传时按 walker.iter_paths 的默认值遍历
+class ShardedScanner:
+    def __init__(self, config, workers: Optional[int] = None, chunk_size: int = CHUNK_SIZE, recursive: bool = True,
+                 walk_options: Optional[Dict] = None):
+        self.config = config
+        self.workers = max(1, workers or os.cpu_count() or 1)
+        self.chunk_size = max(1, chunk_size)
+        self.walk = dict(walk_options or {})
+        self.expand = self.walk.pop('expand', True)
+        if not recursive:
+            self.walk['max_depth'] = 0
+        self.progress = {'directories': 0, 'recognized': 0, 'processed': 0, 'failed': 0, 'pending_tasks': 0}
+    
+    def _initial_tasks(self, paths: Iterable[str]) -> deque:
+        # 与 walker.iter_paths 一致：expand=False 或名称匹配 keep 的目录作为一个整体交给识别
+        kept = _name_matcher(self.walk.get('keep'))
+        tasks = deque()
+        loose = {}
+        for path in paths:
+            path = os.path.abspath(path)
+            whole = not self.expand or (kept is not None and kept(os.path.basename(path)))
+            if os.path.isdir(path) and not whole:
+                if self._enter(path):
+                    tasks.append(('directory', path, 0))
+            else:
+                directory, name = os.path.split(path)
+                loose.setdefault(directory, []).append(name)
+        for directory, names in loose.items():
+            for i in range(0, len(names), self.chunk_size):
+                tasks.append(('files', directory, names[i:i + self.chunk_size]))
+        return tasks
+    
+    def _enter(self, directory: str, key: Optional[Tuple[int, int]] = None) -> bool:
+        # 跟随符号链接时记录已进入的目录，避免链接成环
+        if not self.walk.get('follow_symlinks', False):
+            return True
+        if key is None:
+            try:
+                stat = os.stat(directory)
+            except OSError:
+                return False
+            key = (stat.st_dev, stat.st_ino)
+        if key in self.visited:
+            return False
+        self.visited.add(key)
+        return True
+    
+    def scan(self, paths: Iterable[str], should_stop: Optional[Callable[[], bool]] = None
+             ) -> Iterator[Tuple[str, str, str, str]]:
+        # 按块完成的顺序产出 (文件路径, 分类, MIME, 状态)
+        self.visited = set()
+        tasks = self._initial_tasks(paths)
+        context = multiprocessing.get_context('spawn')
+        with ProcessPoolExecutor(self.workers, mp_context=context, initializer=_init_worker,
+                                 initargs=(_settings(self.config, self.walk),)) as executor:
+            inflight = {}
+            try:
+                while tasks or inflight:
+                    # 每个进程最多排队两个任务，其余的留在协调进程中，内存占用与目录树大小无关
+                    while tasks and len(inflight) < self.workers * 2 and not (should_stop and should_stop()):
+                        task = tasks.popleft()
+                        if task[0] == 'directory':
+                            future = executor.submit(_scan_directory, task[1], task[2], self.chunk_size)
+                        else:
+                            future = executor.submit(_recognize, task[1], task[2])
+                        inflight[future] = task
+                    if not inflight:
+                        return
+                    
+                    done, _ = wait(inflight, return_when=FIRST_COMPLETED)
+                    for future in done:
+                        task = inflight.pop(future)
+                        if task[0] == 'directory':
+                            subdirs, result, chunks = future.result()
+                            self.progress['directories'] += 1
+                            tasks.extend(('directory', subdir, task[2] + 1) for subdir, key in subdirs
+                                         if self._enter(subdir, key))
+                            tasks.extend(('files', result[0], chunk) for chunk in chunks)
+                        else:
+                            result = future.result()
+                        self.progress['pending_tasks'] = len(tasks) + len(inflight)
+                        
+                        directory, names, table, codes = result
+                        self.progress['recognized'] += len(names)
+                        for name, code in zip(names, codes):
+                            yield (os.path.join(directory, name),) + tuple(table[code])
+            finally:
+                for future in inflight:
+                    future.cancel()
+    
+    def run(self, processor, paths: Iterable[str], callback: Optional[Callable[[Dict], None]] = None,
+            progress: Optional[Callable[[Dict], None]] = None, progress_interval: float = 1.0,
+            should_stop: Optional[Callable[[], bool]] = None, checkpoint_every: int = 10000) -> Dict:
+        # 在协调进程中逐个移动文件；整次运行为一个批次，每 checkpoint_every 条记录写入一次历史
+        # callback(result) 在每个文件处理完成后调用；progress(汇总信息) 至多每 progress_interval 秒调用一次
+        started = time.perf_counter()
+        last_report = started
+        
+        def report():
+            elapsed = time.perf_counter() - started
+            summary = dict(self.progress, elapsed=elapsed,
+                           files_per_sec=self.progress['processed'] / elapsed if elapsed else 0.0)
+            if progress:
+                progress(summary)
+            return summary
+        
+        with processor.journal.batch():
+            for file_path, category, mime_type, status in self.scan(paths, should_stop):
+                if status == "伪装文件":
+                    processor.metrics.inc('disguised_files')
+                    result = {
+                        'success': False,
+                        'error': f'检测到伪装文件: {mime_type}',
+                        'source': file_path
+                    }
+                elif status == ERROR_STATUS:
+                    result = {
+                        'success': False,
+                        'error': mime_type,
+                        'source': file_path
+                    }
+                else:
+                    result = processor.process_file(file_path, category)
+                
+                processor.count_result(result)
+                self.progress['processed'] += 1
+                self.progress['failed'] += not result['success']
+                if callback:
+                    callback(result)
+                if self.progress['processed'] % checkpoint_every == 0:
+                    processor.journal.checkpoint()
+                
+                now = time.perf_counter()
+                if now - last_report >= progress_interval:
+                    last_report = now
+                    report()
+        return report()
\ No newline at end of file
@@ -0,0 +1,128 @@
+import json
+from pathlib import Path
+from typing import Dict, List, Optional, Tuple
+
+DEFAULT_SIGNATURE_FILE = Path(__file__).with_name("signatures.json")
+
+# 分派键长度：按锚点位置的前两个字节建立索引
+DISPATCH_KEY_SIZE = 2
+
+
+class Signature:
+    __slots__ = ('mime', 'clauses', 'length', 'priority', 'rank')
+    
+    def __init__(self, mime: str, clauses: List[Tuple[int, bytes, Optional[bytes]]], priority: int = 0):
+        if not clauses:
+            raise ValueError(f"签名缺少匹配条件: {mime}")
+        for offset, pattern, mask in clauses:
+            if offset < 0 or not pattern:
+                raise ValueError(f"签名条件无效: {mime}")
+            if mask is not None and len(mask) != len(pattern):
+                raise ValueError(f"签名掩码长度与模式不一致: {mime}")
+        self.mime = mime
+        self.clauses = clauses
+        self.length = max(offset + len(pattern) for offset, pattern, _ in clauses)
+        self.priority = priority
+        # 排序依据：优先级，其次是匹配字节数（越具体越优先）
+        self.rank = (priority, sum(len(pattern) for _, pattern, _ in clauses))
+    
+    def matches(self, header) -> bool:
+        if len(header) < self.length:
+            return False
+        for offset, pattern, mask in self.clauses:
+            end = offset + len(pattern)
+            if mask is None:
+                if header[offset:end] != pattern:
+                    return False
+            else:
+                chunk = header[offset:end]
+                for i in range(len(pattern)):
+                    if chunk[i] & mask[i] != pattern[i] & mask[i]:
+                        return False
+        return True
+    
+    def __repr__(self):
+        return f"Signature({self.mime!r}, {self.clauses!r})"
+
+
+class SignatureIndex:
+    def __init__(self, signatures: List[Signature]):
+        self.signatures = list(signatures)
+        self.header_size = max((s.length for s in self.signatures), default=0)
+        
+        # 锚点条件：每个签名的第一个条件，用于分派
+        self._dispatch: Dict[int, Dict[bytes, List[Signature]]] = {}
+        self._fallback: List[Signature] = []
+        
+        for signature in self.signatures:
+            offset, pattern, mask = signature.clauses[0]
+            key_mask = mask[:DISPATCH_KEY_SIZE] if mask is not None else None
+            if len(pattern) < DISPATCH_KEY_SIZE or (key_mask is not None and key_mask != b'\xFF' * DISPATCH_KEY_SIZE):
+                self._fallback.append(signature)
+                continue
+            table = self._dispatch.setdefault(offset, {})
+            table.setdefault(pattern[:DISPATCH_KEY_SIZE], []).append(signature)
+        
+        # 同一桶内，更具体（匹配字节更多）的签名优先
+        for table in self._dispatch.values():
+            for bucket in table.values():
+                bucket.sort(key=lambda s: s.rank, reverse=True)
+        self._fallback.sort(key=lambda s: s.rank, reverse=True)
+        self._offsets = sorted(self._dispatch.items())
+    
+    def match(self, header) -> Optional[Signature]:
+        best = None
+        for offset, table in self._offsets:
+            bucket = table.get(bytes(header[offset:offset + DISPATCH_KEY_SIZE]))
+            if not bucket:
+                continue
+            for signature in bucket:
+                if signature.matches(header):
+                    if best is None or signature.rank > best.rank:
+                        best = signature
+                    break
+        
+        for signature in self._fallback:
+            if best is not None and signature.rank <= best.rank:
+                break
+            if signature.matches(header):
+                best = signature
+                break
+        
+        return best
+    
+    def lookup(self, header) -> Optional[str]:
+        signature = self.match(header)
+        return signature.mime if signature else None
+    
+    def __len__(self):
+        return len(self.signatures)
+
+
+def _parse_bytes(clause: Dict, key: str) -> Optional[bytes]:
+    if f"{key}_hex" in clause:
+        return bytes.fromhex(clause[f"{key}_hex"])
+    if f"{key}_text" in clause:
+        return clause[f"{key}_text"].encode('latin-1')
+    return None
+
+
+def parse_signature(entry: Dict) -> Signature:
+    clauses = []
+    for clause in entry['match']:
+        pattern = _parse_bytes(clause, 'pattern')
+        if pattern is None:
+            raise ValueError(f"签名条件缺少 pattern_hex/pattern_text: {entry}")
+        clauses.append((int(clause.get('offset', 0)), pattern, _parse_bytes(clause, 'mask')))
+    return Signature(entry['mime'], clauses, int(entry.get('priority', 0)))
+
+
+def load_signatures(path=None) -> List[Signature]:
+    path = Path(path) if path else DEFAULT_SIGNATURE_FILE
+    with open(path, 'r', encoding='utf-8') as f:
+        data = json.load(f)
+    return [parse_signature(entry) for entry in data['signatures']]
+
+
+def build_index(path=None) -> SignatureIndex:
+    return SignatureIndex(load_signatures(path))
\ No newline at end of file
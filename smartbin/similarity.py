@@ -0,0 +1,314 @@
+import heapq
+import math
+import os
+import sqlite3
+import stat as stat_module
+import threading
+import zlib
+from array import array
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Dict, Iterable, List, Optional, Sequence, Tuple
+
+from smartbin.fileops import feed_file
+from smartbin.walker import iter_entries
+
+# 平均块大小为 4 的整数次幂，最大 64 KiB
+DEFAULT_AVG_CHUNK = 64 * 1024
+DEFAULT_SKETCH_SIZE = 64
+# 小于这个大小的文件不计算指纹
+DEFAULT_MIN_SIZE = 1024 * 1024
+DEFAULT_THRESHOLD = 0.5
+# 每次查询取共享哈希最多的前几个文件，再逐个估计相似度
+CANDIDATES = 8
+
+# 内容定义分块的滚动哈希：把一段数据看作一个小端序大整数，乘以 64 位奇数常量。
+# 乘积的第 j 个字节是第 j 个字节及其前 7 个字节的线性组合，加上来自更低字节、迅速衰减的进位，
+# 相当于窗口为 8 字节的滚动哈希；相邻两个字节都为 0（每个字节只看高 b 位）的位置即切分点。
+# 切分点只取决于附近的内容，文件中插入或删除数据后，其余位置的切分点不变；
+# 大整数乘法、to_bytes 和 find 都在 C 中执行，不需要逐字节的 Python 循环
+_MULTIPLIER = 0x9e3779b97f4a7c15
+# 每次输入前拼接上一次输入末尾的字节，跨越两次输入的窗口和进位与连续计算一致
+_OVERLAP = 16
+# 每次乘法处理的字节数：大整数保持在 CPU 缓存中，比整块（1 MiB）计算更快
+_PIECE = 64 * 1024
+_MASK64 = (1 << 64) - 1
+
+
+def _boundary_bits(avg_chunk: int) -> int:
+    # 相邻两个字节各看高 b 位，平均每 4**b 个字节出现一个切分点
+    return max(4, min(8, round(math.log(max(avg_chunk, 1), 4))))
+
+
+def _boundary_table(bits: int) -> Optional[bytes]:
+    # 高 bits 位全为 0 的字节映射为 0，其余映射为 1；bits 为 8 时不需要映射
+    if bits == 8:
+        return None
+    shift = 8 - bits
+    return bytes(0 if value >> shift == 0 else 1 for value in range(256))
+
+
+def _mix(value: int) -> int:
+    # splitmix64 的终结函数：CRC32 与块长度混合成均匀分布的 63 位整数（SQLite 的 INTEGER 为有符号 64 位）
+    value = ((value ^ (value >> 30)) * 0xbf58476d1ce4e5b9) & _MASK64
+    value = ((value ^ (value >> 27)) * 0x94d049bb133111eb) & _MASK64
+    return (value ^ (value >> 31)) >> 1
+
+
+# 流式计算一个文件的内容指纹：按内容定义的位置切块，每块的 CRC32 作为块哈希，
+# 保留其中最小的 sketch_size 个（bottom-k MinHash）。与哈希器一样通过 update 输入数据，
+# 可以挂在复制或哈希的读取循环上；内存占用与文件大小无关
+class ChunkFingerprint:
+    def __init__(self, avg_chunk: int = DEFAULT_AVG_CHUNK, sketch_size: int = DEFAULT_SKETCH_SIZE):
+        bits = _boundary_bits(avg_chunk)
+        self._table = _boundary_table(bits)
+        self.avg_chunk = 4 ** bits
+        self._min_chunk = self.avg_chunk // 4
+        self._max_chunk = self.avg_chunk * 4
+        self.sketch_size = sketch_size
+        self.size = 0
+        self.chunks = 0
+        self._start = 0
+        self._crc = 0
+        self._tail = b''
+        # 取负数的大顶堆，堆顶为保留的哈希中最大的一个
+        self._heap: List[int] = []
+        self._members = set()
+        self._sketch = None
+    
+    def update(self, data):
+        view = memoryview(data).cast('B')
+        for offset in range(0, len(view), _PIECE):
+            self._update(view[offset:offset + _PIECE])
+    
+    def _update(self, view: memoryview):
+        window = self._tail + view
+        base = self.size - len(self._tail)
+        end = self.size + len(view)
+        lanes = (int.from_bytes(window, 'little') * _MULTIPLIER).to_bytes(len(window) + 8, 'little')
+        if self._table is not None:
+            lanes = lanes.translate(self._table)
+        # 只查找以本次输入中的字节结束的切分点，之前的已在上一次查找过
+        first = max(len(self._tail) - 1, 0)
+        while True:
+            # 在块的最小和最大长度之间查找，找不到时在最大长度处强制切分
+            earliest = self._start + self._min_chunk
+            latest = self._start + self._max_chunk
+            position = lanes.find(b'\0\0', max(earliest - 2 - base, first), min(latest - base, len(window)))
+            if position != -1:
+                cut = base + position + 2
+            elif latest <= end:
+                cut = latest
+            else:
+                break
+            self._crc = zlib.crc32(view[max(self._start - self.size, 0):cut - self.size], self._crc)
+            self._add(self._crc, cut - self._start)
+            self._start = cut
+            self._crc = 0
+        self._crc = zlib.crc32(view[max(self._start - self.size, 0):], self._crc)
+        self._tail = window[-_OVERLAP:]
+        self.size = end
+    
+    def _add(self, crc: int, length: int):
+        self.chunks += 1
+        value = _mix((crc << 32) | (length & 0xffffffff))
+        if value in self._members:
+            return
+        if len(self._heap) < self.sketch_size:
+            heapq.heappush(self._heap, -value)
+        elif value < -self._heap[0]:
+            self._members.discard(-heapq.heapreplace(self._heap, -value))
+        else:
+            return
+        self._members.add(value)
+    
+    def sketch(self) -> Tuple[int, ...]:
+        # 结束输入，返回升序排列的块哈希
+        if self._sketch is None:
+            if self.size > self._start:
+                self._add(self._crc, self.size - self._start)
+            self._sketch = tuple(sorted(self._members))
+        return self._sketch
+
+
+def fingerprint_file(file_path, avg_chunk: int = DEFAULT_AVG_CHUNK,
+                     sketch_size: int = DEFAULT_SKETCH_SIZE) -> Tuple[int, ...]:
+    fingerprint = ChunkFingerprint(avg_chunk, sketch_size)
+    feed_file(file_path, (fingerprint,))
+    return fingerprint.sketch()
+
+
+def similarity(a: Sequence[int], b: Sequence[int], sketch_size: int = DEFAULT_SKETCH_SIZE) -> float:
+    # bottom-k 估计的 Jaccard 相似度：两个文件所有块哈希的并集中最小的 k 个里，两边都有的比例
+    union = sorted(set(a).union(b))[:sketch_size]
+    if not union:
+        return 0.0
+    shared = set(a).intersection(b)
+    return sum(1 for value in union if value in shared) / len(union)
+
+
+# 目标目录下较大文件的内容指纹索引：按块哈希查找共享内容最多的文件，报告与已有文件的相似度
+class SimilarityIndex:
+    def __init__(self, db_file, avg_chunk: int = DEFAULT_AVG_CHUNK, sketch_size: int = DEFAULT_SKETCH_SIZE,
+                 min_size: int = DEFAULT_MIN_SIZE, threshold: float = DEFAULT_THRESHOLD):
+        self.avg_chunk = 4 ** _boundary_bits(avg_chunk)
+        self.sketch_size = max(1, min(sketch_size, 256))
+        self.min_size = min_size
+        self.threshold = threshold
+        self._lock = threading.RLock()
+        self._sync_thread = None
+        self._closed = False
+        self.synced = False
+        
+        Path(db_file).parent.mkdir(parents=True, exist_ok=True)
+        self.conn = sqlite3.connect(str(db_file), check_same_thread=False, isolation_level=None)
+        self.conn.execute("PRAGMA journal_mode=WAL")
+        self.conn.execute("PRAGMA synchronous=NORMAL")
+        self.conn.executescript("""
+            CREATE TABLE IF NOT EXISTS similarity_files (
+                id INTEGER PRIMARY KEY,
+                path TEXT NOT NULL UNIQUE,
+                size INTEGER NOT NULL,
+                mtime_ns INTEGER NOT NULL,
+                avg_chunk INTEGER NOT NULL,
+                sketch BLOB NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS similarity_tokens (
+                token INTEGER NOT NULL,
+                file_id INTEGER NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_similarity_token ON similarity_tokens(token);
+            CREATE INDEX IF NOT EXISTS idx_similarity_file ON similarity_tokens(file_id);
+        """)
+    
+    def __len__(self):
+        with self._lock:
+            return self.conn.execute("SELECT COUNT(*) FROM similarity_files").fetchone()[0]
+    
+    def new_fingerprint(self) -> ChunkFingerprint:
+        return ChunkFingerprint(self.avg_chunk, self.sketch_size)
+    
+    def wants(self, stat: os.stat_result) -> bool:
+        return stat_module.S_ISREG(stat.st_mode) and stat.st_size >= self.min_size
+    
+    @contextmanager
+    def _transaction(self):
+        with self._lock:
+            self.conn.execute("BEGIN")
+            try:
+                yield
+                self.conn.execute("COMMIT")
+            except Exception:
+                self.conn.execute("ROLLBACK")
+                raise
+    
+    def add(self, file_path, stat: Optional[os.stat_result], sketch: Sequence[int]):
+        file_path = str(file_path)
+        stat = stat or os.stat(file_path)
+        with self._transaction():
+            self._remove_locked(file_path)
+            cursor = self.conn.execute(
+                "INSERT INTO similarity_files (path, size, mtime_ns, avg_chunk, sketch) VALUES (?, ?, ?, ?, ?)",
+                (file_path, stat.st_size, stat.st_mtime_ns, self.avg_chunk, array('q', sketch).tobytes())
+            )
+            self.conn.executemany("INSERT INTO similarity_tokens (token, file_id) VALUES (?, ?)",
+                                  [(token, cursor.lastrowid) for token in sketch])
+    
+    def remove(self, file_path):
+        with self._transaction():
+            self._remove_locked(str(file_path))
+    
+    def _remove_locked(self, file_path: str):
+        row = self.conn.execute("SELECT id FROM similarity_files WHERE path = ?", (file_path,)).fetchone()
+        if row is None:
+            return
+        self.conn.execute("DELETE FROM similarity_tokens WHERE file_id = ?", row)
+        self.conn.execute("DELETE FROM similarity_files WHERE id = ?", row)
+    
+    def find_similar(self, sketch: Sequence[int], exclude=None) -> Optional[Tuple[str, float]]:
+        # 返回 (最相似的文件, 相似度)；没有达到阈值的文件时返回 None
+        if not sketch:
+            return None
+        marks = ', '.join('?' * len(sketch))
+        with self._lock:
+            candidates = self.conn.execute(f"""
+                SELECT f.path, f.size, f.mtime_ns, f.sketch FROM (
+                    SELECT file_id, COUNT(*) AS shared FROM similarity_tokens
+                    WHERE token IN ({marks}) GROUP BY file_id ORDER BY shared DESC LIMIT ?
+                ) AS t JOIN similarity_files AS f ON f.id = t.file_id
+                WHERE f.avg_chunk = ? ORDER BY t.shared DESC
+            """, (*sketch, CANDIDATES, self.avg_chunk)).fetchall()
+        
+        best = None
+        for path, size, mtime_ns, blob in candidates:
+            if exclude is not None and os.path.abspath(path) == os.path.abspath(exclude):
+                continue
+            score = similarity(sketch, array('q', blob), self.sketch_size)
+            if score < self.threshold or (best is not None and score <= best[1]):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                self.remove(path)
+                continue
+            if (stat.st_size, stat.st_mtime_ns) != (size, mtime_ns):
+                # 文件已被外部修改，指纹作废，后台同步时重新计算
+                self.remove(path)
+                continue
+            best = (path, score)
+        return best
+    
+    def start_sync(self, roots: List[Path]) -> threading.Thread:
+        # 后台为已有的文件补算指纹：大小和修改时间未变的文件跳过，只读取新增或修改过的大文件
+        with self._lock:
+            if self._sync_thread is not None:
+                return self._sync_thread
+            self._sync_thread = threading.Thread(target=self.sync, args=(list(roots),), daemon=True)
+            self._sync_thread.start()
+            return self._sync_thread
+    
+    def sync(self, roots: Iterable[Path]):
+        for root in roots:
+            self._sync_root(Path(root))
+        self.synced = True
+    
+    def _sync_root(self, root: Path):
+        prefix = str(root) + os.sep
+        with self._lock:
+            known: Dict[str, Tuple[int, int, int]] = {
+                path: (size, mtime_ns, avg_chunk) for path, size, mtime_ns, avg_chunk in self.conn.execute(
+                    "SELECT path, size, mtime_ns, avg_chunk FROM similarity_files WHERE substr(path, 1, ?) = ?",
+                    (len(prefix), prefix)
+                )
+            }
+        
+        for entry in iter_entries(root):
+            if self._closed:
+                return
+            try:
+                stat = entry.stat(follow_symlinks=False)
+            except OSError:
+                continue
+            # 变得小于 min_size 的文件留在 known 中，最后一并删除
+            if not self.wants(stat) or known.pop(entry.path, None) == (stat.st_size, stat.st_mtime_ns, self.avg_chunk):
+                continue
+            try:
+                sketch = fingerprint_file(entry.path, self.avg_chunk, self.sketch_size)
+            except OSError:
+                continue
+            with self._lock:
+                if self._closed:
+                    return
+                self.add(entry.path, stat, sketch)
+        
+        with self._lock:
+            if self._closed:
+                return
+            with self._transaction():
+                for path in known:
+                    self._remove_locked(path)
+    
+    def close(self):
+        with self._lock:
+            self._closed = True
+            self.conn.close()
\ No newline at end of file
@@ -0,0 +1,141 @@
+import codecs
+import re
+from typing import Optional, Tuple
+
+# 文本中常见的控制字符：BEL、退格、\t、\n、\v、\f、\r、ESC
+_TEXT_CONTROLS = bytes([7, 8, 9, 10, 11, 12, 13, 27])
+# 其余 C0 控制字符和 DEL：出现即说明很可能是二进制
+_BINARY_BYTES = bytes(b for b in range(32) if b not in _TEXT_CONTROLS) + b'\x7f'
+
+# 带 BOM 的编码；UTF-32 的 BOM 以 UTF-16 LE 的 BOM 开头，必须先检查
+_BOMS = (
+    (codecs.BOM_UTF8, 'utf-8-sig'),
+    (codecs.BOM_UTF32_LE, 'utf-32'),
+    (codecs.BOM_UTF32_BE, 'utf-32'),
+    (codecs.BOM_UTF16_LE, 'utf-16'),
+    (codecs.BOM_UTF16_BE, 'utf-16'),
+)
+
+# 没有 BOM 时依次尝试的编码
+_ENCODINGS = ('utf-8', 'gbk')
+
+# shebang 中的解释器（去掉版本号后缀）对应的 MIME
+_INTERPRETERS = {
+    'python': 'text/x-python',
+    'sh': 'text/x-shellscript',
+    'bash': 'text/x-shellscript',
+    'zsh': 'text/x-shellscript',
+    'dash': 'text/x-shellscript',
+    'ksh': 'text/x-shellscript',
+    'fish': 'text/x-shellscript',
+    'node': 'text/javascript',
+    'deno': 'text/javascript',
+    'perl': 'text/x-perl',
+    'ruby': 'text/x-ruby',
+    'php': 'text/x-php',
+}
+
+_JSON_START = re.compile(r'(?:\{\s*(?:"|\}|$)|\[\s*(?:[\[{"\-\d\]]|true|false|null|$))')
+_XML_START = re.compile(r'<(?:\?xml|[A-Za-z_][\w.\-]*(?:[\s>/:]|$))')
+_HTML_START = re.compile(r'<(?:!doctype\s+html|html|head|body)[\s>]', re.IGNORECASE)
+# 判断分隔符时检查的行数
+_CSV_LINES = 10
+_CSV_DELIMITERS = ((',', 'text/csv'), ('\t', 'text/tab-separated-values'), (';', 'text/csv'), ('|', 'text/csv'))
+_VERSION_SUFFIX = re.compile(r'[\d.]+$')
+
+
+def _decode(data: bytes, encoding: str) -> Optional[str]:
+    try:
+        return data.decode(encoding)
+    except UnicodeDecodeError:
+        pass
+    # 缓冲区末尾可能截断了一个多字节字符，用增量解码器忽略不完整的结尾
+    try:
+        return codecs.getincrementaldecoder(encoding)().decode(data, final=False)
+    except UnicodeDecodeError:
+        return None
+
+
+def detect_encoding(data: bytes) -> Optional[Tuple[str, str]]:
+    # 返回 (编码, 解码后的文本)；不是文本时返回 None
+    for bom, encoding in _BOMS:
+        if data.startswith(bom):
+            text = _decode(data, encoding)
+            return (encoding, text) if text is not None else None
+    
+    # 字节直方图：一次 translate 删除所有"二进制"控制字符，长度差即其出现次数
+    if b'\x00' in data:
+        return None
+    controls = len(data) - len(data.translate(None, _BINARY_BYTES))
+    if controls * 100 > len(data):
+        return None
+    if data.isascii():
+        return 'ascii', data.decode('ascii')
+    for encoding in _ENCODINGS:
+        text = _decode(data, encoding)
+        if text is not None:
+            return encoding, text
+    return None
+
+
+def _interpreter_mime(line: str) -> str:
+    parts = line[2:].split()
+    if not parts:
+        return 'text/x-script'
+    program = parts[0].rsplit('/', 1)[-1]
+    if program == 'env':
+        # #!/usr/bin/env [-S] python3
+        program = next((part for part in parts[1:] if not part.startswith('-') and '=' not in part), '')
+    return _INTERPRETERS.get(_VERSION_SUFFIX.sub('', program), 'text/x-script')
+
+
+def _looks_delimited(text: str, complete: bool) -> Optional[str]:
+    # 至少两行，且各行（去掉引号内的内容后）分隔符数量相同；引号内可以有换行
+    lines = text.split('\n', _CSV_LINES)
+    if not complete or len(lines) > _CSV_LINES:
+        # 缓冲区截断的最后一行（或尚未拆分的其余部分）不参与判断
+        lines.pop()
+    head = '\n'.join(lines)
+    if '"' in head:
+        # 按引号拆分后偶数位置的片段在引号之外
+        lines = ''.join(head.split('"')[::2]).split('\n')
+    candidates = [(delimiter, mime_type) for delimiter, mime_type in _CSV_DELIMITERS if lines and delimiter in lines[0]]
+    if not candidates:
+        return None
+    lines = [line for line in lines if line.strip()]
+    if len(lines) < 2:
+        return None
+    for delimiter, mime_type in candidates:
+        count = lines[0].count(delimiter)
+        if count and all(line.count(delimiter) == count for line in lines[1:]):
+            return mime_type
+    return None
+
+
+def sniff_text(data, complete: bool = False) -> Optional[Tuple[str, str]]:
+    # 根据文件开头的内容判断文本类型，返回 (MIME, 编码)；二进制或无法识别编码时返回 None
+    # complete：data 是否为整个文件（否则最后一行可能不完整）
+    data = bytes(data)
+    if not data:
+        return None
+    detected = detect_encoding(data)
+    if detected is None:
+        return None
+    encoding, text = detected
+    text = text.lstrip('\ufeff \t\r\n')
+    
+    if text.startswith('#!'):
+        return _interpreter_mime(text.split('\n', 1)[0]), encoding
+    if text.startswith('<'):
+        if _HTML_START.match(text):
+            return 'text/html', encoding
+        if _XML_START.match(text):
+            head = text[:512]
+            if '<!DOCTYPE html' in head or '<html' in head:
+                return 'text/html', encoding
+            if '<svg' in head:
+                return 'image/svg+xml', encoding
+            return 'application/xml', encoding
+    elif _JSON_START.match(text):
+        return 'application/json', encoding
+    return _looks_delimited(text, complete) or 'text/plain', encoding
\ No newline at end of file
@@ -0,0 +1,96 @@
+import fnmatch
+import os
+import re
+from typing import Callable, Dict, Iterable, Iterator, Optional
+
+# 作为一个整体归档的文件夹所属的分类
+FOLDER_CATEGORY = '文件夹'
+
+
+def _name_matcher(patterns: Optional[Iterable[str]]) -> Optional[Callable[[str], bool]]:
+    # 多个通配符模式合并成一个正则，每个名称只匹配一次；不区分大小写
+    patterns = [pattern for pattern in (patterns or ()) if pattern]
+    if not patterns:
+        return None
+    regex = re.compile('|'.join(f'(?:{fnmatch.translate(pattern)})' for pattern in patterns), re.IGNORECASE)
+    return lambda name: regex.match(name) is not None
+
+
+def _normalize(path) -> str:
+    return os.path.normcase(os.path.abspath(str(path)))
+
+
+def iter_entries(root, recursive: bool = True, max_depth: Optional[int] = None,
+                 ignore: Optional[Iterable[str]] = None, follow_symlinks: bool = False,
+                 keep: Optional[Iterable[str]] = None, exclude: Iterable[str] = ()) -> Iterator[os.DirEntry]:
+    # 基于 os.scandir 的流式遍历，DirEntry 自带的类型信息避免额外的 stat 调用；默认不跟随符号链接
+    # max_depth：进入子目录的最大层数（0 只列出 root 下的文件）；ignore：跳过的文件和目录名模式；
+    # keep：名称匹配的目录作为一个整体产出，不再展开；exclude：不进入的子目录（如目标目录下的分类文件夹）
+    # 同一时刻只打开一个目录，内存占用只与待遍历的目录数有关，与文件数无关
+    if not recursive:
+        max_depth = 0
+    ignored = _name_matcher(ignore)
+    kept = _name_matcher(keep)
+    excluded = {_normalize(path) for path in exclude}
+    # 跟随符号链接时记录已进入的目录，避免链接成环
+    visited = set()
+    
+    stack = [(str(root), 0)]
+    while stack:
+        directory, depth = stack.pop()
+        try:
+            if follow_symlinks:
+                stat = os.stat(directory)
+                if (stat.st_dev, stat.st_ino) in visited:
+                    continue
+                visited.add((stat.st_dev, stat.st_ino))
+            with os.scandir(directory) as it:
+                for entry in it:
+                    if ignored is not None and ignored(entry.name):
+                        continue
+                    try:
+                        if entry.is_file(follow_symlinks=follow_symlinks):
+                            yield entry
+                        elif entry.is_dir(follow_symlinks=follow_symlinks):
+                            if kept is not None and kept(entry.name):
+                                yield entry
+                            elif (max_depth is None or depth < max_depth) and _normalize(entry.path) not in excluded:
+                                stack.append((entry.path, depth + 1))
+                    except OSError:
+                        continue
+        except OSError:
+            continue
+
+
+def iter_paths(paths: Iterable[str], recursive: bool = True, expand: bool = True, **options) -> Iterator[str]:
+    # 目录在迭代过程中逐步展开，调用方可以边遍历边处理；expand=False 或目录名匹配 keep 时目录作为一个整体产出
+    # 其余参数见 iter_entries；产出的都是绝对路径，操作历史中的记录与当前工作目录无关
+    kept = _name_matcher(options.get('keep'))
+    for path in paths:
+        path = os.path.abspath(path)
+        if os.path.isdir(path):
+            if not expand or (kept is not None and kept(os.path.basename(path))):
+                yield path
+                continue
+            for entry in iter_entries(path, recursive, **options):
+                yield entry.path
+        else:
+            yield path
+
+
+def walk_options(config, recognizer=None) -> Dict:
+    # 配置中的 folders 设置转换为 iter_paths 的参数；
+    # 目标目录下的分类文件夹不会被展开（例如拖入的就是目标目录本身），避免刚移入的文件被再次处理
+    settings = config.config.get('folders', {})
+    target_dir = config.get_target_directory()
+    categories = set(config.get_rules().categories) | {FOLDER_CATEGORY}
+    if recognizer is not None:
+        categories.update(recognizer.mime_to_category.values())
+    return {
+        'expand': settings.get('expand', True),
+        'max_depth': settings.get('max_depth'),
+        'ignore': settings.get('ignore', []),
+        'follow_symlinks': settings.get('follow_symlinks', False),
+        'keep': settings.get('keep_together', []),
+        'exclude': [str(target_dir / category.split('/')[0]) for category in sorted(categories)],
+    }
\ No newline at end of file
@@ -0,0 +1,270 @@
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
+
+from smartbin.walker import iter_entries
+
+# 浏览器/下载工具的临时文件，写完后会被重命名为最终文件名
+PARTIAL_SUFFIXES = {'.part', '.crdownload', '.download', '.tmp', '.partial', '.opdownload'}
+
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, 'O_CLOEXEC', 0o2000000)
+
+_EVENT_HEADER = struct.Struct('iIII')
+
+
+class Zone:
+    def __init__(self, path, recursive: bool = False):
+        self.path = Path(path)
+        self.recursive = recursive
+
+
+def parse_zones(settings: Dict) -> List[Zone]:
+    zones = []
+    for zone in settings.get('zones', []):
+        if isinstance(zone, str):
+            zones.append(Zone(zone))
+        else:
+            zones.append(Zone(zone['path'], zone.get('recursive', False)))
+    return zones
+
+
+def iter_zone_files(zone: Zone) -> Iterable[os.DirEntry]:
+    return iter_entries(zone.path, zone.recursive)
+
+
+class InotifyBackend:
+    # 返回的事件为 (路径, 是否已写完)；None 表示事件队列溢出，需要全量重扫
+    def __init__(self, zones: List[Zone]):
+        libc = ctypes.CDLL(ctypes.util.find_library('c'), use_errno=True)
+        self._add_watch = libc.inotify_add_watch
+        self._add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+        self.fd = libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if self.fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 失败")
+        self.watches: Dict[int, Tuple[Path, Zone]] = {}
+        for zone in zones:
+            self._watch_tree(zone.path, zone)
+    
+    def _watch(self, path: Path, zone: Zone):
+        mask = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_Q_OVERFLOW
+        wd = self._add_watch(self.fd, os.fsencode(str(path)), mask)
+        if wd >= 0:
+            self.watches[wd] = (path, zone)
+    
+    def _watch_tree(self, path: Path, zone: Zone):
+        self._watch(path, zone)
+        if not zone.recursive:
+            return
+        for root, dirs, _ in os.walk(path):
+            for name in dirs:
+                self._watch(Path(root) / name, zone)
+    
+    def wait(self, timeout: Optional[float]) -> List[Optional[Tuple[str, bool]]]:
+        readable, _, _ = select.select([self.fd], [], [], timeout)
+        if not readable:
+            return []
+        
+        events = []
+        try:
+            data = os.read(self.fd, 256 * 1024)
+        except BlockingIOError:
+            return []
+        
+        offset = 0
+        while offset < len(data):
+            wd, mask, _, length = _EVENT_HEADER.unpack_from(data, offset)
+            offset += _EVENT_HEADER.size
+            name = data[offset:offset + length].rstrip(b'\0')
+            offset += length
+            
+            if mask & IN_Q_OVERFLOW:
+                events.append(None)
+                continue
+            if mask & IN_IGNORED:
+                self.watches.pop(wd, None)
+                continue
+            if wd not in self.watches or not name:
+                continue
+            
+            directory, zone = self.watches[wd]
+            path = directory / os.fsdecode(name)
+            if mask & IN_ISDIR:
+                if zone.recursive and mask & (IN_CREATE | IN_MOVED_TO):
+                    self._watch_tree(path, zone)
+                    events.extend((entry.path, False) for entry in iter_zone_files(Zone(path, True)))
+                continue
+            events.append((str(path), bool(mask & (IN_CLOSE_WRITE | IN_MOVED_TO))))
+        return events
+    
+    def close(self):
+        os.close(self.fd)
+
+
+class PollingBackend:
+    def __init__(self, zones: List[Zone], interval: float = 2.0):
+        self.zones = zones
+        self.interval = interval
+        self.snapshot = self._scan()
+        self.next_scan = time.monotonic() + interval
+    
+    def _scan(self) -> Dict[str, Tuple[int, int]]:
+        snapshot = {}
+        for zone in self.zones:
+            for entry in iter_zone_files(zone):
+                try:
+                    stat = entry.stat(follow_symlinks=False)
+                except OSError:
+                    continue
+                snapshot[entry.path] = (stat.st_size, stat.st_mtime_ns)
+        return snapshot
+    
+    def wait(self, timeout: Optional[float]) -> List[Optional[Tuple[str, bool]]]:
+        now = time.monotonic()
+        delay = self.next_scan - now
+        if timeout is not None and timeout < delay:
+            time.sleep(max(0.0, timeout))
+            return []
+        time.sleep(max(0.0, delay))
+        self.next_scan = time.monotonic() + self.interval
+        
+        snapshot = self._scan()
+        events = [(path, False) for path, state in snapshot.items() if self.snapshot.get(path) != state]
+        self.snapshot = snapshot
+        return events
+    
+    def close(self):
+        pass
+
+
+def create_backend(zones: List[Zone], poll_interval: float = 2.0):
+    if sys.platform.startswith('linux'):
+        try:
+            return InotifyBackend(zones)
+        except (OSError, AttributeError) as e:
+            print(f"inotify 不可用，改用轮询: {e}")
+    return PollingBackend(zones, poll_interval)
+
+
+# 热区监控：把热区中新出现且已写完的文件按批次交给 FileProcessor
+class HotZoneWatcher:
+    def __init__(self, config, processor, recognizer, on_batch: Optional[Callable[[List[str]], None]] = None):
+        settings = config.config.get('hot_zones', {})
+        self.config = config
+        self.processor = processor
+        self.recognizer = recognizer
+        self.on_batch = on_batch or self._process_batch
+        self.zones = [zone for zone in parse_zones(settings) if zone.path.is_dir()]
+        target_dir = config.get_target_directory()
+        self.category_dirs = tuple(
+            str(target_dir / category) + os.sep for category in config.get_rules().categories
+        )
+        
+        # settle_seconds：没有写完通知的文件，大小和修改时间保持不变多久才算写完
+        self.settle_seconds = settings.get('settle_seconds', 2.0)
+        self.batch_delay = settings.get('batch_delay', 0.5)
+        self.max_batch = settings.get('max_batch', 500)
+        self.poll_interval = settings.get('poll_interval', 2.0)
+        
+        self.pending: Dict[str, Tuple[Tuple[int, int], float, bool]] = {}
+        self.stop_event = threading.Event()
+        self.thread = None
+        self.backend = None
+        # 监控线程异常退出的原因（如 on_batch 抛出异常），调用方据此判断是否失败
+        self.error = None
+    
+    def start(self):
+        if not self.zones or self.thread is not None:
+            return
+        self.backend = create_backend(self.zones, self.poll_interval)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+    
+    def stop(self):
+        self.stop_event.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+    
+    def _run(self):
+        try:
+            while not self.stop_event.is_set():
+                # 没有待定文件时长时间阻塞，空闲时几乎不占 CPU
+                timeout = min(self.batch_delay, self.settle_seconds) if self.pending else 1.0
+                events = self.backend.wait(timeout)
+                now = time.monotonic()
+                for event in events:
+                    if event is None:
+                        self._rescan(now)
+                    else:
+                        self._touch(event[0], event[1], now)
+                self._flush(now)
+        except BaseException as e:
+            self.error = e
+            raise
+        finally:
+            self.backend.close()
+    
+    def _rescan(self, now: float):
+        for zone in self.zones:
+            for entry in iter_zone_files(zone):
+                self._touch(entry.path, False, now)
+    
+    def _touch(self, path: str, complete: bool, now: float):
+        if Path(path).suffix.lower() in PARTIAL_SUFFIXES or Path(path).name.startswith('.'):
+            return
+        # 热区包含目标目录时，不能再处理已经归档的文件
+        if path.startswith(self.category_dirs):
+            return
+        try:
+            stat = os.stat(path)
+        except OSError:
+            self.pending.pop(path, None)
+            return
+        state = (stat.st_size, stat.st_mtime_ns)
+        previous = self.pending.get(path)
+        if previous is not None and previous[0] == state:
+            complete = complete or previous[2]
+            now = previous[1]
+        self.pending[path] = (state, now, complete)
+    
+    def _flush(self, now: float):
+        ready = []
+        for path, (state, since, complete) in list(self.pending.items()):
+            waited = now - since
+            if waited < (self.batch_delay if complete else self.settle_seconds):
+                continue
+            try:
+                stat = os.stat(path)
+            except OSError:
+                del self.pending[path]
+                continue
+            current = (stat.st_size, stat.st_mtime_ns)
+            if current != state:
+                # 仍在写入，重新计时
+                self.pending[path] = (current, now, False)
+                continue
+            del self.pending[path]
+            ready.append(path)
+        
+        for start in range(0, len(ready), self.max_batch):
+            self.on_batch(ready[start:start + self.max_batch])
+    
+    def _process_batch(self, files: List[str]):
+        try:
+            self.processor.batch_process(files, self.recognizer)
+        except Exception as e:
+            print(f"热区处理失败: {e}")
\ No newline at end of file